@@ -0,0 +1,24 @@
+"""Composite index on tbl_venta (estado, fecha_venta)
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-01-15 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Índice para el resumen de ventas: GROUP BY estado con rango de fecha_venta
+    op.create_index('tbl_venta_index_estado_fecha', 'tbl_venta', ['estado', 'fecha_venta'])
+
+
+def downgrade() -> None:
+    op.drop_index('tbl_venta_index_estado_fecha', table_name='tbl_venta')
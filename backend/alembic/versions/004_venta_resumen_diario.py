@@ -0,0 +1,95 @@
+"""Daily sales rollup tables
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-01-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Resumen diario por estado y producto
+    op.create_table('tbl_venta_resumen_diario',
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('estado', sa.String(length=50), nullable=False),
+        sa.Column('id_producto', sa.Integer(), nullable=False),
+        sa.Column('unidades', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bruto', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('iva', sa.Float(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('fecha', 'estado', 'id_producto')
+    )
+    
+    # Resumen diario por estado
+    op.create_table('tbl_venta_resumen_diario_total',
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('estado', sa.String(length=50), nullable=False),
+        sa.Column('ventas', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_venta', sa.Float(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('fecha', 'estado')
+    )
+    
+    # Poblar el histórico: los reportes leen los días anteriores solo del resumen
+    # (mismos INSERT ... SELECT que rebuild_rollup en app/crud/sales_rollup.py)
+    venta = sa.table('tbl_venta',
+        sa.column('id_venta', sa.Integer()),
+        sa.column('fecha_venta', sa.DateTime()),
+        sa.column('total_venta', sa.Float()),
+        sa.column('estado', sa.String())
+    )
+    carrito = sa.table('tbl_carrito',
+        sa.column('id_venta', sa.Integer()),
+        sa.column('id_producto', sa.Integer()),
+        sa.column('cantidad', sa.Integer()),
+        sa.column('valor_unitario', sa.Float()),
+        sa.column('iva_calculado', sa.Float()),
+        sa.column('estado', sa.String())
+    )
+    resumen = sa.table('tbl_venta_resumen_diario',
+        *(sa.column(nombre) for nombre in ('fecha', 'estado', 'id_producto', 'unidades', 'bruto', 'iva'))
+    )
+    resumen_total = sa.table('tbl_venta_resumen_diario_total',
+        *(sa.column(nombre) for nombre in ('fecha', 'estado', 'ventas', 'total_venta'))
+    )
+    fecha = sa.func.date(venta.c.fecha_venta)
+    # Estados finales (ROLLUP_ESTADOS)
+    finales = venta.c.estado.in_(['CONFIRMADO', 'ABANDONADO'])
+
+    op.execute(resumen_total.insert().from_select(
+        ['fecha', 'estado', 'ventas', 'total_venta'],
+        sa.select(
+            fecha,
+            venta.c.estado,
+            sa.func.count(venta.c.id_venta),
+            sa.func.coalesce(sa.func.sum(venta.c.total_venta), 0)
+        ).where(finales).group_by(fecha, venta.c.estado)
+    ))
+
+    op.execute(resumen.insert().from_select(
+        ['fecha', 'estado', 'id_producto', 'unidades', 'bruto', 'iva'],
+        sa.select(
+            fecha,
+            venta.c.estado,
+            carrito.c.id_producto,
+            sa.func.coalesce(sa.func.sum(carrito.c.cantidad), 0),
+            sa.func.coalesce(sa.func.sum(carrito.c.valor_unitario * carrito.c.cantidad), 0),
+            sa.func.coalesce(sa.func.sum(carrito.c.iva_calculado), 0)
+        ).select_from(
+            venta.join(carrito, carrito.c.id_venta == venta.c.id_venta)
+        ).where(
+            finales,
+            carrito.c.estado != 'ELIMINADO'
+        ).group_by(fecha, venta.c.estado, carrito.c.id_producto)
+    ))
+
+def downgrade() -> None:
+    op.drop_table('tbl_venta_resumen_diario_total')
+    op.drop_table('tbl_venta_resumen_diario')
@@ -0,0 +1,32 @@
+"""Composite indexes for cart, checkout and catalog queries
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-01-15 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Carrito pendiente del usuario: WHERE id_usuario AND estado ORDER BY fecha_venta DESC
+    op.create_index('tbl_venta_index_usuario_estado_fecha', 'tbl_venta', ['id_usuario', 'estado', 'fecha_venta'])
+    # Items de una venta: WHERE id_venta AND estado
+    op.create_index('tbl_carrito_index_venta_estado', 'tbl_carrito', ['id_venta', 'estado'])
+    # Catálogo filtrado por estado y categoría / subcategoría
+    op.create_index('tbl_producto_index_estado_categoria', 'tbl_producto', ['estado', 'id_categoria'])
+    op.create_index('tbl_producto_index_estado_subcategoria', 'tbl_producto', ['estado', 'id_subcategoria'])
+
+
+def downgrade() -> None:
+    op.drop_index('tbl_producto_index_estado_subcategoria', table_name='tbl_producto')
+    op.drop_index('tbl_producto_index_estado_categoria', table_name='tbl_producto')
+    op.drop_index('tbl_carrito_index_venta_estado', table_name='tbl_carrito')
+    op.drop_index('tbl_venta_index_usuario_estado_fecha', table_name='tbl_venta')
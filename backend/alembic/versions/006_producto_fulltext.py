@@ -0,0 +1,44 @@
+"""Full-text search index on tbl_producto (nombre, marca, codigo)
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-01-15 00:00:00.000000
+
+"""
+from alembic import op
+from app.crud.product_search import FTS_TABLE, FULLTEXT_INDEX, SQLITE_FTS_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        # La collation *_ci de las columnas hace la búsqueda insensible a tildes y mayúsculas
+        op.create_index(
+            FULLTEXT_INDEX, 'tbl_producto',
+            ['nombre', 'marca', 'codigo'],
+            mysql_prefix='FULLTEXT'
+        )
+    elif dialect == 'sqlite':
+        # Tabla FTS5 sincronizada con tbl_producto mediante triggers (misma DDL que ensure_search_index)
+        for ddl in SQLITE_FTS_DDL:
+            op.execute(ddl)
+        op.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        op.drop_index(FULLTEXT_INDEX, table_name='tbl_producto')
+    elif dialect == 'sqlite':
+        for sufijo in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{sufijo}")
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
@@ -0,0 +1,32 @@
+"""Refresh token table shared across workers
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-01-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Refresh tokens vigentes (REFRESH_TOKEN_STORE=sql)
+    op.create_table('tbl_refresh_token',
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('id_usuario', sa.Integer(), nullable=True),
+        sa.Column('fecha_expiracion', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('token_hash')
+    )
+    op.create_index('tbl_refresh_token_index_expira', 'tbl_refresh_token', ['fecha_expiracion'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('tbl_refresh_token_index_expira', table_name='tbl_refresh_token')
+    op.drop_table('tbl_refresh_token')
@@ -0,0 +1,34 @@
+"""Catalog version shared across workers
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-01-26 00:00:00.000000
+
+"""
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Versión del catálogo público (ETag); cada escritura del catálogo la incrementa
+    tabla = op.create_table('tbl_catalogo_version',
+        sa.Column('id_version', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('fecha_cambio', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id_version')
+    )
+    op.bulk_insert(tabla, [
+        {"id_version": 1, "version": 1, "fecha_cambio": datetime.now(timezone.utc).replace(tzinfo=None)}
+    ])
+
+
+def downgrade() -> None:
+    op.drop_table('tbl_catalogo_version')
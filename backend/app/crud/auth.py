@@ -1,36 +1,31 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, joinedload
 from app.models.user import Usuario, Persona, Perfil
 from app.utils.auth import verify_password, get_password_hash
 from typing import Optional, Dict, Any
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[Dict[str, Any]]:
-    """
-    Autentica un usuario verificando email y contraseña
-    Retorna los datos del usuario si la autenticación es exitosa
-    """
-    # Buscar usuario por email (username)
-    user = db.query(Usuario).filter(Usuario.username == email).first()
-    
-    if not user:
-        return None
-    
-    # Verificar contraseña
-    if not verify_password(password, user.password):
-        return None
-    
-    # Obtener datos relacionados
-    persona = db.query(Persona).filter(Persona.id_persona == user.id_persona).first()
-    perfil = db.query(Perfil).filter(Perfil.id_perfil == user.id_perfil).first()
-    
-    if not persona or not perfil:
-        return None
-    
-    # Retornar datos del usuario
+# Perfiles (id -> nombre). No cambian en tiempo de ejecución: se cargan una vez por proceso
+_perfiles: Optional[Dict[int, str]] = None
+
+def get_perfiles(db: Session) -> Dict[int, str]:
+    """Mapa id_perfil -> nombre, cacheado en memoria"""
+    global _perfiles
+    if _perfiles is None:
+        _perfiles = {id_perfil: nombre for id_perfil, nombre in db.query(Perfil.id_perfil, Perfil.nombre).all()}
+    return _perfiles
+
+def get_perfil_id(db: Session, nombre: str) -> Optional[int]:
+    """ID del perfil con ese nombre (p. ej. "Cliente")"""
+    for id_perfil, nombre_perfil in get_perfiles(db).items():
+        if nombre_perfil == nombre:
+            return id_perfil
+    return None
+
+def _build_user_data(user: Usuario, persona: Persona, profile: str) -> Dict[str, Any]:
+    """Datos del usuario para el token y las respuestas de login/registro"""
     return {
         "user_id": user.id_usuario,
         "email": user.username,
-        "profile": perfil.nombre,
+        "profile": profile,
         "person_name": f"{persona.nombre} {persona.apellido}",
         "person_data": {
             "id_persona": persona.id_persona,
@@ -45,54 +40,61 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[Dict[s
         }
     }
 
-def get_user_by_email(db: Session, email: str) -> Optional[Usuario]:
-    """Obtiene un usuario por email"""
-    return db.query(Usuario).filter(Usuario.username == email).first()
-
-def get_user_by_id(db: Session, user_id: int) -> Optional[Dict[str, Any]]:
+def authenticate_user(db: Session, email: str, password: str) -> Optional[Dict[str, Any]]:
     """
-    Obtiene un usuario por ID con todos sus datos relacionados
+    Autentica un usuario verificando email y contraseña
+    Retorna los datos del usuario si la autenticación es exitosa
     """
-    user = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+    # Buscar usuario por email (username), con su persona en la misma consulta
+    user = get_user_by_email(db, email)
     
     if not user:
         return None
     
-    # Obtener datos relacionados
-    persona = db.query(Persona).filter(Persona.id_persona == user.id_persona).first()
-    perfil = db.query(Perfil).filter(Perfil.id_perfil == user.id_perfil).first()
+    # Verificar contraseña
+    if not verify_password(password, user.password):
+        return None
     
-    if not persona or not perfil:
+    return get_user_data(db, user)
+
+def get_user_data(db: Session, user: Usuario) -> Optional[Dict[str, Any]]:
+    """
+    Datos del usuario para el token y la respuesta de login (perfil y persona).
+    No consulta la base de datos si la persona ya está cargada (get_user_by_email / get_user_by_id)
+    """
+    profile = get_perfiles(db).get(user.id_perfil)
+    if not user.persona or not profile:
         return None
     
-    return {
-        "user_id": user.id_usuario,
-        "email": user.username,
-        "profile": perfil.nombre,
-        "person_name": f"{persona.nombre} {persona.apellido}",
-        "person_data": {
-            "id_persona": persona.id_persona,
-            "tipo_identificacion": persona.tipo_identificacion,
-            "identificacion": persona.identificacion,
-            "genero": persona.genero,
-            "nombre": persona.nombre,
-            "apellido": persona.apellido,
-            "direccion": persona.direccion,
-            "telefono": persona.telefono,
-            "email": persona.email
-        }
-    }
+    return _build_user_data(user, user.persona, profile)
+
+def update_password_hash(db: Session, user: Usuario, hashed_password: str) -> None:
+    """Reemplaza el hash de la contraseña (p. ej. al cambiar el costo de bcrypt)"""
+    user.password = hashed_password
+    db.commit()
 
-def create_user(db: Session, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def get_user_by_email(db: Session, email: str) -> Optional[Usuario]:
+    """Obtiene un usuario por email, con su persona cargada"""
+    return db.query(Usuario).options(joinedload(Usuario.persona)).filter(Usuario.username == email).first()
+
+def get_user_by_id(db: Session, user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Obtiene un usuario por ID con todos sus datos relacionados (una sola consulta)
+    """
+    user = db.query(Usuario).options(joinedload(Usuario.persona)).filter(Usuario.id_usuario == user_id).first()
+    
+    if not user:
+        return None
+    
+    return get_user_data(db, user)
+
+def create_user(db: Session, user_data: Dict[str, Any], hashed_password: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Crea un nuevo usuario
+    Si se recibe hashed_password (calculado fuera, p. ej. en el pool de hashing) no se vuelve a calcular.
+    El email debe verificarse antes (get_user_by_email); un duplicado concurrente falla por la restricción UNIQUE.
     """
     try:
-        # Verificar si el email ya existe
-        existing_user = get_user_by_email(db, user_data["email"])
-        if existing_user:
-            return None
-        
         # Crear persona
         persona = Persona(
             tipo_identificacion=user_data["tipo_identificacion"],
@@ -108,7 +110,8 @@ def create_user(db: Session, user_data: Dict[str, Any]) -> Optional[Dict[str, An
         db.flush()  # Para obtener el ID de la persona
         
         # Hash de la contraseña
-        hashed_password = get_password_hash(user_data["password"])
+        if hashed_password is None:
+            hashed_password = get_password_hash(user_data["password"])
         
         # Crear usuario
         usuario = Usuario(
@@ -118,29 +121,12 @@ def create_user(db: Session, user_data: Dict[str, Any]) -> Optional[Dict[str, An
             password=hashed_password
         )
         db.add(usuario)
-        db.commit()
-        db.refresh(usuario)
+        db.flush()  # Para obtener el ID del usuario
         
-        # Obtener perfil
-        perfil = db.query(Perfil).filter(Perfil.id_perfil == usuario.id_perfil).first()
-        
-        return {
-            "user_id": usuario.id_usuario,
-            "email": usuario.username,
-            "profile": perfil.nombre if perfil else "Cliente",
-            "person_name": f"{persona.nombre} {persona.apellido}",
-            "person_data": {
-                "id_persona": persona.id_persona,
-                "tipo_identificacion": persona.tipo_identificacion,
-                "identificacion": persona.identificacion,
-                "genero": persona.genero,
-                "nombre": persona.nombre,
-                "apellido": persona.apellido,
-                "direccion": persona.direccion,
-                "telefono": persona.telefono,
-                "email": persona.email
-            }
-        }
+        # Armar la respuesta antes del commit, que expira los objetos (evita recargarlos)
+        created = _build_user_data(usuario, persona, get_perfiles(db).get(usuario.id_perfil, "Cliente"))
+        db.commit()
+        return created
         
     except Exception as e:
         db.rollback()
@@ -1,12 +1,15 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
+from sqlalchemy import and_, case, func, update
+from sqlalchemy.engine import Row
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from ..models.cart import Cart
 from ..models.sale import Sale
 from ..models.product import Producto
-from ..models.user import Usuario
-from ..schemas.cart import CartCreate, CartItemCreate
-from datetime import datetime
+from ..models.iva import Iva
+from ..schemas.cart import CartCreate, LocalStorageCartItem
+from ..utils.catalog_cache import catalog_cache
+from .sales_rollup import record_sale
+from datetime import datetime, timezone
 
 def create_cart_with_sale(db: Session, cart_data: CartCreate, user_id: int) -> Sale:
     """Crea una venta y sus items del carrito"""
@@ -81,3 +84,347 @@ def get_sale_with_items(db: Session, sale_id: int, user_id: Optional[int] = None
             sale.carrito_items = get_cart_items_by_sale_id(db, sale_id, user_id)
     
     return sale
+
+def get_iva_by_productos(db: Session, producto_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Obtiene el IVA (id y porcentaje) de varios productos en una sola consulta.
+    Los productos que no existen no aparecen en el resultado.
+    """
+    ids = set(producto_ids)
+    if not ids:
+        return {}
+    
+    rows = db.query(Producto.id_producto, Producto.id_iva, Iva.porcentaje).outerjoin(
+        Iva, Producto.id_iva == Iva.id_iva
+    ).filter(Producto.id_producto.in_(ids)).all()
+    
+    return {
+        id_producto: {
+            "id_iva": id_iva,
+            "iva_rate": float(porcentaje) if porcentaje is not None else 0.0
+        }
+        for id_producto, id_iva, porcentaje in rows
+    }
+
+def calculate_cart_pricing(db: Session, items: List[LocalStorageCartItem]) -> Dict[str, Any]:
+    """
+    Calcula IVA, subtotal y total de venta de todos los items del carrito
+    con una sola consulta de tasas de IVA.
+    Productos no encontrados se liquidan con IVA 0%.
+    """
+    iva_by_producto = get_iva_by_productos(db, (int(item.id) for item in items))
+    
+    lines = []
+    total_venta = 0
+    for item in items:
+        product_id = int(item.id)
+        iva = iva_by_producto.get(product_id, {"id_iva": 1, "iva_rate": 0.0})
+        
+        base = item.price * item.quantity
+        iva_calculado = base * (iva["iva_rate"] / 100)
+        subtotal = base + iva_calculado
+        total_venta += subtotal
+        
+        lines.append({
+            "id_producto": product_id,
+            "id_iva": iva["id_iva"],
+            "iva_rate": iva["iva_rate"],
+            "base": base,
+            "iva_calculado": iva_calculado,
+            "subtotal": subtotal
+        })
+    
+    return {"lines": lines, "total_venta": total_venta}
+
+def get_pending_cart_rows(db: Session, user_id: int) -> List[Row]:
+    """
+    Obtiene en una sola consulta la venta pendiente más reciente del usuario
+    junto con sus items activos, los datos del producto y la tasa de IVA.
+    Retorna una fila (solo las columnas que usa la respuesta) por item:
+    id_venta, total_venta, estado, fecha_venta, id_carrito, id_producto, cantidad,
+    valor_unitario, nombre, marca, stock, id_iva, imagen, porcentaje;
+    si la venta no tiene items activos retorna una fila con id_carrito en None,
+    y si no hay venta pendiente retorna una lista vacía.
+    """
+    latest_sale_id = db.query(Sale.id_venta).filter(
+        Sale.id_usuario == user_id,
+        Sale.estado == 'PENDIENTE'
+    ).order_by(Sale.fecha_venta.desc()).limit(1).scalar_subquery()
+    
+    return db.query(
+        Sale.id_venta,
+        Sale.total_venta,
+        Sale.estado,
+        Sale.fecha_venta,
+        Cart.id_carrito,
+        Cart.id_producto,
+        Cart.cantidad,
+        Cart.valor_unitario,
+        Producto.nombre,
+        Producto.marca,
+        Producto.stock,
+        Producto.id_iva,
+        Producto.imagen,
+        Iva.porcentaje
+    ).outerjoin(
+        Cart, and_(Cart.id_venta == Sale.id_venta, Cart.estado == 'ACTIVO')
+    ).outerjoin(
+        Producto, Producto.id_producto == Cart.id_producto
+    ).outerjoin(
+        Iva, Iva.id_iva == Producto.id_iva
+    ).filter(
+        Sale.id_venta == latest_sale_id
+    ).order_by(Cart.id_carrito).all()
+
+def _cart_item(sale: Sale, user_id: int, item_data: LocalStorageCartItem, line: Dict[str, Any]) -> Cart:
+    """Item ACTIVO del carrito con los valores de IVA calculados"""
+    return Cart(
+        id_venta=sale.id_venta,
+        id_producto=line["id_producto"],
+        id_usuario=user_id,
+        cantidad=item_data.quantity,
+        valor_unitario=item_data.price,
+        iva_calculado=line["iva_calculado"],
+        subtotal=line["subtotal"],
+        estado='ACTIVO'
+    )
+
+def save_pending_cart(db: Session, user_id: int, items: List[LocalStorageCartItem]) -> Tuple[Sale, Dict[str, Any]]:
+    """
+    Guarda el carrito del localStorage en la venta pendiente del usuario:
+    si ya existe actualiza sus items (y marca ELIMINADO los que ya no están),
+    si no crea la venta. Retorna la venta y el cálculo de IVA de los items.
+    """
+    try:
+        # Calcular IVA y totales de todos los items con una sola consulta
+        pricing = calculate_cart_pricing(db, items)
+        
+        # Verificar si ya existe una venta pendiente para este usuario
+        sale = db.query(Sale).filter(
+            Sale.id_usuario == user_id,
+            Sale.estado == 'PENDIENTE'
+        ).first()
+        
+        if sale:
+            # Si existe venta pendiente, actualizar en lugar de crear nueva
+            existing_cart_items = db.query(Cart).filter(
+                Cart.id_venta == sale.id_venta,
+                Cart.estado == 'ACTIVO'
+            ).all()
+            
+            # Crear diccionario de productos existentes para búsqueda rápida
+            existing_products = {item.id_producto: item for item in existing_cart_items}
+            
+            for item_data, line in zip(items, pricing["lines"]):
+                existing_item = existing_products.get(line["id_producto"])
+                if existing_item:
+                    # Producto ya existe: actualizar cantidad y recalcular
+                    existing_item.cantidad = item_data.quantity
+                    existing_item.valor_unitario = item_data.price
+                    existing_item.iva_calculado = line["iva_calculado"]
+                    existing_item.subtotal = line["subtotal"]
+                else:
+                    db.add(_cart_item(sale, user_id, item_data, line))
+            
+            # Eliminar productos que ya no están en el carrito
+            new_product_ids = {int(item.id) for item in items}
+            for existing_item in existing_cart_items:
+                if existing_item.id_producto not in new_product_ids:
+                    existing_item.estado = 'ELIMINADO'
+        else:
+            sale = Sale(
+                id_usuario=user_id,
+                total_venta=0,  # Se calculará después
+                estado='PENDIENTE'
+            )
+            db.add(sale)
+            db.flush()  # Para obtener el ID de la venta
+            
+            for item_data, line in zip(items, pricing["lines"]):
+                db.add(_cart_item(sale, user_id, item_data, line))
+        
+        # Actualizar el total de la venta (incluye IVA de cada item)
+        sale.total_venta = pricing["total_venta"]
+        
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    db.refresh(sale)
+    return sale, pricing
+
+def replace_pending_cart(db: Session, user_id: int, items: List[LocalStorageCartItem]) -> Optional[Tuple[Sale, Dict[str, Any]]]:
+    """
+    Reemplaza todos los items activos de la venta pendiente más reciente del usuario.
+    Retorna None si no hay venta pendiente.
+    """
+    try:
+        sale = db.query(Sale).filter(
+            Sale.id_usuario == user_id,
+            Sale.estado == 'PENDIENTE'
+        ).order_by(Sale.fecha_venta.desc()).first()
+        
+        if not sale:
+            return None
+        
+        # Eliminar todos los items del carrito existentes
+        db.query(Cart).filter(
+            Cart.id_venta == sale.id_venta,
+            Cart.estado == 'ACTIVO'
+        ).delete()
+        
+        # Calcular IVA y totales de todos los items con una sola consulta
+        pricing = calculate_cart_pricing(db, items)
+        sale.total_venta = pricing["total_venta"]
+        
+        for item_data, line in zip(items, pricing["lines"]):
+            db.add(_cart_item(sale, user_id, item_data, line))
+        
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    db.refresh(sale)
+    return sale, pricing
+
+def abandon_pending_carts(db: Session, user_id: int) -> None:
+    """Marca como ABANDONADO las ventas pendientes del usuario y sus items"""
+    try:
+        pending_sales = db.query(Sale).filter(
+            Sale.id_usuario == user_id,
+            Sale.estado == 'PENDIENTE'
+        ).all()
+        
+        for sale in pending_sales:
+            # Los items que el cliente ya había eliminado siguen como ELIMINADO
+            db.query(Cart).filter(
+                Cart.id_venta == sale.id_venta,
+                Cart.estado == 'ACTIVO'
+            ).update({
+                "estado": "ABANDONADO",
+                "fecha_abandono": func.now()
+            }, synchronize_session=False)
+            sale.estado = 'ABANDONADO'
+            
+            # Acumular en el resumen diario dentro de la misma transacción
+            record_sale(db, sale)
+        
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+class CheckoutError(Exception):
+    """Error de negocio al confirmar una compra (se traduce a HTTPException en el router)"""
+    
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def confirm_pending_sale(db: Session, user_id: int) -> Dict[str, Any]:
+    """
+    Confirma la venta pendiente más reciente del usuario en una sola transacción:
+    - Bloquea la venta y todos los productos involucrados (SELECT ... FOR UPDATE,
+      productos ordenados por ID para que checkouts concurrentes no se bloqueen mutuamente)
+    - Descuenta el stock con un único UPDATE condicionado a stock suficiente
+    - Pasa todos los items del carrito de ACTIVO a VENTA con un único UPDATE
+    Lanza CheckoutError si no hay venta, el carrito está vacío o falta stock.
+    """
+    try:
+        sale = db.query(Sale).filter(
+            Sale.id_usuario == user_id,
+            Sale.estado == 'PENDIENTE'
+        ).order_by(Sale.fecha_venta.desc()).with_for_update().first()
+        
+        if not sale:
+            raise CheckoutError(404, "No se encontró un carrito pendiente para confirmar")
+        
+        # Cantidades por producto (un producto puede repetirse en varias filas)
+        rows = db.query(
+            Cart.id_producto,
+            func.sum(Cart.cantidad),
+            func.count(Cart.id_carrito)
+        ).filter(
+            Cart.id_venta == sale.id_venta,
+            Cart.estado == 'ACTIVO'
+        ).group_by(Cart.id_producto).all()
+        
+        if not rows:
+            raise CheckoutError(400, "El carrito está vacío, no se puede confirmar la compra")
+        
+        cantidades = {id_producto: int(cantidad) for id_producto, cantidad, _ in rows}
+        items_count = sum(count for _, _, count in rows)
+        producto_ids = sorted(cantidades)
+        
+        # Bloquear las filas de producto en orden de ID
+        productos = db.query(
+            Producto.id_producto,
+            Producto.nombre,
+            Producto.stock
+        ).filter(
+            Producto.id_producto.in_(producto_ids)
+        ).order_by(Producto.id_producto).with_for_update().all()
+        
+        productos_by_id = {producto.id_producto: producto for producto in productos}
+        for id_producto in producto_ids:
+            producto = productos_by_id.get(id_producto)
+            if not producto:
+                raise CheckoutError(400, f"Producto con ID {id_producto} no encontrado")
+            if (producto.stock or 0) < cantidades[id_producto]:
+                raise CheckoutError(
+                    400,
+                    f"Stock insuficiente para {producto.nombre}. Disponible: {producto.stock}, Solicitado: {cantidades[id_producto]}"
+                )
+        
+        # Descontar todo el stock en un solo UPDATE condicionado
+        descuento = case(cantidades, value=Producto.id_producto)
+        result = db.execute(
+            update(Producto).where(
+                Producto.id_producto.in_(producto_ids),
+                Producto.stock >= descuento
+            ).values(stock=Producto.stock - descuento).execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(producto_ids):
+            raise CheckoutError(409, "El stock cambió durante la confirmación, intente nuevamente")
+        
+        # Pasar los items del carrito a VENTA en un solo UPDATE
+        db.query(Cart).filter(
+            Cart.id_venta == sale.id_venta,
+            Cart.estado == 'ACTIVO'
+        ).update({"estado": "VENTA"}, synchronize_session=False)
+        
+        sale.fecha_venta = datetime.now(timezone.utc)
+        sale.estado = 'CONFIRMADO'
+        
+        # Acumular en el resumen diario dentro de la misma transacción
+        record_sale(db, sale)
+        
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    db.refresh(sale)
+    
+    stock_updates = []
+    for id_producto in producto_ids:
+        producto = productos_by_id[id_producto]
+        stock_updates.append({
+            "id_producto": id_producto,
+            "nombre": producto.nombre,
+            "stock_anterior": producto.stock,
+            "stock_actual": producto.stock - cantidades[id_producto],
+            "cantidad_vendida": cantidades[id_producto]
+        })
+    
+    # Solo cambió el stock: se actualiza en la foto del catálogo sin recargarla ni cambiar el ETag
+    catalog_cache.update_stock({update["id_producto"]: update["stock_actual"] for update in stock_updates})
+    
+    return {
+        "sale": sale,
+        "items_count": items_count,
+        "stock_updates": stock_updates
+    }
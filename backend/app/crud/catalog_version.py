@@ -0,0 +1,42 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from ..models.catalog_version import CatalogoVersion
+
+# Única fila de tbl_catalogo_version
+CATALOG_VERSION_ID = 1
+
+def get_catalog_version(db: Session) -> Tuple[int, Optional[datetime]]:
+    """Versión compartida del catálogo y fecha (UTC) del último cambio; (0, None) si aún no hay fila"""
+    fila = db.execute(
+        select(CatalogoVersion.version, CatalogoVersion.fecha_cambio)
+        .where(CatalogoVersion.id_version == CATALOG_VERSION_ID)
+    ).first()
+    if fila is None:
+        return 0, None
+    return fila.version, fila.fecha_cambio
+
+def bump_catalog_version(db: Session) -> None:
+    """
+    Incrementa la versión compartida del catálogo.
+    Debe llamarse dentro de la transacción de la escritura, antes del commit:
+    así los demás workers ven la nueva versión junto con los datos nuevos.
+    """
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+    incrementar = update(CatalogoVersion).where(
+        CatalogoVersion.id_version == CATALOG_VERSION_ID
+    ).values(version=CatalogoVersion.version + 1, fecha_cambio=ahora)
+
+    if db.execute(incrementar).rowcount:
+        return
+    # Base creada con create_all: la fila se crea en la primera escritura
+    try:
+        with db.begin_nested():
+            db.execute(insert(CatalogoVersion).values(
+                id_version=CATALOG_VERSION_ID, version=1, fecha_cambio=ahora
+            ))
+    except IntegrityError:
+        # Otro worker la creó al mismo tiempo
+        db.execute(incrementar)
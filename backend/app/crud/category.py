@@ -2,11 +2,14 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from ..models.category import Categoria
 from ..schemas.category import CategoriaCreate, CategoriaUpdate
+from ..utils.catalog_cache import catalog_cache
+from .catalog_version import bump_catalog_version
+from ..utils.pagination import paginate_query
 from typing import List, Optional
 
-def get_categorias(db: Session, skip: int = 0, limit: int = 100) -> List[Categoria]:
+def get_categorias(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Categoria]:
     """Obtener todas las categorías con paginación"""
-    return db.query(Categoria).offset(skip).limit(limit).all()
+    return paginate_query(db.query(Categoria), Categoria.id_categoria, skip, limit, after_id)
 
 def get_categoria_by_id(db: Session, categoria_id: int) -> Optional[Categoria]:
     """Obtener una categoría por ID"""
@@ -20,7 +23,9 @@ def create_categoria(db: Session, categoria: CategoriaCreate) -> Categoria:
     """Crear una nueva categoría"""
     db_categoria = Categoria(**categoria.dict())
     db.add(db_categoria)
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_categoria)
     return db_categoria
 
@@ -34,7 +39,9 @@ def update_categoria(db: Session, categoria_id: int, categoria: CategoriaUpdate)
     for field, value in update_data.items():
         setattr(db_categoria, field, value)
     
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_categoria)
     return db_categoria
 
@@ -45,7 +52,9 @@ def delete_categoria(db: Session, categoria_id: int) -> bool:
         return False
     
     db.delete(db_categoria)
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     return True
 
 def get_categorias_count(db: Session) -> int:
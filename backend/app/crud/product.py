@@ -1,20 +1,39 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy import Float, and_, func, literal, or_
 from ..models.product import Producto
-from ..schemas.product import ProductoCreate, ProductoUpdate
-from typing import List, Optional
-
-def get_productos(db: Session, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Obtener todos los productos con paginación"""
-    return db.query(Producto).offset(skip).limit(limit).all()
-
-def get_productos_with_details(db: Session, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Obtener productos con detalles de categoría, subcategoría e IVA"""
-    return db.query(Producto).options(
-        joinedload(Producto.categoria),
-        joinedload(Producto.subcategoria),
-        joinedload(Producto.iva)
-    ).offset(skip).limit(limit).all()
+from ..models.category import Categoria
+from ..models.subcategory import Subcategoria
+from ..models.iva import Iva
+from ..schemas.product import ProductoCreate, ProductoFiltros, ProductoUpdate
+from ..utils.catalog_cache import catalog_cache
+from .catalog_version import bump_catalog_version
+from ..utils.pagination import paginate_query
+from .product_search import search_source, like_filter
+from sqlalchemy.engine import Row
+from typing import Any, List, Optional, Tuple
+
+# Columnas de los listados, en el orden de ProductoResponse / ProductoDetailResponse.
+# Se consultan filas (tuplas) en lugar de entidades: no se construyen objetos ORM por fila
+PRODUCTO_COLUMNAS = (
+    Producto.id_categoria,
+    Producto.id_subcategoria,
+    Producto.id_iva,
+    Producto.codigo,
+    Producto.marca,
+    Producto.nombre,
+    Producto.fecha_caducidad,
+    Producto.imagen,
+    Producto.valor,
+    Producto.stock,
+    Producto.estado,
+    Producto.id_producto
+)
+PRODUCTO_DETALLE_COLUMNAS = PRODUCTO_COLUMNAS + (
+    Categoria.nombre.label("categoria_nombre"),
+    Subcategoria.nombre.label("subcategoria_nombre"),
+    Iva.porcentaje.label("iva_porcentaje"),
+    Iva.descripcion.label("iva_descripcion")
+)
 
 def get_producto_by_id(db: Session, producto_id: int) -> Optional[Producto]:
     """Obtener un producto por ID"""
@@ -32,69 +51,108 @@ def get_producto_by_codigo(db: Session, codigo: str) -> Optional[Producto]:
     """Obtener un producto por código"""
     return db.query(Producto).filter(Producto.codigo == codigo).first()
 
-def get_productos_by_categoria(db: Session, categoria_id: int, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Obtener productos por categoría"""
-    return db.query(Producto).filter(Producto.id_categoria == categoria_id).offset(skip).limit(limit).all()
-
-def get_productos_by_categoria_with_details(db: Session, categoria_id: int, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Obtener productos por categoría con detalles"""
-    return db.query(Producto).options(
-        joinedload(Producto.categoria),
-        joinedload(Producto.subcategoria),
-        joinedload(Producto.iva)
-    ).filter(Producto.id_categoria == categoria_id).offset(skip).limit(limit).all()
-
-def get_productos_by_subcategoria(db: Session, subcategoria_id: int, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Obtener productos por subcategoría"""
-    return db.query(Producto).filter(Producto.id_subcategoria == subcategoria_id).offset(skip).limit(limit).all()
-
-def get_productos_by_subcategoria_with_details(db: Session, subcategoria_id: int, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Obtener productos por subcategoría con detalles"""
-    return db.query(Producto).options(
-        joinedload(Producto.categoria),
-        joinedload(Producto.subcategoria),
-        joinedload(Producto.iva)
-    ).filter(Producto.id_subcategoria == subcategoria_id).offset(skip).limit(limit).all()
-
-def get_productos_by_estado(db: Session, estado: str, skip: int = 0, limit: int = 100) -> List[Producto]:
+def get_productos_by_estado(db: Session, estado: str, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Producto]:
     """Obtener productos por estado"""
-    return db.query(Producto).filter(Producto.estado == estado).offset(skip).limit(limit).all()
-
-def get_productos_by_estado_with_details(db: Session, estado: str, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Obtener productos por estado con detalles"""
-    return db.query(Producto).options(
-        joinedload(Producto.categoria),
-        joinedload(Producto.subcategoria),
-        joinedload(Producto.iva)
-    ).filter(Producto.estado == estado).offset(skip).limit(limit).all()
-
-def search_productos(db: Session, search_term: str, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Buscar productos por nombre, marca o código"""
-    search_filter = f"%{search_term}%"
-    return db.query(Producto).filter(
-        (Producto.nombre.like(search_filter)) |
-        (Producto.marca.like(search_filter)) |
-        (Producto.codigo.like(search_filter))
-    ).offset(skip).limit(limit).all()
-
-def search_productos_with_details(db: Session, search_term: str, skip: int = 0, limit: int = 100) -> List[Producto]:
-    """Buscar productos por nombre, marca o código con detalles"""
-    search_filter = f"%{search_term}%"
-    return db.query(Producto).options(
-        joinedload(Producto.categoria),
-        joinedload(Producto.subcategoria),
-        joinedload(Producto.iva)
-    ).filter(
-        (Producto.nombre.like(search_filter)) |
-        (Producto.marca.like(search_filter)) |
-        (Producto.codigo.like(search_filter))
-    ).offset(skip).limit(limit).all()
+    return paginate_query(db.query(Producto).filter(Producto.estado == estado), Producto.id_producto, skip, limit, after_id)
+
+def build_productos_query(db: Session, filtros: ProductoFiltros, with_details: bool = False):
+    """
+    Consulta de productos con todos los filtros combinados en un solo WHERE.
+    Retorna la consulta de filas (columnas de PRODUCTO_COLUMNAS o, con detalles,
+    PRODUCTO_DETALLE_COLUMNAS, más score) y la expresión de score
+    (None si no hay búsqueda con índice de texto).
+    """
+    busqueda = search_source(db, filtros.search) if filtros.search else None
+    columnas = PRODUCTO_DETALLE_COLUMNAS if with_details else PRODUCTO_COLUMNAS
+
+    if busqueda is not None:
+        score = busqueda.c.score
+        query = db.query(*columnas, score.label("score")).select_from(Producto).join(
+            busqueda, busqueda.c.id_producto == Producto.id_producto
+        )
+    else:
+        score = None
+        query = db.query(*columnas, literal(0.0, Float).label("score")).select_from(Producto)
+        if filtros.search:
+            query = query.filter(like_filter(filtros.search))
+
+    if filtros.categoria_id:
+        query = query.filter(Producto.id_categoria == filtros.categoria_id)
+    if filtros.subcategoria_id:
+        query = query.filter(Producto.id_subcategoria == filtros.subcategoria_id)
+    if filtros.estado:
+        query = query.filter(Producto.estado == filtros.estado)
+    if filtros.precio_min is not None:
+        query = query.filter(Producto.valor >= filtros.precio_min)
+    if filtros.precio_max is not None:
+        query = query.filter(Producto.valor <= filtros.precio_max)
+    if filtros.en_stock:
+        query = query.filter(Producto.stock > 0)
+
+    if with_details:
+        query = query.outerjoin(Categoria, Categoria.id_categoria == Producto.id_categoria).outerjoin(
+            Subcategoria, Subcategoria.id_subcategoria == Producto.id_subcategoria
+        ).outerjoin(Iva, Iva.id_iva == Producto.id_iva)
+    return query, score
+
+def _orden_columnas(orden: str, score) -> List[Tuple[Any, bool]]:
+    """Columnas de orden (expresión, descendente) según el orden pedido, desempatando por ID"""
+    if orden == "nombre":
+        columnas = [(func.coalesce(Producto.nombre, ""), False)]
+    elif orden == "precio_asc":
+        columnas = [(func.coalesce(Producto.valor, 0), False)]
+    elif orden == "precio_desc":
+        columnas = [(func.coalesce(Producto.valor, 0), True)]
+    elif orden == "relevancia" and score is not None:
+        columnas = [(score, True)]
+    else:
+        # Sin índice de texto la relevancia es constante: solo cuenta el ID
+        columnas = []
+    return columnas + [(Producto.id_producto, False)]
+
+def _keyset_condition(columnas: List[Tuple[Any, bool]], valores: List[Any]):
+    """Filas estrictamente posteriores a valores en el orden de columnas"""
+    # Con relevancia constante el cursor trae un score que no se compara
+    valores = valores[len(valores) - len(columnas):]
+    condicion = None
+    for (columna, descendente), valor in reversed(list(zip(columnas, valores))):
+        posterior = columna < valor if descendente else columna > valor
+        condicion = posterior if condicion is None else or_(posterior, and_(columna == valor, condicion))
+    return condicion
+
+def get_productos_filtrados(
+    db: Session,
+    filtros: ProductoFiltros,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[List[Any]] = None,
+    with_details: bool = False
+) -> List[Row]:
+    """
+    Listado de productos con filtros combinados y orden configurable.
+    Retorna filas con las columnas del listado y score; con after pagina
+    por keyset sobre los valores de orden.
+    """
+    query, score = build_productos_query(db, filtros, with_details)
+    columnas = _orden_columnas(filtros.orden, score)
+    query = query.order_by(*[columna.desc() if descendente else columna for columna, descendente in columnas])
+
+    if after is not None:
+        return query.filter(_keyset_condition(columnas, after)).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+def get_productos_filtrados_count(db: Session, filtros: ProductoFiltros) -> int:
+    """Total de productos que cumplen los filtros combinados"""
+    query, _ = build_productos_query(db, filtros)
+    return query.with_entities(func.count(Producto.id_producto)).scalar()
 
 def create_producto(db: Session, producto: ProductoCreate) -> Producto:
     """Crear un nuevo producto"""
     db_producto = Producto(**producto.dict())
     db.add(db_producto)
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_producto)
     return db_producto
 
@@ -108,7 +166,9 @@ def update_producto(db: Session, producto_id: int, producto: ProductoUpdate) ->
     for field, value in update_data.items():
         setattr(db_producto, field, value)
     
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_producto)
     return db_producto
 
@@ -119,7 +179,9 @@ def delete_producto(db: Session, producto_id: int) -> bool:
         return False
     
     db.delete(db_producto)
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     return True
 
 def update_stock(db: Session, producto_id: int, cantidad: int) -> Optional[Producto]:
@@ -129,28 +191,8 @@ def update_stock(db: Session, producto_id: int, cantidad: int) -> Optional[Produ
         return None
     
     db_producto.stock = max(0, db_producto.stock + cantidad)
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_producto)
     return db_producto
-
-def get_productos_count(db: Session) -> int:
-    """Obtener el total de productos"""
-    return db.query(func.count(Producto.id_producto)).scalar()
-
-def get_productos_count_by_categoria(db: Session, categoria_id: int) -> int:
-    """Obtener el total de productos por categoría"""
-    return db.query(func.count(Producto.id_producto)).filter(
-        Producto.id_categoria == categoria_id
-    ).scalar()
-
-def get_productos_count_by_subcategoria(db: Session, subcategoria_id: int) -> int:
-    """Obtener el total de productos por subcategoría"""
-    return db.query(func.count(Producto.id_producto)).filter(
-        Producto.id_subcategoria == subcategoria_id
-    ).scalar()
-
-def get_productos_count_by_estado(db: Session, estado: str) -> int:
-    """Obtener el total de productos por estado"""
-    return db.query(func.count(Producto.id_producto)).filter(
-        Producto.estado == estado
-    ).scalar()
@@ -0,0 +1,108 @@
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import Float, Integer, or_, select, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.engine import Engine
+from ..models.product import Producto
+from ..utils.search_text import MIN_TOKEN_LENGTH, tokenize_search
+
+# Índice FULLTEXT (MySQL) y tabla FTS5 (SQLite) sobre nombre, marca y código
+FULLTEXT_INDEX = "tbl_producto_fulltext"
+FTS_TABLE = "tbl_producto_fts"
+
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        nombre, marca, codigo,
+        content='tbl_producto', content_rowid='id_producto',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tbl_producto BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, nombre, marca, codigo)
+        VALUES (new.id_producto, new.nombre, new.marca, new.codigo);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tbl_producto BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nombre, marca, codigo)
+        VALUES ('delete', old.id_producto, old.nombre, old.marca, old.codigo);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON tbl_producto BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nombre, marca, codigo)
+        VALUES ('delete', old.id_producto, old.nombre, old.marca, old.codigo);
+        INSERT INTO {FTS_TABLE}(rowid, nombre, marca, codigo)
+        VALUES (new.id_producto, new.nombre, new.marca, new.codigo);
+    END""",
+]
+
+def ensure_search_index(engine: Engine) -> None:
+    """
+    Crea la tabla FTS5 si no existe (bases SQLite creadas con create_all).
+    En MySQL el índice FULLTEXT lo crea solo la migración 006: crearlo al
+    arrancar bloquearía la tabla y los workers competirían por crearlo.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as connection:
+        existe = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+        ).first()
+        for ddl in SQLITE_FTS_DDL:
+            connection.execute(text(ddl))
+        if not existe:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def search_source(db: Session, search_term: str):
+    """
+    Subconsulta (id_producto, score) con los productos que coinciden.
+    Cada palabra del término debe coincidir como prefijo; mayor score = más relevante.
+    Retorna None si hay que usar LIKE (palabras cortas o motor sin índice de texto).
+    """
+    tokens = tokenize_search(search_term)
+    if not tokens or any(len(token) < MIN_TOKEN_LENGTH for token in tokens):
+        return None
+
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        # Modo booleano: +palabra* exige cada palabra como prefijo.
+        # La collation *_ci ignora tildes y mayúsculas.
+        relevancia = match(
+            Producto.nombre, Producto.marca, Producto.codigo,
+            against=" ".join(f"+{token}*" for token in tokens)
+        ).in_boolean_mode()
+        return select(
+            Producto.id_producto.label("id_producto"),
+            relevancia.label("score")
+        ).where(relevancia).subquery("busqueda")
+
+    if dialect == "sqlite":
+        # bm25() es menor cuanto más relevante: se invierte el signo
+        consulta = " ".join(f'"{token}"*' for token in tokens)
+        return text(
+            f"SELECT rowid AS id_producto, -bm25({FTS_TABLE}) AS score "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :consulta"
+        ).bindparams(consulta=consulta).columns(
+            id_producto=Integer,
+            score=Float
+        ).subquery("busqueda")
+
+    return None
+
+def search_scores(db: Session, search_term: str) -> Optional[Dict[int, float]]:
+    """
+    {id_producto: score} de los productos que coinciden según el índice de texto.
+    Retorna None si el término no puede usar el índice (ver search_source).
+    """
+    busqueda = search_source(db, search_term)
+    if busqueda is None:
+        return None
+    filas = db.execute(select(busqueda.c.id_producto, busqueda.c.score)).all()
+    return {id_producto: float(score or 0) for id_producto, score in filas}
+
+def like_filter(search_term: str):
+    """Filtro LIKE original sobre nombre, marca o código"""
+    search_filter = f"%{search_term}%"
+    return or_(
+        Producto.nombre.like(search_filter),
+        Producto.marca.like(search_filter),
+        Producto.codigo.like(search_filter)
+    )
@@ -0,0 +1,265 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from ..models.cart import Cart
+from ..models.sale import Sale
+from ..models.sales_rollup import VentaResumenDiario, VentaResumenDiarioTotal
+
+# Estados finales que se acumulan en el resumen diario, una fila por estado.
+# Los demás (PENDIENTE, etc.) cambian constantemente y siempre se leen en vivo.
+ROLLUP_ESTADOS = ("CONFIRMADO", "ABANDONADO")
+
+def _lineas_de_venta():
+    """Items del carrito que cuentan en la venta (no los que el cliente eliminó)"""
+    return Cart.estado != 'ELIMINADO'
+
+def get_rollup_cutoff() -> datetime:
+    """
+    Inicio del día actual (UTC). Los días anteriores se leen del resumen;
+    el día actual siempre se calcula desde tbl_venta.
+    """
+    return datetime.combine(datetime.now(timezone.utc).date(), time.min)
+
+def _upsert_add(db: Session, model, keys: Dict, increments: Dict) -> None:
+    """Inserta la fila o suma los incrementos si ya existe (atómico en la base de datos)"""
+    dialect = db.get_bind().dialect.name
+    values = {**keys, **increments}
+
+    if dialect == "mysql":
+        stmt = mysql_insert(model).values(**values)
+        stmt = stmt.on_duplicate_key_update({
+            column: getattr(model, column) + getattr(stmt.inserted, column)
+            for column in increments
+        })
+    else:
+        dialect_insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = dialect_insert(model).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                column: getattr(model, column) + getattr(stmt.excluded, column)
+                for column in increments
+            }
+        )
+
+    db.execute(stmt)
+
+def record_sale(db: Session, sale: Sale) -> None:
+    """
+    Suma una venta que acaba de pasar a un estado final (CONFIRMADO o
+    ABANDONADO) al resumen diario, por estado y por estado y producto.
+    Debe llamarse dentro de la misma transacción que cambia el estado,
+    antes del commit.
+    """
+    if sale.estado not in ROLLUP_ESTADOS:
+        return
+    fecha = sale.fecha_venta.date()
+
+    _upsert_add(
+        db,
+        VentaResumenDiarioTotal,
+        {"fecha": fecha, "estado": sale.estado},
+        {"ventas": 1, "total_venta": float(sale.total_venta or 0)}
+    )
+
+    lineas = db.query(
+        Cart.id_producto,
+        func.sum(Cart.cantidad),
+        func.sum(Cart.valor_unitario * Cart.cantidad),
+        func.sum(Cart.iva_calculado)
+    ).filter(
+        Cart.id_venta == sale.id_venta,
+        _lineas_de_venta()
+    ).group_by(Cart.id_producto).all()
+
+    for id_producto, unidades, bruto, iva in lineas:
+        _upsert_add(
+            db,
+            VentaResumenDiario,
+            {"fecha": fecha, "estado": sale.estado, "id_producto": id_producto},
+            {"unidades": int(unidades or 0), "bruto": float(bruto or 0), "iva": float(iva or 0)}
+        )
+
+def rebuild_rollup(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> None:
+    """
+    Recalcula el resumen diario desde tbl_venta/tbl_carrito para el rango
+    [start_date, end_date] (ambos incluidos; None = sin límite).
+    """
+    fecha = func.date(Sale.fecha_venta)
+
+    filters = [Sale.estado.in_(ROLLUP_ESTADOS)]
+    if start_date:
+        filters.append(Sale.fecha_venta >= datetime.combine(start_date, time.min))
+    if end_date:
+        filters.append(Sale.fecha_venta < datetime.combine(end_date + timedelta(days=1), time.min))
+
+    try:
+        for model in (VentaResumenDiario, VentaResumenDiarioTotal):
+            delete_query = db.query(model).filter(model.estado.in_(ROLLUP_ESTADOS))
+            if start_date:
+                delete_query = delete_query.filter(model.fecha >= start_date)
+            if end_date:
+                delete_query = delete_query.filter(model.fecha <= end_date)
+            delete_query.delete(synchronize_session=False)
+
+        db.execute(insert(VentaResumenDiarioTotal).from_select(
+            ["fecha", "estado", "ventas", "total_venta"],
+            select(
+                fecha,
+                Sale.estado,
+                func.count(Sale.id_venta),
+                func.coalesce(func.sum(Sale.total_venta), 0)
+            ).where(*filters).group_by(fecha, Sale.estado)
+        ))
+
+        db.execute(insert(VentaResumenDiario).from_select(
+            ["fecha", "estado", "id_producto", "unidades", "bruto", "iva"],
+            select(
+                fecha,
+                Sale.estado,
+                Cart.id_producto,
+                func.coalesce(func.sum(Cart.cantidad), 0),
+                func.coalesce(func.sum(Cart.valor_unitario * Cart.cantidad), 0),
+                func.coalesce(func.sum(Cart.iva_calculado), 0)
+            ).join(
+                Cart, Cart.id_venta == Sale.id_venta
+            ).where(
+                *filters,
+                _lineas_de_venta()
+            ).group_by(fecha, Sale.estado, Cart.id_producto)
+        ))
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def get_sales_totals_by_estado(
+    db: Session,
+    start_datetime: Optional[datetime] = None,
+    end_datetime: Optional[datetime] = None,
+    estados: Optional[List[str]] = None
+) -> Dict[Optional[str], Tuple[int, float]]:
+    """
+    Número de ventas y total vendido por estado en [start_datetime, end_datetime).
+    Los estados finales de días anteriores se leen del resumen diario;
+    el resto se agrega en vivo sobre tbl_venta.
+    """
+    cutoff = get_rollup_cutoff()
+
+    # Parte en vivo: estados no acumulados, o cualquier venta desde hoy
+    live_query = db.query(
+        Sale.estado,
+        func.count(Sale.id_venta),
+        func.coalesce(func.sum(Sale.total_venta), 0)
+    ).filter(or_(
+        Sale.estado.is_(None),
+        Sale.estado.notin_(ROLLUP_ESTADOS),
+        Sale.fecha_venta >= cutoff
+    ))
+    if start_datetime:
+        live_query = live_query.filter(Sale.fecha_venta >= start_datetime)
+    if end_datetime:
+        live_query = live_query.filter(Sale.fecha_venta < end_datetime)
+    if estados is not None:
+        live_query = live_query.filter(Sale.estado.in_(estados))
+
+    totals = {
+        estado: (cantidad, float(total))
+        for estado, cantidad, total in live_query.group_by(Sale.estado).all()
+    }
+
+    # Parte acumulada: días completos anteriores a hoy
+    rollup_end = min(end_datetime, cutoff) if end_datetime else cutoff
+    if start_datetime is None or start_datetime < rollup_end:
+        rollup_estados = [e for e in ROLLUP_ESTADOS if estados is None or e in estados]
+        rollup_query = db.query(
+            VentaResumenDiarioTotal.estado,
+            func.coalesce(func.sum(VentaResumenDiarioTotal.ventas), 0),
+            func.coalesce(func.sum(VentaResumenDiarioTotal.total_venta), 0)
+        ).filter(
+            VentaResumenDiarioTotal.estado.in_(rollup_estados),
+            VentaResumenDiarioTotal.fecha < rollup_end.date()
+        )
+        if start_datetime:
+            rollup_query = rollup_query.filter(VentaResumenDiarioTotal.fecha >= start_datetime.date())
+
+        for estado, cantidad, total in rollup_query.group_by(VentaResumenDiarioTotal.estado).all():
+            live_cantidad, live_total = totals.get(estado, (0, 0.0))
+            totals[estado] = (live_cantidad + int(cantidad), live_total + float(total))
+
+    return totals
+
+def get_sales_by_producto(
+    db: Session,
+    start_datetime: Optional[datetime] = None,
+    end_datetime: Optional[datetime] = None,
+    estados: Optional[List[str]] = None
+) -> Dict[Tuple[Optional[str], int], Tuple[int, float, float]]:
+    """
+    Unidades, valor bruto e IVA por (estado, producto) en [start_datetime, end_datetime).
+    Igual que get_sales_totals_by_estado: los estados finales de días
+    anteriores se leen del resumen por producto; el resto, en vivo.
+    """
+    cutoff = get_rollup_cutoff()
+
+    live_query = db.query(
+        Sale.estado,
+        Cart.id_producto,
+        func.coalesce(func.sum(Cart.cantidad), 0),
+        func.coalesce(func.sum(Cart.valor_unitario * Cart.cantidad), 0),
+        func.coalesce(func.sum(Cart.iva_calculado), 0)
+    ).join(
+        Cart, Cart.id_venta == Sale.id_venta
+    ).filter(
+        _lineas_de_venta(),
+        or_(
+            Sale.estado.is_(None),
+            Sale.estado.notin_(ROLLUP_ESTADOS),
+            Sale.fecha_venta >= cutoff
+        )
+    )
+    if start_datetime:
+        live_query = live_query.filter(Sale.fecha_venta >= start_datetime)
+    if end_datetime:
+        live_query = live_query.filter(Sale.fecha_venta < end_datetime)
+    if estados is not None:
+        live_query = live_query.filter(Sale.estado.in_(estados))
+
+    ventas = {
+        (estado, id_producto): (int(unidades), float(bruto), float(iva))
+        for estado, id_producto, unidades, bruto, iva
+        in live_query.group_by(Sale.estado, Cart.id_producto).all()
+    }
+
+    rollup_end = min(end_datetime, cutoff) if end_datetime else cutoff
+    if start_datetime is None or start_datetime < rollup_end:
+        rollup_estados = [e for e in ROLLUP_ESTADOS if estados is None or e in estados]
+        rollup_query = db.query(
+            VentaResumenDiario.estado,
+            VentaResumenDiario.id_producto,
+            func.coalesce(func.sum(VentaResumenDiario.unidades), 0),
+            func.coalesce(func.sum(VentaResumenDiario.bruto), 0),
+            func.coalesce(func.sum(VentaResumenDiario.iva), 0)
+        ).filter(
+            VentaResumenDiario.estado.in_(rollup_estados),
+            VentaResumenDiario.fecha < rollup_end.date()
+        )
+        if start_datetime:
+            rollup_query = rollup_query.filter(VentaResumenDiario.fecha >= start_datetime.date())
+
+        for estado, id_producto, unidades, bruto, iva in rollup_query.group_by(
+            VentaResumenDiario.estado, VentaResumenDiario.id_producto
+        ).all():
+            live_unidades, live_bruto, live_iva = ventas.get((estado, id_producto), (0, 0.0, 0.0))
+            ventas[(estado, id_producto)] = (
+                live_unidades + int(unidades),
+                live_bruto + float(bruto),
+                live_iva + float(iva)
+            )
+
+    return ventas
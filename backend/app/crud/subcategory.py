@@ -1,28 +1,44 @@
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
+from sqlalchemy.engine import Row
 from ..models.subcategory import Subcategoria
+from ..models.category import Categoria
 from ..schemas.subcategory import SubcategoriaCreate, SubcategoriaUpdate
+from ..utils.catalog_cache import catalog_cache
+from .catalog_version import bump_catalog_version
+from ..utils.pagination import paginate_query
 from typing import List, Optional
 
-def get_subcategorias(db: Session, skip: int = 0, limit: int = 100) -> List[Subcategoria]:
-    """Obtener todas las subcategorías con paginación"""
-    return db.query(Subcategoria).offset(skip).limit(limit).all()
+# Columnas de los listados, en el orden de SubcategoriaResponse / SubcategoriaDetailResponse
+SUBCATEGORIA_COLUMNAS = (
+    Subcategoria.id_categoria,
+    Subcategoria.nombre,
+    Subcategoria.descripcion,
+    Subcategoria.id_subcategoria
+)
+SUBCATEGORIA_DETALLE_COLUMNAS = SUBCATEGORIA_COLUMNAS + (Categoria.nombre.label("categoria_nombre"),)
 
-def get_subcategorias_with_details(db: Session, skip: int = 0, limit: int = 100) -> List[Subcategoria]:
-    """Obtener todas las subcategorías con detalles de categoría"""
-    return db.query(Subcategoria).options(
-        joinedload(Subcategoria.categoria)
-    ).offset(skip).limit(limit).all()
-
-def get_subcategorias_by_categoria(db: Session, categoria_id: int, skip: int = 0, limit: int = 100) -> List[Subcategoria]:
-    """Obtener subcategorías por categoría"""
-    return db.query(Subcategoria).filter(Subcategoria.id_categoria == categoria_id).offset(skip).limit(limit).all()
-
-def get_subcategorias_by_categoria_with_details(db: Session, categoria_id: int, skip: int = 0, limit: int = 100) -> List[Subcategoria]:
-    """Obtener subcategorías por categoría con detalles"""
-    return db.query(Subcategoria).options(
-        joinedload(Subcategoria.categoria)
-    ).filter(Subcategoria.id_categoria == categoria_id).offset(skip).limit(limit).all()
+def get_subcategorias_rows(
+    db: Session,
+    categoria_id: Optional[int] = None,
+    with_details: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None
+) -> List[Row]:
+    """
+    Filas (columnas, sin entidades ORM) de subcategorías para los listados,
+    opcionalmente de una categoría y con el nombre de la categoría
+    """
+    if with_details:
+        query = db.query(*SUBCATEGORIA_DETALLE_COLUMNAS).select_from(Subcategoria).outerjoin(
+            Categoria, Categoria.id_categoria == Subcategoria.id_categoria
+        )
+    else:
+        query = db.query(*SUBCATEGORIA_COLUMNAS)
+    if categoria_id:
+        query = query.filter(Subcategoria.id_categoria == categoria_id)
+    return paginate_query(query, Subcategoria.id_subcategoria, skip, limit, after_id)
 
 def get_subcategoria_by_id(db: Session, subcategoria_id: int) -> Optional[Subcategoria]:
     """Obtener una subcategoría por ID"""
@@ -45,7 +61,9 @@ def create_subcategoria(db: Session, subcategoria: SubcategoriaCreate) -> Subcat
     """Crear una nueva subcategoría"""
     db_subcategoria = Subcategoria(**subcategoria.dict())
     db.add(db_subcategoria)
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_subcategoria)
     return db_subcategoria
 
@@ -59,7 +77,9 @@ def update_subcategoria(db: Session, subcategoria_id: int, subcategoria: Subcate
     for field, value in update_data.items():
         setattr(db_subcategoria, field, value)
     
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_subcategoria)
     return db_subcategoria
 
@@ -70,7 +90,9 @@ def delete_subcategoria(db: Session, subcategoria_id: int) -> bool:
         return False
     
     db.delete(db_subcategoria)
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.invalidate()
     return True
 
 def get_subcategorias_count(db: Session) -> int:
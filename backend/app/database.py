@@ -1,14 +1,85 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from .utils.db_pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
+
+# Driver async equivalente a cada driver sync
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite"
+}
+
+def async_database_url(database_url: str) -> str:
+    """URL de DATABASE_URL con el driver async (aiomysql / aiosqlite)"""
+    url = make_url(database_url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+def split_pool_budget(total: int, share: float, minimum: int = 0) -> tuple:
+    """
+    Reparte un presupuesto de conexiones entre el motor sync y el async.
+    Devuelve (sync, async); la suma nunca supera total.
+    """
+    share = min(max(share, 0.0), 1.0)
+    async_part = round(total * share)
+    if total >= 2 * minimum:
+        async_part = min(max(async_part, minimum), total - minimum)
+    return total - async_part, async_part
+
+def pool_limits(is_async: bool) -> dict:
+    """
+    pool_size y max_overflow de un motor.
+    DB_POOL_SIZE y DB_MAX_OVERFLOW son el presupuesto del worker completo:
+    DB_ASYNC_POOL_SHARE indica la parte del motor async y el resto queda para el sync,
+    así que el máximo por worker es DB_POOL_SIZE + DB_MAX_OVERFLOW.
+    """
+    # pool_size=0 en QueuePool significa "sin límite": cada motor conserva al menos 1
+    size = split_pool_budget(settings.DB_POOL_SIZE, settings.DB_ASYNC_POOL_SHARE, minimum=1)
+    overflow = split_pool_budget(settings.DB_MAX_OVERFLOW, settings.DB_ASYNC_POOL_SHARE)
+    index = 1 if is_async else 0
+    return {"pool_size": max(size[index], 1), "max_overflow": overflow[index]}
+
+def engine_options(database_url: str, poolclass=TimedQueuePool, is_async: bool = False) -> dict:
+    """
+    Opciones del pool de conexiones según Settings.
+    pool_pre_ping descarta conexiones cerradas por el servidor (wait_timeout de MySQL)
+    y pool_recycle las renueva antes de que eso ocurra.
+    """
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE
+    }
+    url = make_url(database_url)
+    # SQLite en memoria usa un pool de una sola conexión
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options.update({
+            "poolclass": poolclass,
+            **pool_limits(is_async),
+            "pool_timeout": settings.DB_POOL_TIMEOUT
+        })
+    return options
 
 # Crear motor de base de datos
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 
 # Crear sesión local
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor y sesión async: las consultas no bloquean el event loop.
+# Tiene su propio pool, con su parte del presupuesto DB_POOL_SIZE + DB_MAX_OVERFLOW.
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool, is_async=True)
+)
+# expire_on_commit=False: los objetos siguen legibles después del commit sin otra consulta
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Crear base para modelos
 Base = declarative_base()
 
@@ -19,3 +90,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Sesión async para endpoints async def.
+# El código de crud (sync) se ejecuta con await db.run_sync(funcion, *args)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -6,5 +6,8 @@ from .product import Producto
 from .iva import Iva
 from .sale import Sale
 from .cart import Cart
+from .sales_rollup import VentaResumenDiario, VentaResumenDiarioTotal
+from .refresh_token import RefreshToken
+from .catalog_version import CatalogoVersion
 
-__all__ = ["Base", "Perfil", "Persona", "Usuario", "Categoria", "Subcategoria", "Producto", "Iva", "Sale", "Cart"]
+__all__ = ["Base", "Perfil", "Persona", "Usuario", "Categoria", "Subcategoria", "Producto", "Iva", "Sale", "Cart", "VentaResumenDiario", "VentaResumenDiarioTotal", "RefreshToken", "CatalogoVersion"]
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, String as SQLString
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index, String as SQLString
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
 
 class Cart(Base):
     __tablename__ = "tbl_carrito"
+    __table_args__ = (
+        Index("tbl_carrito_index_3", "estado"),
+        Index("tbl_carrito_index_venta_estado", "id_venta", "estado"),
+    )
     
     id_carrito = Column(Integer, primary_key=True, index=True)
     id_venta = Column(Integer, ForeignKey("tbl_venta.id_venta"), nullable=True)
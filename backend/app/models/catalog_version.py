@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, DateTime
+from ..database import Base
+
+class CatalogoVersion(Base):
+    """Versión del catálogo público, compartida entre workers (una sola fila, id_version = 1)"""
+    __tablename__ = "tbl_catalogo_version"
+    
+    id_version = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+    fecha_cambio = Column(DateTime, nullable=True)  # UTC
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Numeric, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Numeric, Text, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 class Producto(Base):
     __tablename__ = "tbl_producto"
+    __table_args__ = (
+        Index("tbl_producto_index_2", "estado"),
+        Index("tbl_producto_index_estado_categoria", "estado", "id_categoria"),
+        Index("tbl_producto_index_estado_subcategoria", "estado", "id_subcategoria"),
+    )
     
     id_producto = Column(Integer, primary_key=True, index=True)
     id_categoria = Column(Integer, ForeignKey("tbl_categoria.id_categoria"), nullable=False)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, DateTime, Index, String as SQLString
+from ..database import Base
+
+class RefreshToken(Base):
+    """Refresh tokens vigentes, compartidos entre workers (se guarda el SHA-256 del token)"""
+    __tablename__ = "tbl_refresh_token"
+    __table_args__ = (
+        Index("tbl_refresh_token_index_expira", "fecha_expiracion"),
+    )
+    
+    token_hash = Column(SQLString(64), primary_key=True)
+    id_usuario = Column(Integer, nullable=True)
+    fecha_expiracion = Column(DateTime, nullable=False)
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, String as SQLString
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index, String as SQLString
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
 
 class Sale(Base):
     __tablename__ = "tbl_venta"
+    __table_args__ = (
+        Index("tbl_venta_index_4", "estado"),
+        Index("tbl_venta_index_estado_fecha", "estado", "fecha_venta"),
+        Index("tbl_venta_index_usuario_estado_fecha", "id_usuario", "estado", "fecha_venta"),
+    )
     
     id_venta = Column(Integer, primary_key=True, index=True)
     id_usuario = Column(Integer, ForeignKey("tbl_usuario.id_usuario"), nullable=True)
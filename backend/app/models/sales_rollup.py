@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, Float, Date, String as SQLString
+from ..database import Base
+
+class VentaResumenDiario(Base):
+    """Resumen diario de ventas por estado y producto (unidades, valor bruto e IVA)"""
+    __tablename__ = "tbl_venta_resumen_diario"
+    
+    fecha = Column(Date, primary_key=True)
+    estado = Column(SQLString(50), primary_key=True)
+    id_producto = Column(Integer, primary_key=True)
+    unidades = Column(Integer, nullable=False, default=0)
+    bruto = Column(Float, nullable=False, default=0)
+    iva = Column(Float, nullable=False, default=0)
+
+class VentaResumenDiarioTotal(Base):
+    """Resumen diario de ventas por estado (número de ventas y total vendido)"""
+    __tablename__ = "tbl_venta_resumen_diario_total"
+    
+    fecha = Column(Date, primary_key=True)
+    estado = Column(SQLString(50), primary_key=True)
+    ventas = Column(Integer, nullable=False, default=0)
+    total_venta = Column(Float, nullable=False, default=0)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.database import async_engine, engine
+from app.schemas.auth import Principal
+from app.utils.auth import get_current_principal
+from app.utils.compression import compression_cache
+from app.utils.db_pool import pool_metrics
+from app.utils.password_hashing import password_hasher
+
+router = APIRouter(prefix="/admin", tags=["administración"])
+
+def require_admin(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    """Verifica que el usuario sea administrador"""
+    if current_user.profile != "Administrador":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los administradores pueden acceder a las métricas"
+        )
+    return current_user
+
+@router.get("/metrics/password-hashing")
+def get_password_hashing_metrics(current_user: Principal = Depends(require_admin)):
+    """
+    Métricas del pool de hashing de contraseñas (bcrypt):
+    tareas en ejecución y en cola, rechazadas por cola llena y tiempos promedio
+    """
+    return password_hasher.metrics()
+
+@router.get("/metrics/db-pool")
+def get_db_pool_metrics(current_user: Principal = Depends(require_admin)):
+    """
+    Métricas de los pools de conexiones de la base de datos (motor sync y async):
+    conexiones en uso, libres y de overflow, timeouts y espera del checkout
+    """
+    return {
+        "sync": pool_metrics(engine),
+        "async": pool_metrics(async_engine.sync_engine)
+    }
+
+@router.get("/metrics/compression")
+def get_compression_metrics(current_user: Principal = Depends(require_admin)):
+    """
+    Métricas de la caché de respuestas comprimidas:
+    entradas, bytes guardados, aciertos y fallos, codificaciones disponibles
+    """
+    return compression_cache.metrics()
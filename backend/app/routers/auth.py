@@ -1,19 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas.auth import (
     LoginRequest, LoginResponse, RefreshTokenRequest, 
-    RefreshTokenResponse, LogoutRequest, LogoutResponse, UserResponse,
+    RefreshTokenResponse, LogoutRequest, LogoutResponse,
     RegisterRequest, RegisterResponse
 )
-from app.crud.auth import authenticate_user, get_user_by_id, create_user, get_user_by_email
+from app.crud.auth import get_user_data, create_user, get_user_by_email, get_perfil_id, update_password_hash
 from app.utils.auth import (
     create_access_token, create_refresh_token, 
-    get_current_user, refresh_access_token, revoke_refresh_token
+    refresh_access_token, revoke_refresh_token
 )
-from app.models.user import Perfil
-from typing import Dict, Any
+from app.utils.password_hashing import password_hasher
 
 # Esquema de seguridad para extraer el token
 security = HTTPBearer()
@@ -21,20 +21,32 @@ security = HTTPBearer()
 router = APIRouter(prefix="/auth", tags=["autenticación"])
 
 @router.post("/login", response_model=LoginResponse)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint para iniciar sesión
+    bcrypt corre en el pool de hashing y las consultas en la sesión async,
+    así una ráfaga de logins no bloquea a los demás endpoints
     """
     # Autenticar usuario
-    user_data = authenticate_user(db, login_data.email, login_data.password)
+    # Una consulta: usuario con su persona (el perfil sale de la caché de perfiles)
+    user = await db.run_sync(get_user_by_email, login_data.email)
+    user_data = await db.run_sync(get_user_data, user) if user else None
+    hashed_password = user.password if user else None
+    # Liberar la conexión mientras se espera a bcrypt, para no agotar el pool de la base de datos
+    await db.rollback()
     
-    if not user_data:
+    if not user_data or not await password_hasher.verify(login_data.password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Actualizar el hash si se cambió BCRYPT_ROUNDS
+    if password_hasher.needs_rehash(hashed_password):
+        nuevo_hash = await password_hasher.hash(login_data.password)
+        await db.run_sync(update_password_hash, user, nuevo_hash)
+    
     # Verificar que user_data tenga todos los campos necesarios
     required_fields = ["user_id", "email", "profile", "person_name", "person_data"]
     for field in required_fields:
@@ -46,7 +58,8 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     
     # Crear tokens
     access_token = create_access_token(data=user_data)
-    refresh_token = create_refresh_token(data=user_data)
+    # Registrar el refresh token puede consultar la base de datos (REFRESH_TOKEN_STORE=sql): fuera del event loop
+    refresh_token = await run_in_threadpool(create_refresh_token, user_data)
     
     return LoginResponse(
         access_token=access_token,
@@ -135,7 +148,7 @@ def get_current_user_info(
         )
 
 @router.post("/register", response_model=RegisterResponse)
-def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
+async def register(register_data: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint para registro de nueva persona y usuario
     Crea automáticamente:
@@ -146,16 +159,16 @@ def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
     """
     try:
         # Verificar si el email ya existe
-        existing_user = get_user_by_email(db, register_data.email)
+        existing_user = await db.run_sync(get_user_by_email, register_data.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="El email ya está registrado"
             )
         
-        # Obtener el perfil Cliente (ID 3)
-        perfil_cliente = db.query(Perfil).filter(Perfil.nombre == "Cliente").first()
-        if not perfil_cliente:
+        # Obtener el perfil Cliente (ID 3), desde la caché de perfiles
+        id_perfil_cliente = await db.run_sync(get_perfil_id, "Cliente")
+        if not id_perfil_cliente:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Perfil Cliente no encontrado en la base de datos"
@@ -171,12 +184,15 @@ def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
             "direccion": register_data.direccion,
             "telefono": register_data.telefono,
             "email": register_data.email,
-            "id_perfil": perfil_cliente.id_perfil,
+            "id_perfil": id_perfil_cliente,
             "password": register_data.identificacion  # Password = número de identificación
         }
         
         # Crear usuario (esto crea tanto persona como usuario)
-        created_user = create_user(db, user_data)
+        # Liberar la conexión mientras se espera a bcrypt
+        await db.rollback()
+        hashed_password = await password_hasher.hash(user_data["password"])
+        created_user = await db.run_sync(create_user, user_data, hashed_password)
         
         if not created_user:
             raise HTTPException(
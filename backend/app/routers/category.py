@@ -1,34 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import Optional
 from ..database import get_db
 from ..crud import category as crud_category
 from ..schemas.category import CategoriaCreate, CategoriaUpdate, CategoriaResponse, CategoriaListResponse
-from ..utils.auth import get_current_user
+from ..utils.auth import get_current_principal
+from ..schemas.auth import Principal
+from ..utils.catalog_cache import catalog_counts
+from ..utils.pagination import decode_id_cursor, keyset_page
+from ..utils.http_cache import catalog_http_cache
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
 # ===== ENDPOINTS PÚBLICOS (SIN AUTENTICACIÓN) =====
 
-@router.get("/public", response_model=CategoriaListResponse)
+@router.get("/public", response_model=CategoriaListResponse, dependencies=[Depends(catalog_http_cache)])
 def get_categorias_publicas(
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (next_cursor); reemplaza a skip"),
+    include_total: bool = Query(True, description="Si es False, no se calcula el total"),
     db: Session = Depends(get_db)
 ):
     """
-    Obtener todas las categorías con paginación.
+    Obtener todas las categorías con paginación (skip o cursor after).
     NO requiere autenticación.
     """
-    categorias = crud_category.get_categorias(db, skip=skip, limit=limit)
-    total = crud_category.get_categorias_count(db)
+    categorias = crud_category.get_categorias(db, skip=skip, limit=limit + 1, after_id=decode_id_cursor(after))
+    categorias, next_cursor = keyset_page(categorias, limit, lambda c: [c.id_categoria])
+    total = catalog_counts.get(("categorias",), lambda: crud_category.get_categorias_count(db)) if include_total else None
     
     return CategoriaListResponse(
         categorias=categorias,
-        total=total
+        total=total,
+        next_cursor=next_cursor
     )
 
-@router.get("/public/{categoria_id}", response_model=CategoriaResponse)
+@router.get("/public/{categoria_id}", response_model=CategoriaResponse, dependencies=[Depends(catalog_http_cache)])
 def get_categoria_publica(
     categoria_id: int,
     db: Session = Depends(get_db)
@@ -49,26 +57,30 @@ def get_categoria_publica(
 def get_categorias(
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (next_cursor); reemplaza a skip"),
+    include_total: bool = Query(True, description="Si es False, no se calcula el total"),
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
-    Obtener todas las categorías con paginación.
+    Obtener todas las categorías con paginación (skip o cursor after).
     Requiere autenticación.
     """
-    categorias = crud_category.get_categorias(db, skip=skip, limit=limit)
-    total = crud_category.get_categorias_count(db)
+    categorias = crud_category.get_categorias(db, skip=skip, limit=limit + 1, after_id=decode_id_cursor(after))
+    categorias, next_cursor = keyset_page(categorias, limit, lambda c: [c.id_categoria])
+    total = catalog_counts.get(("categorias",), lambda: crud_category.get_categorias_count(db)) if include_total else None
     
     return CategoriaListResponse(
         categorias=categorias,
-        total=total
+        total=total,
+        next_cursor=next_cursor
     )
 
 @router.get("/{categoria_id}", response_model=CategoriaResponse)
 def get_categoria(
     categoria_id: int,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Obtener una categoría específica por ID.
@@ -84,14 +96,14 @@ def get_categoria(
 def create_categoria(
     categoria: CategoriaCreate,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Crear una nueva categoría.
     Requiere autenticación y perfil de Administrador.
     """
     # Verificar que el usuario sea administrador
-    if current_user.get("profile") != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador")
     
     # Verificar si ya existe una categoría con el mismo nombre
@@ -106,14 +118,14 @@ def update_categoria(
     categoria_id: int,
     categoria: CategoriaUpdate,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Actualizar una categoría existente.
     Requiere autenticación y perfil de Administrador.
     """
     # Verificar que el usuario sea administrador
-    if current_user.get("profile") != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador")
     
     # Verificar si la categoría existe
@@ -137,14 +149,14 @@ def update_categoria(
 def delete_categoria(
     categoria_id: int,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Eliminar una categoría.
     Requiere autenticación y perfil de Administrador.
     """
     # Verificar que el usuario sea administrador
-    if current_user.get("profile") != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador")
     
     # Verificar si la categoría existe
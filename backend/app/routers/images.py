@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from ..utils.image_derivatives import DERIVATIVE_NAME, IMMUTABLE_CACHE_CONTROL, MEDIA_TYPES, image_derivatives
+
+router = APIRouter(prefix="/images", tags=["imágenes"])
+
+@router.get("/products/{nombre}")
+def get_product_image(nombre: str):
+    """
+    Versión redimensionada (AVIF/WebP) de una imagen de producto.
+    Las URLs salen del srcset de los productos (imagen_srcset); la primera
+    petición genera el archivo y las siguientes lo sirven desde disco.
+    El nombre incluye el hash del original, así que la respuesta es inmutable.
+    """
+    partes = DERIVATIVE_NAME.fullmatch(nombre)
+    ruta = None
+    if partes:
+        ruta = image_derivatives.get_or_create(partes["hash"], int(partes["width"]), partes["format"])
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    return FileResponse(
+        ruta,
+        media_type=MEDIA_TYPES[partes["format"]],
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-from ..database import get_db
+from typing import List, Optional
+from decimal import Decimal
+from ..database import get_async_db, get_db
 from ..crud import product as crud_product
 from ..crud import category as crud_category
 from ..crud import subcategory as crud_subcategory
-from ..schemas.product import ProductoCreate, ProductoUpdate, ProductoResponse, ProductoListResponse, ProductoDetailResponse, ProductoDetailListResponse
-from ..utils.auth import get_current_user
-from ..utils.image_helper import parse_product_images
+from ..crud.product_search import search_scores
+from ..schemas.product import ProductoCreate, ProductoUpdate, ProductoResponse, ProductoDetailResponse, ProductoDetailListResponse, ProductoSugerencia, ProductoFiltros, ProductoFacetasResponse
+from ..utils.auth import get_current_principal
+from ..schemas.auth import Principal
+from ..utils.catalog_cache import catalog_cache, catalog_counts
+from ..utils.typeahead import typeahead
+from ..utils.pagination import encode_cursor, keyset_page
+from ..utils.product_filters import ORDEN_PATTERN, decode_producto_cursor, producto_sort_key, producto_sort_values
+from ..utils.http_cache import catalog_http_cache
+from ..utils.json_response import FastJSONResponse, list_response, row_dicts
 
 router = APIRouter(prefix="/products", tags=["products"])
 
@@ -21,13 +30,13 @@ def test_endpoint():
     return {"message": "Router de productos funcionando correctamente", "status": "success"}
 
 @router.get("/public-simple")
-def get_productos_publicos_simple(db: Session = Depends(get_db)):
+async def get_productos_publicos_simple(db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint público simple para probar la conexión
     """
     try:
         # Obtener solo productos activos de forma simple
-        productos = crud_product.get_productos_by_estado(db, "ACTIVO", skip=0, limit=50)
+        productos = await db.run_sync(crud_product.get_productos_by_estado, "ACTIVO", skip=0, limit=50)
         
         # Convertir a formato simple
         productos_simple = []
@@ -58,13 +67,13 @@ def get_productos_publicos_simple(db: Session = Depends(get_db)):
         }
 
 @router.get("/public-sin-iva")
-def get_productos_sin_iva(db: Session = Depends(get_db)):
+async def get_productos_sin_iva(db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint público para obtener productos sin IVA (id_iva = 1)
     """
     try:
         # Obtener productos sin IVA (id_iva = 1) que estén activos
-        productos = crud_product.get_productos_by_estado(db, "ACTIVO", skip=0, limit=100)
+        productos = await db.run_sync(crud_product.get_productos_by_estado, "ACTIVO", skip=0, limit=100)
         
         # Filtrar solo los que tienen id_iva = 1
         productos_sin_iva = [p for p in productos if p.id_iva == 1]
@@ -97,93 +106,142 @@ def get_productos_sin_iva(db: Session = Depends(get_db)):
             "message": "Error al obtener productos sin IVA"
         }
 
-@router.get("/public", response_model=ProductoDetailListResponse)
-def get_productos_publicos(
+@router.get("/public", response_model=ProductoDetailListResponse, dependencies=[Depends(catalog_http_cache)])
+async def get_productos_publicos(
+    response: Response,
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (next_cursor); reemplaza a skip"),
+    include_total: bool = Query(True, description="Si es False, no se calcula el total"),
     categoria_id: int = Query(None, description="Filtrar por ID de categoría"),
     subcategoria_id: int = Query(None, description="Filtrar por ID de subcategoría"),
     estado: str = Query("ACTIVO", description="Filtrar por estado"),
     search: str = Query(None, description="Buscar por nombre, marca o código"),
-    db: Session = Depends(get_db)
+    precio_min: Optional[Decimal] = Query(None, ge=0, description="Precio mínimo"),
+    precio_max: Optional[Decimal] = Query(None, ge=0, description="Precio máximo"),
+    en_stock: bool = Query(False, description="Si es True, solo productos con stock"),
+    orden: Optional[str] = Query(None, pattern=ORDEN_PATTERN, description="id, nombre, precio_asc, precio_desc o relevancia"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Obtener productos públicos (solo ACTIVOS) con paginación y filtros opcionales.
+    Obtener productos públicos (solo ACTIVOS) con paginación (skip o cursor after) y filtros opcionales.
+    Los filtros se combinan entre sí (categoría, subcategoría, estado, búsqueda, precio, stock).
     Siempre incluye detalles de categoría, subcategoría e IVA.
+    Se sirve desde la caché en memoria del catálogo; la búsqueda consulta el índice de texto.
     NO requiere autenticación.
     """
-    if categoria_id:
-        # Verificar que la categoría existe
-        categoria = crud_category.get_categoria_by_id(db, categoria_id)
-        if not categoria:
-            raise HTTPException(status_code=404, detail="Categoría no encontrada")
-        
-        productos = crud_product.get_productos_by_categoria_with_details(db, categoria_id, skip=skip, limit=limit)
-        total = crud_product.get_productos_count_by_categoria(db, categoria_id)
-    elif subcategoria_id:
-        # Verificar que la subcategoría existe
-        subcategoria = crud_subcategory.get_subcategoria_by_id(db, subcategoria_id)
-        if not subcategoria:
-            raise HTTPException(status_code=404, detail="Subcategoría no encontrada")
-        
-        productos = crud_product.get_productos_by_subcategoria_with_details(db, subcategoria_id, skip=skip, limit=limit)
-        total = crud_product.get_productos_count_by_subcategoria(db, subcategoria_id)
-    elif estado:
-        productos = crud_product.get_productos_by_estado_with_details(db, estado, skip=skip, limit=limit)
-        total = crud_product.get_productos_count_by_estado(db, estado)
-    elif search:
-        productos = crud_product.search_productos_with_details(db, search, skip=skip, limit=limit)
-        total = len(productos)  # Para búsquedas, el total es la cantidad encontrada
-    else:
-        productos = crud_product.get_productos_with_details(db, skip=skip, limit=limit)
-        total = crud_product.get_productos_count(db)
+    catalogo = await catalog_cache.get_async(db)
     
-    # Convertir a respuesta con detalles
-    productos_with_details = []
-    for producto in productos:
-        # Procesar imágenes del producto
-        imagenes_procesadas = parse_product_images(producto.imagen)
-        
-        response_data = {
-            **producto.__dict__,
-            "categoria_nombre": producto.categoria.nombre if producto.categoria else None,
-            "subcategoria_nombre": producto.subcategoria.nombre if producto.subcategoria else None,
-            "iva_descripcion": producto.iva.descripcion if producto.iva else None,
-            "iva_porcentaje": float(producto.iva.porcentaje) if producto.iva and producto.iva.porcentaje else 0.0,
-            "imagen_principal": imagenes_procesadas["principal"],
-            "imagen_galeria": imagenes_procesadas["galeria"]
-        }
-        productos_with_details.append(ProductoDetailResponse(**response_data))
+    # Verificar que la categoría y la subcategoría existen
+    if categoria_id and not catalogo.has_categoria(categoria_id):
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    if subcategoria_id and not catalogo.has_subcategoria(subcategoria_id):
+        raise HTTPException(status_code=404, detail="Subcategoría no encontrada")
+    
+    filtros = ProductoFiltros(
+        categoria_id=categoria_id,
+        subcategoria_id=subcategoria_id,
+        estado=estado,
+        search=search,
+        precio_min=precio_min,
+        precio_max=precio_max,
+        en_stock=en_stock,
+        orden=orden
+    )
+    # La búsqueda usa el índice FULLTEXT / FTS5; los productos salen de la foto
+    scores = await db.run_sync(search_scores, search) if search else None
+    filas = catalogo.filter(filtros, scores)
+    total = len(filas) if include_total else None
+    
+    def valores(fila):
+        return producto_sort_values(fila[0], filtros.orden, fila[1])
+    
+    # El cursor son los valores de orden del último producto de la página
+    cursor = decode_producto_cursor(after, filtros.orden)
+    if cursor is not None:
+        clave = producto_sort_key(cursor, filtros.orden)
+        filas = [fila for fila in filas if producto_sort_key(valores(fila), filtros.orden) > clave]
+        skip = 0
+    pagina = filas[skip:skip + limit]
+    next_cursor = encode_cursor(valores(pagina[-1])) if len(filas) > skip + limit else None
+    
+    # Productos ya serializados en la foto del catálogo
+    return list_response(
+        "productos",
+        [catalogo.productos_json[producto.id_producto] for producto, _ in pagina],
+        total,
+        next_cursor,
+        headers=response.headers
+    )
+
+@router.get("/public/facets", response_model=ProductoFacetasResponse, dependencies=[Depends(catalog_http_cache)])
+async def get_facetas_publicas(
+    categoria_id: int = Query(None, description="Filtrar por ID de categoría"),
+    subcategoria_id: int = Query(None, description="Filtrar por ID de subcategoría"),
+    estado: str = Query("ACTIVO", description="Filtrar por estado"),
+    search: str = Query(None, description="Buscar por nombre, marca o código"),
+    precio_min: Optional[Decimal] = Query(None, ge=0, description="Precio mínimo"),
+    precio_max: Optional[Decimal] = Query(None, ge=0, description="Precio máximo"),
+    en_stock: bool = Query(False, description="Si es True, solo productos con stock"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Conteos de productos por categoría, subcategoría, marca e IVA para los
+    filtros actuales (los mismos de /public), en una sola petición.
+    Se sirve desde la caché en memoria del catálogo.
+    NO requiere autenticación.
+    """
+    catalogo = await catalog_cache.get_async(db)
     
-    return ProductoDetailListResponse(
-        productos=productos_with_details,
-        total=total
+    # Verificar que la categoría y la subcategoría existen
+    if categoria_id and not catalogo.has_categoria(categoria_id):
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    if subcategoria_id and not catalogo.has_subcategoria(subcategoria_id):
+        raise HTTPException(status_code=404, detail="Subcategoría no encontrada")
+    
+    filtros = ProductoFiltros(
+        categoria_id=categoria_id,
+        subcategoria_id=subcategoria_id,
+        estado=estado,
+        search=search,
+        precio_min=precio_min,
+        precio_max=precio_max,
+        en_stock=en_stock
     )
+    scores = await db.run_sync(search_scores, search) if search else None
+    return ProductoFacetasResponse(**catalogo.facets(filtros, scores))
 
-@router.get("/public/{producto_id}", response_model=ProductoDetailResponse)
-def get_producto_publico(
+@router.get("/public/{producto_id}", response_model=ProductoDetailResponse, dependencies=[Depends(catalog_http_cache)])
+async def get_producto_publico(
     producto_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtener un producto público por ID.
     Siempre incluye detalles de categoría, subcategoría e IVA.
+    Se sirve desde la caché en memoria del catálogo.
     NO requiere autenticación.
     """
-    producto = crud_product.get_producto_by_id_with_details(db, producto_id)
+    producto = (await catalog_cache.get_async(db)).productos_json.get(producto_id)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
-    # Crear respuesta con detalles
-    response_data = {
-        **producto.__dict__,
-        "categoria_nombre": producto.categoria.nombre if producto.categoria else None,
-        "subcategoria_nombre": producto.subcategoria.nombre if producto.subcategoria else None,
-        "iva_descripcion": producto.iva.descripcion if producto.iva else None,
-        "iva_porcentaje": float(producto.iva.porcentaje) if producto.iva and producto.iva.porcentaje else 0.0
-    }
-    
-    return ProductoDetailResponse(**response_data)
+    return FastJSONResponse(producto, headers=response.headers)
+
+@router.get("/suggest", response_model=List[ProductoSugerencia])
+async def get_sugerencias(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto escrito en el buscador"),
+    limit: int = Query(10, ge=1, le=50, description="Número máximo de sugerencias"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Autocompletado del buscador de la tienda (solo productos ACTIVOS).
+    Busca por prefijo en nombre, marca y código, sin distinguir tildes ni
+    mayúsculas, y tolera errores de tipeo. Se sirve desde un índice en memoria.
+    NO requiere autenticación.
+    """
+    return (await typeahead.get_async(db)).suggest(q, limit)
 
 # ===== ENDPOINTS PRIVADOS (CON AUTENTICACIÓN) =====
 
@@ -191,107 +249,73 @@ def get_producto_publico(
 def get_productos(
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (next_cursor); reemplaza a skip"),
+    include_total: bool = Query(True, description="Si es False, no se calcula el total"),
     categoria_id: int = Query(None, description="Filtrar por ID de categoría"),
     subcategoria_id: int = Query(None, description="Filtrar por ID de subcategoría"),
     estado: str = Query(None, description="Filtrar por estado"),
     search: str = Query(None, description="Buscar por nombre, marca o código"),
+    precio_min: Optional[Decimal] = Query(None, ge=0, description="Precio mínimo"),
+    precio_max: Optional[Decimal] = Query(None, ge=0, description="Precio máximo"),
+    en_stock: bool = Query(False, description="Si es True, solo productos con stock"),
+    orden: Optional[str] = Query(None, pattern=ORDEN_PATTERN, description="id, nombre, precio_asc, precio_desc o relevancia"),
     basic: bool = Query(False, description="Si es True, devuelve solo datos básicos sin detalles de relaciones"),
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
-    Obtener todos los productos con paginación y filtros opcionales.
+    Obtener todos los productos con paginación (skip o cursor after) y filtros opcionales.
+    Los filtros se combinan entre sí y se resuelven en una consulta de datos y una de total.
     Por defecto incluye detalles de categoría, subcategoría e IVA.
     Requiere autenticación.
     """
+    if categoria_id:
+        # Verificar que la categoría existe
+        categoria = crud_category.get_categoria_by_id(db, categoria_id)
+        if not categoria:
+            raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    if subcategoria_id:
+        # Verificar que la subcategoría existe
+        subcategoria = crud_subcategory.get_subcategoria_by_id(db, subcategoria_id)
+        if not subcategoria:
+            raise HTTPException(status_code=404, detail="Subcategoría no encontrada")
+    
+    filtros = ProductoFiltros(
+        categoria_id=categoria_id,
+        subcategoria_id=subcategoria_id,
+        estado=estado,
+        search=search,
+        precio_min=precio_min,
+        precio_max=precio_max,
+        en_stock=en_stock,
+        orden=orden
+    )
+    
+    # El cursor son los valores de orden del último producto (p. ej. precio e ID)
+    filas = crud_product.get_productos_filtrados(
+        db, filtros, skip=skip, limit=limit + 1,
+        after=decode_producto_cursor(after, filtros.orden),
+        with_details=not basic
+    )
+    filas, next_cursor = keyset_page(filas, limit, lambda fila: producto_sort_values(fila, filtros.orden, fila.score))
+    total = catalog_counts.get(
+        ("productos", filtros.cache_key()),
+        lambda: crud_product.get_productos_filtrados_count(db, filtros)
+    ) if include_total else None
+    
+    # Filas de columnas directamente a JSON, sin un modelo Pydantic por producto.
+    # Los campos del esquema que la consulta no trae van en null
+    extra = {"imagen_principal": None, "imagen_galeria": None, "imagen_srcset": None, "imagen_galeria_srcset": None}
     if basic:
-        # Modo básico - sin detalles
-        if categoria_id:
-            # Verificar que la categoría existe
-            categoria = crud_category.get_categoria_by_id(db, categoria_id)
-            if not categoria:
-                raise HTTPException(status_code=404, detail="Categoría no encontrada")
-            
-            productos = crud_product.get_productos_by_categoria(db, categoria_id, skip=skip, limit=limit)
-            total = crud_product.get_productos_count_by_categoria(db, categoria_id)
-        elif subcategoria_id:
-            # Verificar que la subcategoría existe
-            subcategoria = crud_subcategory.get_subcategoria_by_id(db, subcategoria_id)
-            if not subcategoria:
-                raise HTTPException(status_code=404, detail="Subcategoría no encontrada")
-            
-            productos = crud_product.get_productos_by_subcategoria(db, subcategoria_id, skip=skip, limit=limit)
-            total = crud_product.get_productos_count_by_subcategoria(db, subcategoria_id)
-        elif estado:
-            productos = crud_product.get_productos_by_estado(db, estado, skip=skip, limit=limit)
-            total = crud_product.get_productos_count_by_estado(db, estado)
-        elif search:
-            productos = crud_product.search_productos(db, search, skip=skip, limit=limit)
-            total = len(productos)  # Para búsquedas, el total es la cantidad encontrada
-        else:
-            productos = crud_product.get_productos(db, skip=skip, limit=limit)
-            total = crud_product.get_productos_count(db)
-        
-        # Convertir a respuesta básica
-        productos_basic = []
-        for producto in productos:
-            productos_basic.append(ProductoResponse(**producto.__dict__))
-        
-        return ProductoListResponse(
-            productos=productos_basic,
-            total=total
-        )
-    else:
-        # Modo con detalles (por defecto)
-        if categoria_id:
-            # Verificar que la categoría existe
-            categoria = crud_category.get_categoria_by_id(db, categoria_id)
-            if not categoria:
-                raise HTTPException(status_code=404, detail="Categoría no encontrada")
-            
-            productos = crud_product.get_productos_by_categoria_with_details(db, categoria_id, skip=skip, limit=limit)
-            total = crud_product.get_productos_count_by_categoria(db, categoria_id)
-        elif subcategoria_id:
-            # Verificar que la subcategoría existe
-            subcategoria = crud_subcategory.get_subcategoria_by_id(db, subcategoria_id)
-            if not subcategoria:
-                raise HTTPException(status_code=404, detail="Subcategoría no encontrada")
-            
-            productos = crud_product.get_productos_by_subcategoria_with_details(db, subcategoria_id, skip=skip, limit=limit)
-            total = crud_product.get_productos_count_by_subcategoria(db, subcategoria_id)
-        elif estado:
-            productos = crud_product.get_productos_by_estado_with_details(db, estado, skip=skip, limit=limit)
-            total = crud_product.get_productos_count_by_estado(db, estado)
-        elif search:
-            productos = crud_product.search_productos_with_details(db, search, skip=skip, limit=limit)
-            total = len(productos)  # Para búsquedas, el total es la cantidad encontrada
-        else:
-            productos = crud_product.get_productos_with_details(db, skip=skip, limit=limit)
-            total = crud_product.get_productos_count(db)
-        
-        # Convertir a respuesta con detalles
-        productos_with_details = []
-        for producto in productos:
-            response_data = {
-                **producto.__dict__,
-                "categoria_nombre": producto.categoria.nombre if producto.categoria else None,
-                "subcategoria_nombre": producto.subcategoria.nombre if producto.subcategoria else None,
-                "iva_porcentaje": producto.iva.porcentaje if producto.iva else None,
-                "iva_descripcion": producto.iva.descripcion if producto.iva else None
-            }
-            productos_with_details.append(ProductoDetailResponse(**response_data))
-        
-        return ProductoDetailListResponse(
-            productos=productos_with_details,
-            total=total
-        )
+        extra = {"categoria_nombre": None, "subcategoria_nombre": None, "iva_porcentaje": None, "iva_descripcion": None, **extra}
+    return list_response("productos", row_dicts(filas, extra=extra, exclude=("score",)), total, next_cursor)
 
 @router.get("/{producto_id}", response_model=ProductoDetailResponse)
 def get_producto(
     producto_id: int,
     basic: bool = Query(False, description="Si es True, devuelve solo datos básicos sin detalles de relaciones"),
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Obtener un producto específico por ID.
@@ -326,14 +350,14 @@ def get_producto(
 def create_producto(
     producto: ProductoCreate,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Crear un nuevo producto.
     Requiere autenticación y perfil de Administrador o Publicador.
     """
     # Verificar que el usuario sea administrador o publicador
-    if current_user.get("profile") not in ["Administrador", "Publicador"]:
+    if current_user.profile not in ["Administrador", "Publicador"]:
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador o Publicador")
     
     # Verificar que la categoría existe
@@ -362,14 +386,14 @@ def update_producto(
     producto_id: int,
     producto: ProductoUpdate,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Actualizar un producto existente.
     Requiere autenticación y perfil de Administrador o Publicador.
     """
     # Verificar que el usuario sea administrador o publicador
-    if current_user.get("profile") not in ["Administrador", "Publicador"]:
+    if current_user.profile not in ["Administrador", "Publicador"]:
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador o Publicador")
     
     # Verificar si el producto existe
@@ -410,14 +434,14 @@ def update_producto(
 def delete_producto(
     producto_id: int,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Eliminar un producto.
     Requiere autenticación y perfil de Administrador.
     """
     # Verificar que el usuario sea administrador
-    if current_user.get("profile") != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador")
     
     # Verificar si el producto existe
@@ -436,14 +460,14 @@ def update_stock(
     producto_id: int,
     cantidad: int = Query(..., description="Cantidad a agregar o restar del stock (negativo para restar)"),
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Actualizar el stock de un producto.
     Requiere autenticación y perfil de Administrador o Publicador.
     """
     # Verificar que el usuario sea administrador o publicador
-    if current_user.get("profile") not in ["Administrador", "Publicador"]:
+    if current_user.profile not in ["Administrador", "Publicador"]:
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador o Publicador")
     
     # Verificar si el producto existe
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case
 from datetime import datetime, timedelta
-from typing import List, Optional
-from app.database import get_db
+from typing import Dict, Iterator, List, Optional, Tuple
+import csv
+import io
+import json
+from app.database import get_db, SessionLocal
 from app.models.sale import Sale
 from app.models.cart import Cart
 from app.models.user import Persona, Usuario
 from app.models.product import Producto
-from app.utils.auth import get_current_user
+from app.utils.auth import get_current_principal
+from app.schemas.auth import Principal
+from app.utils.pagination import encode_cursor, decode_cursor, decode_datetime
+from app.crud.sales_rollup import get_sales_totals_by_estado, get_sales_by_producto
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/reports", tags=["reportes"])
@@ -28,6 +35,7 @@ class SalesReportResponse(BaseModel):
     completed_sales: int
     total_records: int
     period: str
+    next_cursor: Optional[str] = None
 
 class SalesSummary(BaseModel):
     total_sales: float
@@ -36,122 +44,232 @@ class SalesSummary(BaseModel):
     total_records: int
     average_order_value: float
 
+class ProductSalesItem(BaseModel):
+    id_producto: int
+    nombre: Optional[str]
+    estado: Optional[str]
+    unidades: int
+    bruto: float
+    iva: float
+
+class ProductSalesResponse(BaseModel):
+    products: List[ProductSalesItem]
+    period: str
+
+# Filas leídas por lote al exportar (cursor del lado del servidor)
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_COLUMNS = ["id_venta", "fecha_venta", "customer_name", "products", "total", "status", "id_usuario"]
+
+# Mapeo de estados de la BD a valores del frontend
+STATUS_MAP = {
+    "CONFIRMADO": "confirmed",
+    "PENDIENTE": "pending",
+    "CANCELADO": "cancelled"
+}
+
+# Mapeo de valores del frontend a valores de la BD
+STATUS_MAP_REVERSE = {
+    "confirmed": ["CONFIRMADO"],
+    "pending": ["PENDIENTE"],
+    "cancelled": ["CANCELADO"]
+}
+
+def parse_date_range(start_date: Optional[str], end_date: Optional[str]):
+    """Convierte las fechas YYYY-MM-DD del filtro en el rango [inicio, fin)"""
+    start_datetime = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+    end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1) if end_date else None
+    return start_datetime, end_datetime
+
+def describe_period(start_date: Optional[str], end_date: Optional[str]) -> str:
+    """Texto del período del reporte"""
+    if start_date and end_date:
+        return f"{start_date} - {end_date}"
+    if start_date:
+        return f"Desde {start_date}"
+    if end_date:
+        return f"Hasta {end_date}"
+    return "Todos los registros"
+
+def build_sales_filters(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    status_filter: Optional[str],
+    search_term: Optional[str]
+) -> list:
+    """
+    Construye las condiciones de filtro del reporte de ventas.
+    Asume que la consulta ya une Sale con Usuario y Persona.
+    """
+    filters = []
+    
+    # Aplicar filtros de fecha
+    if start_date:
+        start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
+        filters.append(Sale.fecha_venta >= start_datetime)
+    
+    if end_date:
+        end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+        filters.append(Sale.fecha_venta < end_datetime)
+    
+    # Aplicar filtro de estado
+    if status_filter and status_filter != "all":
+        if status_filter in STATUS_MAP_REVERSE:
+            filters.append(Sale.estado.in_(STATUS_MAP_REVERSE[status_filter]))
+    
+    # Aplicar búsqueda
+    if search_term:
+        filters.append(or_(
+            Persona.nombre.ilike(f"%{search_term}%"),
+            Persona.apellido.ilike(f"%{search_term}%"),
+            Sale.id_venta.ilike(f"%{search_term}%")
+        ))
+    
+    return filters
+
+def decode_sales_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decodifica el cursor del reporte de ventas: (fecha_venta, id_venta) de la última fila.
+    Lanza HTTP 400 si no es válido.
+    """
+    cursor_fecha, cursor_id = decode_cursor(cursor, 2)
+    if not isinstance(cursor_id, int) or isinstance(cursor_id, bool):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return decode_datetime(cursor_fecha), cursor_id
+
+def build_sales_report_query(db: Session, filters: list):
+    """
+    Ventas con su cliente, ordenadas de la más reciente a la más antigua.
+    Los productos de cada venta se cargan aparte con load_sales_products.
+    """
+    return db.query(
+        Sale.id_venta,
+        Sale.fecha_venta,
+        Sale.total_venta,
+        Sale.estado,
+        Sale.id_usuario,
+        Persona.nombre,
+        Persona.apellido
+    ).join(Usuario, Sale.id_usuario == Usuario.id_usuario)\
+     .join(Persona, Usuario.id_persona == Persona.id_persona)\
+     .filter(*filters)\
+     .order_by(
+        Sale.fecha_venta.desc(),
+        Sale.id_venta.desc()
+    )
+
+def sales_after(cursor_fecha: datetime, cursor_id: int):
+    """Condición keyset: ventas posteriores a (fecha_venta, id_venta) en orden descendente"""
+    return or_(
+        Sale.fecha_venta < cursor_fecha,
+        and_(Sale.fecha_venta == cursor_fecha, Sale.id_venta < cursor_id)
+    )
+
+def load_sales_products(db: Session, ids_venta: List[int]) -> Dict[int, str]:
+    """
+    Lista de productos ("Nombre xCantidad, ...") de cada venta de una página, en una consulta.
+    Se arma en Python: GROUP_CONCAT de MySQL trunca el resultado en group_concat_max_len.
+    """
+    if not ids_venta:
+        return {}
+    lineas = db.query(Cart.id_venta, Producto.nombre, Cart.cantidad)\
+        .join(Producto, Producto.id_producto == Cart.id_producto)\
+        .filter(Cart.id_venta.in_(ids_venta))\
+        .order_by(Cart.id_venta, Cart.id_carrito)\
+        .all()
+    productos: Dict[int, List[str]] = {}
+    for id_venta, nombre, cantidad in lineas:
+        productos.setdefault(id_venta, []).append(f"{nombre} x{cantidad}")
+    return {id_venta: ", ".join(items) for id_venta, items in productos.items()}
+
 @router.get("/sales", response_model=SalesReportResponse)
 def get_sales_report(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     status_filter: Optional[str] = None,
     search_term: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de ventas a retornar"),
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (next_cursor)"),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
-    Genera reporte de ventas con filtros
+    Genera reporte de ventas con filtros y paginación por cursor
+    (ventas más recientes primero).
     Solo accesible para administradores
     """
     # Verificar que el usuario sea administrador
-    if current_user.perfil.nombre != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Solo los administradores pueden acceder a los reportes"
         )
     
     try:
-        # Construir query base
-        query = db.query(Sale).join(Usuario, Sale.id_usuario == Usuario.id_usuario)\
-                   .join(Persona, Usuario.id_persona == Persona.id_persona)
-        
-        # Aplicar filtros de fecha
-        if start_date:
-            start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.filter(Sale.fecha_venta >= start_datetime)
+        filters = build_sales_filters(start_date, end_date, status_filter, search_term)
         
-        if end_date:
-            end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-            query = query.filter(Sale.fecha_venta < end_datetime)
+        # Paginación por cursor sobre (fecha_venta, id_venta) descendente
+        page_filters = list(filters)
+        if after:
+            page_filters.append(sales_after(*decode_sales_cursor(after)))
         
-        # Aplicar filtro de estado
-        if status_filter and status_filter != "all":
-            # Mapear valores del frontend a valores de la BD
-            status_map_reverse = {
-                "confirmed": ["CONFIRMADO"],
-                "pending": ["PENDIENTE"],
-                "cancelled": ["CANCELADO"]
-            }
-            if status_filter in status_map_reverse:
-                query = query.filter(Sale.estado.in_(status_map_reverse[status_filter]))
+        ventas = build_sales_report_query(db, page_filters).limit(limit + 1).all()
         
-        # Aplicar búsqueda
-        if search_term:
-            search_filter = or_(
-                Persona.nombre.ilike(f"%{search_term}%"),
-                Persona.apellido.ilike(f"%{search_term}%"),
-                Sale.id_venta.ilike(f"%{search_term}%")
-            )
-            query = query.filter(search_filter)
-        
-        # Obtener ventas
-        ventas = query.all()
+        next_cursor = None
+        if len(ventas) > limit:
+            ventas = ventas[:limit]
+            next_cursor = encode_cursor([ventas[-1].fecha_venta, ventas[-1].id_venta])
+        productos = load_sales_products(db, [venta.id_venta for venta in ventas])
         
         # Procesar datos para el reporte
-        sales_data = []
-        for venta in ventas:
-            # Obtener productos de la venta desde el carrito
-            detalles = db.query(Cart).filter(Cart.id_venta == venta.id_venta).all()
-            productos = []
-            for detalle in detalles:
-                producto = db.query(Producto).filter(Producto.id_producto == detalle.id_producto).first()
-                if producto:
-                    productos.append(f"{producto.nombre} x{detalle.cantidad}")
-            
-            # Obtener nombre del cliente
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == venta.id_usuario).first()
-            persona = None
-            if usuario:
-                persona = db.query(Persona).filter(Persona.id_persona == usuario.id_persona).first()
-            
-            customer_name = f"{persona.nombre} {persona.apellido}" if persona else "Cliente Desconocido"
-            
-            # Mapear estado
-            status_map = {
-                "CONFIRMADO": "confirmed",
-                "PENDIENTE": "pending",
-                "CANCELADO": "cancelled"
-            }
-            
-            sales_data.append(SalesReportItem(
+        sales_data = [
+            SalesReportItem(
                 id_venta=venta.id_venta,
                 fecha_venta=venta.fecha_venta.strftime("%Y-%m-%d"),
-                customer_name=customer_name,
-                products=", ".join(productos),
-                total=float(venta.total_venta),
-                status=status_map.get(venta.estado, "unknown"),
+                customer_name=f"{venta.nombre} {venta.apellido}",
+                products=productos.get(venta.id_venta, ""),
+                total=float(venta.total_venta or 0),
+                status=STATUS_MAP.get(venta.estado, "unknown"),
                 id_usuario=venta.id_usuario
-            ))
-        
-        # Calcular estadísticas
-        total_sales = sum(sale.total for sale in sales_data if sale.status == "confirmed")
-        completed_sales = len([sale for sale in sales_data if sale.status == "confirmed"])
-        total_records = len(sales_data)
+            )
+            for venta in ventas
+        ]
         
-        # Determinar período
-        if start_date and end_date:
-            period = f"{start_date} - {end_date}"
-        elif start_date:
-            period = f"Desde {start_date}"
-        elif end_date:
-            period = f"Hasta {end_date}"
+        # Estadísticas de todo el conjunto filtrado
+        if search_term:
+            # La búsqueda por cliente no está en el resumen: calcular en SQL
+            es_confirmada = Sale.estado == "CONFIRMADO"
+            total_sales, completed_sales, total_records = db.query(
+                func.coalesce(func.sum(case((es_confirmada, Sale.total_venta), else_=0)), 0),
+                func.count(case((es_confirmada, Sale.id_venta))),
+                func.count(Sale.id_venta)
+            ).join(Usuario, Sale.id_usuario == Usuario.id_usuario)\
+             .join(Persona, Usuario.id_persona == Persona.id_persona)\
+             .filter(*filters).one()
         else:
-            period = "Todos los registros"
+            # Días anteriores desde el resumen diario, el día actual en vivo
+            start_datetime, end_datetime = parse_date_range(start_date, end_date)
+            estados = None
+            if status_filter and status_filter != "all" and status_filter in STATUS_MAP_REVERSE:
+                estados = STATUS_MAP_REVERSE[status_filter]
+            por_estado = get_sales_totals_by_estado(db, start_datetime, end_datetime, estados)
+            completed_sales, total_sales = por_estado.get("CONFIRMADO", (0, 0.0))
+            total_records = sum(cantidad for cantidad, _ in por_estado.values())
         
         return SalesReportResponse(
             sales=sales_data,
-            total_sales=total_sales,
+            total_sales=float(total_sales),
             completed_sales=completed_sales,
             total_records=total_records,
-            period=period
+            period=describe_period(start_date, end_date),
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error generando reporte de ventas: {str(e)}")
         import traceback
@@ -166,39 +284,28 @@ def get_sales_summary(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Obtiene resumen de ventas
     Solo accesible para administradores
     """
     # Verificar que el usuario sea administrador
-    if current_user.perfil.nombre != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Solo los administradores pueden acceder a los reportes"
         )
     
     try:
-        # Construir query base
-        query = db.query(Sale)
-        
-        # Aplicar filtros de fecha
-        if start_date:
-            start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.filter(Sale.fecha_venta >= start_datetime)
+        # Días anteriores desde el resumen diario, el día actual en vivo
+        # Obtener estadísticas: {estado: (cantidad, total)}
+        start_datetime, end_datetime = parse_date_range(start_date, end_date)
+        por_estado = get_sales_totals_by_estado(db, start_datetime, end_datetime)
         
-        if end_date:
-            end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-            query = query.filter(Sale.fecha_venta < end_datetime)
-        
-        # Obtener estadísticas
-        ventas = query.all()
-        
-        total_sales = sum(float(venta.total_venta) for venta in ventas if venta.estado == "CONFIRMADO")
-        completed_sales = len([venta for venta in ventas if venta.estado == "CONFIRMADO"])
-        pending_sales = len([venta for venta in ventas if venta.estado == "PENDIENTE"])
-        total_records = len(ventas)
+        completed_sales, total_sales = por_estado.get("CONFIRMADO", (0, 0.0))
+        pending_sales, _ = por_estado.get("PENDIENTE", (0, 0.0))
+        total_records = sum(cantidad for cantidad, _ in por_estado.values())
         average_order_value = total_sales / completed_sales if completed_sales > 0 else 0
         
         return SalesSummary(
@@ -216,10 +323,155 @@ def get_sales_summary(
             detail=f"Error obteniendo resumen: {str(e)}"
         )
 
+@router.get("/sales/products", response_model=ProductSalesResponse)
+def get_product_sales_report(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de filas a retornar"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Unidades, valor bruto e IVA vendidos por producto y estado, de mayor a menor valor bruto.
+    Los días anteriores se leen del resumen diario por producto, el día actual en vivo.
+    Solo accesible para administradores
+    """
+    # Verificar que el usuario sea administrador
+    if current_user.profile != "Administrador":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los administradores pueden acceder a los reportes"
+        )
+    
+    try:
+        start_datetime, end_datetime = parse_date_range(start_date, end_date)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato de fecha inválido, use YYYY-MM-DD"
+        )
+    
+    estados = None
+    if status_filter and status_filter != "all" and status_filter in STATUS_MAP_REVERSE:
+        estados = STATUS_MAP_REVERSE[status_filter]
+    
+    ventas = get_sales_by_producto(db, start_datetime, end_datetime, estados)
+    filas = sorted(ventas.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    
+    # Nombres de los productos de la página en una consulta
+    producto_ids = {id_producto for (_, id_producto), _ in filas}
+    nombres = dict(
+        db.query(Producto.id_producto, Producto.nombre).filter(Producto.id_producto.in_(producto_ids)).all()
+    ) if producto_ids else {}
+    
+    return ProductSalesResponse(
+        products=[
+            ProductSalesItem(
+                id_producto=id_producto,
+                nombre=nombres.get(id_producto),
+                estado=estado,
+                unidades=unidades,
+                bruto=bruto,
+                iva=iva
+            )
+            for (estado, id_producto), (unidades, bruto, iva) in filas
+        ],
+        period=describe_period(start_date, end_date)
+    )
+
+def stream_sales_export(filters: list, formato: str) -> Iterator[str]:
+    """
+    Genera el export por lotes de EXPORT_BATCH_SIZE ventas (keyset sobre fecha_venta, id_venta)
+    sin cargar el resultado completo en memoria.
+    Usa su propia sesión: la de la petición se cierra antes de terminar el stream.
+    """
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if formato == "csv":
+            writer.writerow(EXPORT_COLUMNS)
+        
+        lote_filters = list(filters)
+        while True:
+            ventas = build_sales_report_query(db, lote_filters).limit(EXPORT_BATCH_SIZE).all()
+            if not ventas:
+                break
+            productos = load_sales_products(db, [venta.id_venta for venta in ventas])
+            
+            for venta in ventas:
+                fila = [
+                    venta.id_venta,
+                    venta.fecha_venta.isoformat() if venta.fecha_venta else None,
+                    f"{venta.nombre} {venta.apellido}",
+                    productos.get(venta.id_venta, ""),
+                    float(venta.total_venta or 0),
+                    STATUS_MAP.get(venta.estado, "unknown"),
+                    venta.id_usuario
+                ]
+                if formato == "csv":
+                    writer.writerow(fila)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, fila)), ensure_ascii=False) + "\n")
+            
+            # Enviar un bloque por cada lote leído de la base de datos
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            
+            if len(ventas) < EXPORT_BATCH_SIZE:
+                break
+            lote_filters = list(filters) + [sales_after(ventas[-1].fecha_venta, ventas[-1].id_venta)]
+        
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+@router.get("/sales/export")
+def export_sales_report(
+    formato: str = Query("csv", alias="format", pattern="^(csv|ndjson)$", description="Formato del archivo: csv o ndjson"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    search_term: Optional[str] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Exporta el reporte de ventas completo (mismos filtros que /sales)
+    como CSV o NDJSON en streaming, con memoria constante.
+    Solo accesible para administradores
+    """
+    # Verificar que el usuario sea administrador
+    if current_user.profile != "Administrador":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los administradores pueden acceder a los reportes"
+        )
+    
+    # Validar filtros antes de empezar a enviar la respuesta
+    try:
+        filters = build_sales_filters(start_date, end_date, status_filter, search_term)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato de fecha inválido, use YYYY-MM-DD"
+        )
+    
+    media_type = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    filename = f"ventas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+    
+    return StreamingResponse(
+        stream_sales_export(filters, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/test")
 def test_reports_endpoint(
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Endpoint de prueba para verificar que el router funciona
@@ -228,7 +480,7 @@ def test_reports_endpoint(
         print(f"DEBUG: Usuario actual: {current_user}")
         
         # Verificar que el usuario sea administrador
-        if current_user.perfil.nombre != "Administrador":
+        if current_user.profile != "Administrador":
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Solo los administradores pueden acceder a los reportes"
@@ -246,7 +498,7 @@ def test_reports_endpoint(
             "message": "Endpoint de prueba funcionando",
             "ventas_count": ventas_count,
             "carritos_count": carritos_count,
-            "user_profile": current_user.perfil.nombre
+            "user_profile": current_user.profile
         }
         
     except Exception as e:
@@ -1,25 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import Optional
 from ..database import get_db
 from ..crud import subcategory as crud_subcategory
 from ..crud import category as crud_category
-from ..schemas.subcategory import SubcategoriaCreate, SubcategoriaUpdate, SubcategoriaResponse, SubcategoriaListResponse, SubcategoriaDetailResponse, SubcategoriaDetailListResponse
-from ..utils.auth import get_current_user
+from ..schemas.subcategory import SubcategoriaCreate, SubcategoriaUpdate, SubcategoriaResponse, SubcategoriaDetailResponse, SubcategoriaDetailListResponse
+from ..utils.auth import get_current_principal
+from ..schemas.auth import Principal
+from ..utils.catalog_cache import catalog_counts
+from ..utils.pagination import decode_id_cursor, keyset_page
+from ..utils.http_cache import catalog_http_cache
+from ..utils.json_response import list_response, row_dicts
 
 router = APIRouter(prefix="/api/subcategories", tags=["subcategories"])
 
+def _count(db: Session, categoria_id: Optional[int]):
+    """Clave de caché y consulta del total de subcategorías (de una categoría o todas)"""
+    if categoria_id:
+        return ("subcategorias", categoria_id), lambda: crud_subcategory.get_subcategorias_count_by_categoria(db, categoria_id)
+    return ("subcategorias", None), lambda: crud_subcategory.get_subcategorias_count(db)
+
 # ===== ENDPOINTS PÚBLICOS (SIN AUTENTICACIÓN) =====
 
-@router.get("/public", response_model=SubcategoriaDetailListResponse)
+@router.get("/public", response_model=SubcategoriaDetailListResponse, dependencies=[Depends(catalog_http_cache)])
 def get_subcategorias_publicas(
+    response: Response,
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (next_cursor); reemplaza a skip"),
+    include_total: bool = Query(True, description="Si es False, no se calcula el total"),
     categoria_id: int = Query(None, description="Filtrar por ID de categoría"),
     db: Session = Depends(get_db)
 ):
     """
-    Obtener todas las subcategorías con paginación.
+    Obtener todas las subcategorías con paginación (skip o cursor after).
     Siempre incluye detalles de categoría.
     Opcionalmente filtrar por categoría.
     NO requiere autenticación.
@@ -29,28 +43,17 @@ def get_subcategorias_publicas(
         categoria = crud_category.get_categoria_by_id(db, categoria_id)
         if not categoria:
             raise HTTPException(status_code=404, detail="Categoría no encontrada")
-        
-        subcategorias = crud_subcategory.get_subcategorias_by_categoria_with_details(db, categoria_id, skip=skip, limit=limit)
-        total = crud_subcategory.get_subcategorias_count_by_categoria(db, categoria_id)
-    else:
-        subcategorias = crud_subcategory.get_subcategorias_with_details(db, skip=skip, limit=limit)
-        total = crud_subcategory.get_subcategorias_count(db)
     
-    # Convertir a respuesta con detalles
-    subcategorias_with_details = []
-    for subcategoria in subcategorias:
-        response_data = {
-            **subcategoria.__dict__,
-            "categoria_nombre": subcategoria.categoria.nombre if subcategoria.categoria else None
-        }
-        subcategorias_with_details.append(SubcategoriaDetailResponse(**response_data))
-    
-    return SubcategoriaDetailListResponse(
-        subcategorias=subcategorias_with_details,
-        total=total
+    subcategorias = crud_subcategory.get_subcategorias_rows(
+        db, categoria_id, with_details=True, skip=skip, limit=limit + 1, after_id=decode_id_cursor(after)
     )
+    subcategorias, next_cursor = keyset_page(subcategorias, limit, lambda s: [s.id_subcategoria])
+    total = catalog_counts.get(*_count(db, categoria_id)) if include_total else None
+    
+    # Filas con el nombre de la categoría directamente a JSON
+    return list_response("subcategorias", row_dicts(subcategorias), total, next_cursor, headers=response.headers)
 
-@router.get("/public/{subcategoria_id}", response_model=SubcategoriaDetailResponse)
+@router.get("/public/{subcategoria_id}", response_model=SubcategoriaDetailResponse, dependencies=[Depends(catalog_http_cache)])
 def get_subcategoria_publica(
     subcategoria_id: int,
     db: Session = Depends(get_db)
@@ -77,74 +80,41 @@ def get_subcategoria_publica(
 def get_subcategorias(
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (next_cursor); reemplaza a skip"),
+    include_total: bool = Query(True, description="Si es False, no se calcula el total"),
     categoria_id: int = Query(None, description="Filtrar por ID de categoría"),
     basic: bool = Query(False, description="Si es True, devuelve solo datos básicos sin detalles de categoría"),
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
-    Obtener todas las subcategorías con paginación.
+    Obtener todas las subcategorías con paginación (skip o cursor after).
     Por defecto incluye detalles de categoría.
     Opcionalmente filtrar por categoría.
     Requiere autenticación.
     """
-    if basic:
-        # Modo básico - sin detalles
-        if categoria_id:
-            # Verificar que la categoría existe
-            categoria = crud_category.get_categoria_by_id(db, categoria_id)
-            if not categoria:
-                raise HTTPException(status_code=404, detail="Categoría no encontrada")
-            
-            subcategorias = crud_subcategory.get_subcategorias_by_categoria(db, categoria_id, skip=skip, limit=limit)
-            total = crud_subcategory.get_subcategorias_count_by_categoria(db, categoria_id)
-        else:
-            subcategorias = crud_subcategory.get_subcategorias(db, skip=skip, limit=limit)
-            total = crud_subcategory.get_subcategorias_count(db)
-        
-        # Convertir a respuesta básica
-        subcategorias_basic = []
-        for subcategoria in subcategorias:
-            subcategorias_basic.append(SubcategoriaResponse(**subcategoria.__dict__))
-        
-        return SubcategoriaListResponse(
-            subcategorias=subcategorias_basic,
-            total=total
-        )
-    else:
-        # Modo con detalles (por defecto)
-        if categoria_id:
-            # Verificar que la categoría existe
-            categoria = crud_category.get_categoria_by_id(db, categoria_id)
-            if not categoria:
-                raise HTTPException(status_code=404, detail="Categoría no encontrada")
-            
-            subcategorias = crud_subcategory.get_subcategorias_by_categoria_with_details(db, categoria_id, skip=skip, limit=limit)
-            total = crud_subcategory.get_subcategorias_count_by_categoria(db, categoria_id)
-        else:
-            subcategorias = crud_subcategory.get_subcategorias_with_details(db, skip=skip, limit=limit)
-            total = crud_subcategory.get_subcategorias_count(db)
-        
-        # Convertir a respuesta con detalles
-        subcategorias_with_details = []
-        for subcategoria in subcategorias:
-            response_data = {
-                **subcategoria.__dict__,
-                "categoria_nombre": subcategoria.categoria.nombre if subcategoria.categoria else None
-            }
-            subcategorias_with_details.append(SubcategoriaDetailResponse(**response_data))
-        
-        return SubcategoriaDetailListResponse(
-            subcategorias=subcategorias_with_details,
-            total=total
-        )
+    if categoria_id:
+        # Verificar que la categoría existe
+        categoria = crud_category.get_categoria_by_id(db, categoria_id)
+        if not categoria:
+            raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    
+    subcategorias = crud_subcategory.get_subcategorias_rows(
+        db, categoria_id, with_details=not basic, skip=skip, limit=limit + 1, after_id=decode_id_cursor(after)
+    )
+    subcategorias, next_cursor = keyset_page(subcategorias, limit, lambda s: [s.id_subcategoria])
+    total = catalog_counts.get(*_count(db, categoria_id)) if include_total else None
+    
+    # En modo básico no hay nombre de categoría (el esquema lo deja en null)
+    extra = {"categoria_nombre": None} if basic else None
+    return list_response("subcategorias", row_dicts(subcategorias, extra=extra), total, next_cursor)
 
 @router.get("/{subcategoria_id}", response_model=SubcategoriaDetailResponse)
 def get_subcategoria(
     subcategoria_id: int,
     basic: bool = Query(False, description="Si es True, devuelve solo datos básicos sin detalles de categoría"),
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Obtener una subcategoría específica por ID.
@@ -176,14 +146,14 @@ def get_subcategoria(
 def create_subcategoria(
     subcategoria: SubcategoriaCreate,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Crear una nueva subcategoría.
     Requiere autenticación y perfil de Administrador.
     """
     # Verificar que el usuario sea administrador
-    if current_user.get("profile") != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador")
     
     # Verificar que la categoría existe
@@ -203,14 +173,14 @@ def update_subcategoria(
     subcategoria_id: int,
     subcategoria: SubcategoriaUpdate,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Actualizar una subcategoría existente.
     Requiere autenticación y perfil de Administrador.
     """
     # Verificar que el usuario sea administrador
-    if current_user.get("profile") != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador")
     
     # Verificar si la subcategoría existe
@@ -241,14 +211,14 @@ def update_subcategoria(
 def delete_subcategoria(
     subcategoria_id: int,
     db: Session = Depends(get_db),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Eliminar una subcategoría.
     Requiere autenticación y perfil de Administrador.
     """
     # Verificar que el usuario sea administrador
-    if current_user.get("profile") != "Administrador":
+    if current_user.profile != "Administrador":
         raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere perfil de Administrador")
     
     # Verificar si la subcategoría existe
@@ -14,6 +14,13 @@ class TipoIdentificacionEnum(str, Enum):
     CEDULA_EXTRANJERIA = "CEDULA_EXTRANJERIA"
     TARJETA_IDENTIDAD = "TARJETA_IDENTIDAD"
 
+class Principal(BaseModel):
+    """Usuario autenticado construido desde los claims del token (sin consultar la base de datos)"""
+    id_usuario: int
+    email: Optional[str] = None
+    profile: Optional[str] = None
+    person_name: Optional[str] = None
+
 class LoginRequest(BaseModel):
     """Esquema para solicitud de login"""
     email: EmailStr
@@ -20,4 +20,5 @@ class CategoriaResponse(CategoriaBase):
 
 class CategoriaListResponse(BaseModel):
     categorias: List[CategoriaResponse]
-    total: int
+    total: Optional[int] = None  # None si include_total=false
+    next_cursor: Optional[str] = None
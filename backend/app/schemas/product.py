@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, Optional, List
 from datetime import date
 from decimal import Decimal
 
@@ -40,7 +40,8 @@ class ProductoResponse(ProductoBase):
 
 class ProductoListResponse(BaseModel):
     productos: List[ProductoResponse]
-    total: int
+    total: Optional[int] = None  # None si include_total=false
+    next_cursor: Optional[str] = None
 
 class ProductoDetailResponse(ProductoResponse):
     categoria_nombre: Optional[str] = None
@@ -49,10 +50,58 @@ class ProductoDetailResponse(ProductoResponse):
     iva_descripcion: Optional[str] = None
     imagen_principal: Optional[str] = None
     imagen_galeria: Optional[List[str]] = None
+    # srcset por formato ({"avif": "url 320w, ...", "webp": "..."}) de la principal y de la galería
+    imagen_srcset: Optional[Dict[str, str]] = None
+    imagen_galeria_srcset: Optional[List[Dict[str, str]]] = None
     
     class Config:
         from_attributes = True
 
 class ProductoDetailListResponse(BaseModel):
     productos: List[ProductoDetailResponse]
+    total: Optional[int] = None  # None si include_total=false
+    next_cursor: Optional[str] = None
+
+class ProductoSugerencia(BaseModel):
+    """Sugerencia de autocompletado del buscador de la tienda"""
+    id_producto: int
+    nombre: str
+    marca: str
+    codigo: str
+    valor: Decimal
+    imagen_principal: Optional[str] = None
+
+class FacetaConteo(BaseModel):
+    """Cantidad de productos para un valor de faceta (categoría, subcategoría, marca o IVA)"""
+    id: Optional[int] = None  # None en marcas
+    nombre: Optional[str] = None
     total: int
+
+class ProductoFacetasResponse(BaseModel):
+    total: int
+    categorias: List[FacetaConteo]
+    subcategorias: List[FacetaConteo]
+    marcas: List[FacetaConteo]
+    ivas: List[FacetaConteo]
+
+class ProductoFiltros(BaseModel):
+    """Filtros combinables del listado de productos"""
+    categoria_id: Optional[int] = None
+    subcategoria_id: Optional[int] = None
+    estado: Optional[str] = None
+    search: Optional[str] = None
+    precio_min: Optional[Decimal] = Field(None, ge=0)
+    precio_max: Optional[Decimal] = Field(None, ge=0)
+    en_stock: bool = False
+    # Por defecto: relevancia si hay búsqueda, ID en otro caso
+    orden: Optional[str] = Field(None, pattern="^(id|nombre|precio_asc|precio_desc|relevancia)$")
+    
+    @model_validator(mode="after")
+    def default_orden(self):
+        if self.orden is None:
+            self.orden = "relevancia" if self.search else "id"
+        return self
+    
+    def cache_key(self) -> tuple:
+        """Clave para cachear el total de un listado con estos filtros"""
+        return tuple(sorted(self.model_dump().items()))
@@ -28,8 +28,10 @@ class SubcategoriaDetailResponse(SubcategoriaResponse):
 
 class SubcategoriaListResponse(BaseModel):
     subcategorias: List[SubcategoriaResponse]
-    total: int
+    total: Optional[int] = None  # None si include_total=false
+    next_cursor: Optional[str] = None
 
 class SubcategoriaDetailListResponse(BaseModel):
     subcategorias: List[SubcategoriaDetailResponse]
-    total: int
+    total: Optional[int] = None  # None si include_total=false
+    next_cursor: Optional[str] = None
@@ -1,5 +1,8 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
@@ -8,6 +11,8 @@ from sqlalchemy.orm import Session, joinedload
 from config import settings
 from ..database import get_db
 from ..models.user import Usuario
+from ..schemas.auth import Principal
+from .refresh_token_store import refresh_token_store
 
 # Configuración de seguridad
 SECRET_KEY = settings.SECRET_KEY
@@ -16,13 +21,54 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_MINUTES = 30  # 30 minutos máximo (sesión total)
 
 # Contexto para hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 # Esquema de seguridad para extraer el token
 security = HTTPBearer()
 
-# Almacenamiento en memoria para refresh tokens (en producción usar Redis)
-refresh_tokens: Dict[str, Dict[str, Any]] = {}
+class TokenCache:
+    """
+    LRU acotado de tokens JWT ya verificados, indexado por la firma del token.
+    Cada entrada vence en el exp del token, así que un token cacheado nunca
+    se acepta después de expirar.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # firma -> (token, payload, exp)
+        self._entries: "OrderedDict[str, Tuple[str, Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Payload del token si está cacheado y vigente"""
+        firma = token.rpartition(".")[2]
+        with self._lock:
+            entry = self._entries.get(firma)
+            if entry is None:
+                return None
+            # Se compara el token completo: la firma sola no cubre un payload alterado
+            if entry[0] != token or time.time() >= entry[2]:
+                if entry[0] == token:
+                    del self._entries[firma]
+                return None
+            self._entries.move_to_end(firma)
+            return entry[1]
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        """Guarda un token verificado hasta su expiración"""
+        firma = token.rpartition(".")[2]
+        with self._lock:
+            self._entries[firma] = (token, payload, float(payload["exp"]))
+            self._entries.move_to_end(firma)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+# Tokens verificados del proceso
+token_cache = TokenCache(max_entries=settings.TOKEN_CACHE_MAX_ENTRIES)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si la contraseña coincide con el hash"""
@@ -52,27 +98,16 @@ def create_refresh_token(data: dict) -> str:
     to_encode.update({"exp": expire, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     
-    # Guardar refresh token en memoria
-    refresh_tokens[encoded_jwt] = {
-        "user_id": data.get("user_id"),
-        "email": data.get("email"),
-        "created_at": datetime.now(timezone.utc)
-    }
+    # Registrar el refresh token (memoria o tabla según REFRESH_TOKEN_STORE)
+    refresh_token_store.add(encoded_jwt, data.get("user_id"), expire.replace(tzinfo=None))
     
     return encoded_jwt
 
-def verify_token(token: str, token_type: str = "access") -> Dict[str, Any]:
-    """Verifica y decodifica un token JWT"""
+def _decode_token(token: str) -> Dict[str, Any]:
+    """Decodifica un token JWT verificando firma y expiración"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         
-        # Verificar tipo de token
-        if payload.get("type") != token_type:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Tipo de token inválido"
-            )
-        
         # Verificar expiración
         exp = payload.get("exp")
         if exp is None:
@@ -95,8 +130,48 @@ def verify_token(token: str, token_type: str = "access") -> Dict[str, Any]:
             detail="Token inválido"
         )
 
+def verify_token(token: str, token_type: str = "access") -> Dict[str, Any]:
+    """
+    Verifica y decodifica un token JWT.
+    Los tokens ya verificados se toman de token_cache hasta su expiración.
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = _decode_token(token)
+        token_cache.put(token, payload)
+    
+    # Verificar tipo de token
+    if payload.get("type") != token_type:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Tipo de token inválido"
+        )
+    
+    return payload
+
+def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
+    """
+    Obtiene el usuario actual desde los claims del token, sin consultar la base de datos.
+    Usar get_current_user solo cuando el endpoint necesita el modelo Usuario completo.
+    """
+    payload = verify_token(credentials.credentials, "access")
+    
+    user_id = payload.get("user_id")
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido"
+        )
+    
+    return Principal(
+        id_usuario=user_id,
+        email=payload.get("email"),
+        profile=payload.get("profile"),
+        person_name=payload.get("person_name")
+    )
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> Usuario:
-    """Obtiene el usuario actual basado en el token"""
+    """Obtiene el usuario actual basado en el token, cargándolo de la base de datos"""
     token = credentials.credentials
     payload = verify_token(token, "access")
     
@@ -108,7 +183,6 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         )
     
     # Obtener el usuario de la base de datos con relaciones cargadas
-    from sqlalchemy.orm import joinedload
     user = db.query(Usuario).options(
         joinedload(Usuario.persona),
         joinedload(Usuario.perfil)
@@ -124,8 +198,8 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
 
 def refresh_access_token(refresh_token: str) -> str:
     """Renueva un token de acceso usando un refresh token"""
-    # Verificar que el refresh token existe en memoria
-    if refresh_token not in refresh_tokens:
+    # Verificar que el refresh token fue emitido y no se revocó
+    if not refresh_token_store.contains(refresh_token):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Refresh token inválido"
@@ -146,23 +220,7 @@ def refresh_access_token(refresh_token: str) -> str:
 
 def revoke_refresh_token(refresh_token: str) -> bool:
     """Revoca un refresh token"""
-    if refresh_token in refresh_tokens:
-        del refresh_tokens[refresh_token]
-        return True
-    return False
-
-def cleanup_expired_refresh_tokens():
-    """Limpia refresh tokens expirados de la memoria"""
-    current_time = datetime.now(timezone.utc)
-    expired_tokens = []
-    
-    for token, data in refresh_tokens.items():
-        created_at = data.get("created_at")
-        if created_at and (current_time - created_at).total_seconds() > (REFRESH_TOKEN_EXPIRE_MINUTES * 60):
-            expired_tokens.append(token)
-    
-    for token in expired_tokens:
-        del refresh_tokens[token]
+    return refresh_token_store.revoke(refresh_token)
 
 def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security), db: Session = Depends(get_db)) -> Optional[Usuario]:
     """
@@ -0,0 +1,396 @@
+import asyncio
+import threading
+import time
+from datetime import timezone
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from config import settings
+from ..crud.catalog_version import get_catalog_version
+from ..database import SessionLocal
+from ..models.product import Producto
+from ..models.category import Categoria
+from ..models.subcategory import Subcategoria
+from ..schemas.product import ProductoDetailResponse, ProductoFiltros
+from .image_helper import parse_product_images
+from .product_filters import producto_sort_key, producto_sort_values
+from .search_text import normalize_search_text, tokenize_search
+
+
+class CatalogSnapshot:
+    """
+    Foto del catálogo: productos con nombres de categoría, subcategoría e IVA
+    ya resueltos e imágenes ya procesadas. Solo cambia el stock de los
+    productos (ver CatalogCache.update_stock); lo demás es inmutable.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        productos: List[ProductoDetailResponse],
+        categoria_ids: Set[int],
+        subcategoria_ids: Set[int]
+    ):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.productos = productos
+        self.productos_by_id: Dict[int, ProductoDetailResponse] = {p.id_producto: p for p in productos}
+        self.categoria_ids = categoria_ids
+        self.subcategoria_ids = subcategoria_ids
+        # Texto de búsqueda normalizado (sin tildes, minúsculas) por producto
+        self.search_text: Dict[int, str] = {
+            p.id_producto: normalize_search_text(" ".join(filter(None, [p.nombre, p.marca, p.codigo])))
+            for p in productos
+        }
+        self.nombre_text: Dict[int, str] = {
+            p.id_producto: normalize_search_text(p.nombre or "") for p in productos
+        }
+        # Cada producto ya convertido a tipos JSON: los endpoints públicos arman
+        # la respuesta con estos dicts sin pasar por Pydantic en cada petición
+        self.productos_json: Dict[int, Dict[str, object]] = {
+            p.id_producto: p.model_dump(mode="json") for p in productos
+        }
+
+    def get_producto(self, producto_id: int) -> Optional[ProductoDetailResponse]:
+        """Obtener un producto de la foto por ID"""
+        return self.productos_by_id.get(producto_id)
+
+    def _relevancia(self, producto: ProductoDetailResponse, tokens: List[str]) -> Optional[float]:
+        """
+        Relevancia de un producto para las palabras buscadas (None si alguna no aparece).
+        Una palabra en el nombre pesa el doble que en la marca o el código.
+        """
+        texto = self.search_text[producto.id_producto]
+        nombre = self.nombre_text[producto.id_producto]
+        score = 0.0
+        for token in tokens:
+            if token not in texto:
+                return None
+            score += 2.0 if token in nombre else 1.0
+        return score
+
+    def _coincide(
+        self,
+        p: ProductoDetailResponse,
+        filtros: ProductoFiltros,
+        tokens: List[str],
+        scores: Optional[Dict[int, float]] = None
+    ) -> Optional[float]:
+        """
+        Relevancia del producto si cumple los filtros distintos de categoría y
+        subcategoría (None si no los cumple).
+        Con scores (resultado del índice de texto) la búsqueda se toma de ahí.
+        """
+        if filtros.estado and p.estado != filtros.estado:
+            return None
+        if filtros.precio_min is not None and (p.valor is None or p.valor < filtros.precio_min):
+            return None
+        if filtros.precio_max is not None and (p.valor is None or p.valor > filtros.precio_max):
+            return None
+        if filtros.en_stock and not (p.stock or 0) > 0:
+            return None
+        if scores is not None:
+            return scores.get(p.id_producto)
+        return self._relevancia(p, tokens) if tokens else 0.0
+
+    def filter(
+        self,
+        filtros: ProductoFiltros,
+        scores: Optional[Dict[int, float]] = None
+    ) -> List[Tuple[ProductoDetailResponse, float]]:
+        """
+        Productos que cumplen todos los filtros a la vez, como filas (producto, score)
+        ordenadas según filtros.orden. La búsqueda exige todas las palabras del
+        término en nombre, marca o código, sin distinguir tildes ni mayúsculas;
+        scores es el resultado del índice de texto (search_scores) cuando se pudo usar.
+        """
+        tokens = tokenize_search(filtros.search) if filtros.search else []
+        filas = []
+        for p in self.productos:
+            if filtros.categoria_id and p.id_categoria != filtros.categoria_id:
+                continue
+            if filtros.subcategoria_id and p.id_subcategoria != filtros.subcategoria_id:
+                continue
+            score = self._coincide(p, filtros, tokens, scores)
+            if score is None:
+                continue
+            filas.append((p, score))
+
+        if filtros.orden != "id":
+            filas.sort(key=lambda fila: producto_sort_key(
+                producto_sort_values(fila[0], filtros.orden, fila[1]), filtros.orden
+            ))
+        return filas
+
+    def facets(self, filtros: ProductoFiltros, scores: Optional[Dict[int, float]] = None) -> Dict[str, object]:
+        """
+        Conteos por categoría, subcategoría, marca e IVA en una sola pasada.
+        Los conteos de categoría ignoran el filtro de categoría y los de
+        subcategoría el de subcategoría, para mostrar las demás opciones.
+        """
+        tokens = tokenize_search(filtros.search) if filtros.search else []
+        categorias: Dict[int, List] = {}
+        subcategorias: Dict[int, List] = {}
+        marcas: Dict[str, List] = {}
+        ivas: Dict[int, List] = {}
+        total = 0
+
+        def contar(conteos: Dict, clave, id_valor, nombre) -> None:
+            if clave not in conteos:
+                conteos[clave] = [id_valor, nombre, 0]
+            conteos[clave][2] += 1
+
+        for p in self.productos:
+            if self._coincide(p, filtros, tokens, scores) is None:
+                continue
+            en_categoria = not filtros.categoria_id or p.id_categoria == filtros.categoria_id
+            en_subcategoria = not filtros.subcategoria_id or p.id_subcategoria == filtros.subcategoria_id
+
+            if en_subcategoria:
+                contar(categorias, p.id_categoria, p.id_categoria, p.categoria_nombre)
+            if en_categoria:
+                contar(subcategorias, p.id_subcategoria, p.id_subcategoria, p.subcategoria_nombre)
+            if en_categoria and en_subcategoria:
+                total += 1
+                contar(marcas, p.marca, None, p.marca)
+                contar(ivas, p.id_iva, p.id_iva, p.iva_descripcion)
+
+        def ordenar(conteos: Dict) -> List[Dict[str, object]]:
+            return [
+                {"id": id_valor, "nombre": nombre, "total": cantidad}
+                for id_valor, nombre, cantidad in sorted(conteos.values(), key=lambda c: (-c[2], c[1] or ""))
+            ]
+
+        return {
+            "total": total,
+            "categorias": ordenar(categorias),
+            "subcategorias": ordenar(subcategorias),
+            "marcas": ordenar(marcas),
+            "ivas": ordenar(ivas)
+        }
+
+    def has_categoria(self, categoria_id: int) -> bool:
+        """Verificar si la categoría existe"""
+        return categoria_id in self.categoria_ids
+
+    def has_subcategoria(self, subcategoria_id: int) -> bool:
+        """Verificar si la subcategoría existe"""
+        return subcategoria_id in self.subcategoria_ids
+
+
+# Columnas de tbl_producto (sin el estado interno de SQLAlchemy que trae __dict__)
+PRODUCTO_COLUMNAS = sa_inspect(Producto).column_attrs
+
+
+def build_producto_detail(producto: Producto) -> ProductoDetailResponse:
+    """Construye la respuesta con detalles de un producto con sus relaciones cargadas"""
+    imagenes_procesadas = parse_product_images(producto.imagen)
+
+    response_data = {
+        **{columna.key: getattr(producto, columna.key) for columna in PRODUCTO_COLUMNAS},
+        "categoria_nombre": producto.categoria.nombre if producto.categoria else None,
+        "subcategoria_nombre": producto.subcategoria.nombre if producto.subcategoria else None,
+        "iva_descripcion": producto.iva.descripcion if producto.iva else None,
+        "iva_porcentaje": float(producto.iva.porcentaje) if producto.iva and producto.iva.porcentaje else 0.0,
+        "imagen_principal": imagenes_procesadas["principal"],
+        "imagen_galeria": imagenes_procesadas["galeria"],
+        "imagen_srcset": imagenes_procesadas["srcset"],
+        "imagen_galeria_srcset": imagenes_procesadas["galeria_srcset"]
+    }
+    return ProductoDetailResponse(**response_data)
+
+
+class CatalogCache:
+    """
+    Caché en memoria del catálogo público.
+
+    La foto se reconstruye cuando vence el TTL o cuando cambia la versión
+    compartida del catálogo (tbl_catalogo_version): cada escritura del catálogo
+    (productos, categorías, subcategorías) la incrementa en su transacción, así
+    una escritura atendida por un worker invalida la foto de todos. Cada worker
+    consulta la versión como mucho cada poll_seconds; invalidate() fuerza la
+    consulta en el worker que escribió. Una carga que estaba en curso durante
+    una escritura no se guarda como vigente.
+    """
+
+    def __init__(self, ttl_seconds: int, poll_seconds: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.poll_seconds = poll_seconds
+        self._version = 0
+        self._changed_at = 0.0  # hora (epoch) de la última escritura del catálogo
+        self._checked_at: Optional[float] = None  # última consulta de la versión (monotonic)
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._state_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # Los endpoints async no pueden esperar _load_lock: bloquearía el event loop
+        self._async_load_lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        """Última versión compartida leída (ver current_version)"""
+        return self._version
+
+    @property
+    def changed_at(self) -> float:
+        return self._changed_at
+
+    def _version_due(self) -> bool:
+        checked_at = self._checked_at
+        return checked_at is None or time.monotonic() - checked_at >= self.poll_seconds
+
+    def _read_version(self, db: Session) -> int:
+        version, fecha_cambio = get_catalog_version(db)
+        with self._state_lock:
+            self._version = version
+            if fecha_cambio is not None:
+                self._changed_at = fecha_cambio.replace(tzinfo=timezone.utc).timestamp()
+            self._checked_at = time.monotonic()
+        return version
+
+    def current_version(self, db: Optional[Session] = None) -> int:
+        """
+        Versión compartida del catálogo; se consulta en la base de datos
+        como mucho cada poll_seconds (con db, o con una sesión propia)
+        """
+        if self._version_due():
+            if db is not None:
+                return self._read_version(db)
+            with SessionLocal() as session:
+                return self._read_version(session)
+        return self._version
+
+    def invalidate(self) -> None:
+        """
+        Descarta la foto actual; la siguiente lectura consulta la versión y
+        recarga desde la base de datos. Llamar después del commit de una
+        escritura que incrementó la versión (bump_catalog_version).
+        """
+        with self._state_lock:
+            self._checked_at = None
+            self._snapshot = None
+
+    def update_stock(self, stock: Dict[int, int]) -> None:
+        """
+        Publica el stock nuevo de algunos productos ({id_producto: stock}) en la
+        foto actual, sin recargarla ni cambiar la versión (ni el ETag).
+        Lo usa el checkout: cada compra cambia solo el stock, y recargar el
+        catálogo entero (e invalidar la caché HTTP de todos los clientes) en
+        cada compra anularía la caché. Los demás workers publican el stock
+        nuevo al recargar su foto (CATALOG_CACHE_TTL_SECONDS).
+        """
+        with self._state_lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            for id_producto, valor in stock.items():
+                producto = snapshot.productos_by_id.get(id_producto)
+                if producto is None:
+                    continue
+                producto.stock = valor
+                snapshot.productos_json[id_producto]["stock"] = valor
+
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - snapshot.loaded_at < self.ttl_seconds
+        )
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        """Obtiene la foto vigente del catálogo, cargándola si es necesario"""
+        self.current_version(db)
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        # Un solo hilo recarga; los demás esperan y reutilizan el resultado
+        with self._load_lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+
+            version = self._version
+            return self._store(self._load(db, version), version)
+
+    async def get_async(self, db: AsyncSession) -> CatalogSnapshot:
+        """Como get(), para endpoints async: las consultas corren con await db.run_sync"""
+        if self._version_due():
+            await db.run_sync(self._read_version)
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        async with self._async_load_lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+
+            version = self._version
+            return self._store(await db.run_sync(self._load, version), version)
+
+    def _store(self, snapshot: CatalogSnapshot, version: int) -> CatalogSnapshot:
+        # Solo se guarda si no hubo una invalidación durante la carga
+        with self._state_lock:
+            if version == self._version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def _load(self, db: Session, version: int) -> CatalogSnapshot:
+        productos = db.query(Producto).options(
+            joinedload(Producto.categoria),
+            joinedload(Producto.subcategoria),
+            joinedload(Producto.iva)
+        ).order_by(Producto.id_producto).all()
+
+        categoria_ids = {row[0] for row in db.query(Categoria.id_categoria).all()}
+        subcategoria_ids = {row[0] for row in db.query(Subcategoria.id_subcategoria).all()}
+
+        return CatalogSnapshot(
+            version=version,
+            productos=[build_producto_detail(producto) for producto in productos],
+            categoria_ids=categoria_ids,
+            subcategoria_ids=subcategoria_ids
+        )
+
+
+class CatalogCountCache:
+    """
+    Caché de totales (COUNT) de los listados del catálogo.
+
+    Cada total se guarda con la versión del catálogo en que se calculó;
+    cualquier escritura que invalide el catálogo invalida también los totales.
+    """
+
+    def __init__(self, cache: CatalogCache, ttl_seconds: int, max_entries: int = 1024):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._counts: Dict[Hashable, Tuple[int, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], int]) -> int:
+        """Retorna el total cacheado para la clave o lo calcula con compute()"""
+        version = self.cache.current_version()
+        entry = self._counts.get(key)
+        if (
+            entry is not None
+            and entry[0] == version
+            and time.monotonic() - entry[1] < self.ttl_seconds
+        ):
+            return entry[2]
+
+        value = compute()
+        with self._lock:
+            if len(self._counts) >= self.max_entries:
+                self._counts.clear()
+            self._counts[key] = (version, time.monotonic(), value)
+        return value
+
+
+# Instancias compartidas por el proceso
+catalog_cache = CatalogCache(
+    ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS,
+    poll_seconds=settings.CATALOG_VERSION_POLL_SECONDS
+)
+catalog_counts = CatalogCountCache(catalog_cache, ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS)
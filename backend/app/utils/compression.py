@@ -0,0 +1,268 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+# Tipos de contenido que vale la pena comprimir (las imágenes ya vienen comprimidas)
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/"
+)
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Codificaciones disponibles, en orden de preferencia ante empate de q"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Codificación a usar según Accept-Encoding (con valores q), o None.
+    "br;q=1, gzip;q=0.8" -> "br"; "gzip;q=0" -> None
+    """
+    calidades: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        calidades[nombre] = q
+
+    mejor, mejor_q = None, 0.0
+    for encoding in supported_encodings():
+        q = calidades.get(encoding, calidades.get("*", 0.0))
+        if q > mejor_q:
+            mejor, mejor_q = encoding, q
+    return mejor
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Comprime un cuerpo completo (mtime=0: mismo resultado para el mismo cuerpo)"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Compresión por partes para respuestas en streaming (exportación de ventas)"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Cada parte se envía al cliente en cuanto llega (flush), sin esperar al final
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressedResponseCache:
+    """
+    LRU acotado de cuerpos ya comprimidos, por ruta (con query string) y codificación.
+    Cada entrada guarda el ETag y el CRC32 del cuerpo original: solo se
+    reutiliza si ambos coinciden. Una escritura del catálogo (nuevo ETag) o un
+    cambio de stock publicado sin cambiar el ETag (checkout) reemplaza la entrada.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # (ruta, codificación) -> (etag, crc32 del original, cuerpo comprimido)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, encoding: str, etag: str, crc: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get((path, encoding))
+            if entry is None or entry[0] != etag or entry[1] != crc:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((path, encoding))
+            self.hits += 1
+            return entry[2]
+
+    def put(self, path: str, encoding: str, etag: str, crc: int, body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(path, encoding)] = (etag, crc, body)
+            self._entries.move_to_end((path, encoding))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(len(body) for _, _, body in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "encodings": list(supported_encodings())
+            }
+
+
+# Cuerpos comprimidos del proceso
+compression_cache = CompressedResponseCache(max_entries=settings.COMPRESSION_CACHE_ENTRIES)
+
+
+class CompressionMiddleware:
+    """
+    Comprime las respuestas con brotli o gzip según Accept-Encoding.
+
+    - Solo tipos de texto/JSON de al menos minimum_size bytes (las respuestas en
+      streaming se comprimen por partes).
+    - Las respuestas públicas con ETag (catálogo) se guardan ya comprimidas en
+      compression_cache: mientras el cuerpo no cambie no se vuelven a comprimir.
+    - El ETag pasa a ser débil (W/): el cuerpo comprimido no es idéntico byte a
+      byte al original, pero la revalidación (If-None-Match) sigue funcionando.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, cache: Optional[CompressedResponseCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, scope, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Estado de una respuesta: retiene el inicio hasta ver el primer cuerpo"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, encoding: str, send: Send):
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.stream: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    def _path(self) -> str:
+        query = self.scope.get("query_string", b"")
+        return self.scope["path"] + ("?" + query.decode("latin-1") if query else "")
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        if self.start_message["status"] in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        # Un rango (Range) se refiere a los bytes sin comprimir: comprimirlo rompe Content-Range
+        if "content-range" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _cacheable(self, headers: MutableHeaders) -> bool:
+        return (
+            self.middleware.cache is not None
+            and self.scope["method"] == "GET"
+            and self.start_message["status"] == 200
+            and "etag" in headers
+            and "public" in headers.get("cache-control", "")
+            and "set-cookie" not in headers
+        )
+
+    def _mark_encoded(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        self._weaken_etag(headers)
+
+    def _weaken_etag(self, headers: MutableHeaders) -> None:
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        if self.stream is not None:
+            datos = self.stream.chunk(message.get("body", b""))
+            if not message.get("more_body", False):
+                datos += self.stream.finish()
+            await self._send({"type": "http.response.body", "body": datos, "more_body": message.get("more_body", False)})
+            return
+
+        # Primer cuerpo de la respuesta: decidir si se comprime
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self._compressible(headers) or (not more_body and len(body) < self.middleware.minimum_size):
+            self.passthrough = True
+            if self.start_message["status"] == 304:
+                # Mismo ETag (débil) que el 200 comprimido que tiene el cliente
+                self._weaken_etag(headers)
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        self._mark_encoded(headers)
+        if more_body:
+            # Streaming: se desconoce el tamaño final
+            del headers["content-length"]
+            self.stream = StreamCompressor(self.encoding)
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": self.stream.chunk(body), "more_body": True})
+            return
+
+        comprimido = None
+        if self._cacheable(headers):
+            # El CRC32 del cuerpo cuesta mucho menos que comprimirlo de nuevo
+            path, etag, crc = self._path(), headers["etag"], zlib.crc32(body)
+            comprimido = self.middleware.cache.get(path, self.encoding, etag, crc)
+            if comprimido is None:
+                comprimido = compress_body(body, self.encoding)
+                self.middleware.cache.put(path, self.encoding, etag, crc, comprimido)
+        else:
+            comprimido = compress_body(body, self.encoding)
+
+        headers["Content-Length"] = str(len(comprimido))
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": comprimido})
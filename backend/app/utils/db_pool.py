@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Any, Dict
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool.impl import AsyncAdaptedQueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout por una conexión
+    (incluye abrir una conexión nueva de overflow) y cuántos fallan por timeout.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += espera
+                self.wait_max = max(self.wait_max, espera)
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool):
+    """TimedQueuePool para el motor async (cola compatible con asyncio)"""
+
+    _is_asyncio = AsyncAdaptedQueuePool._is_asyncio
+    _queue_class = AsyncAdaptedQueuePool._queue_class
+    _dialect = AsyncAdaptedQueuePool._dialect
+
+
+def pool_metrics(engine: Engine) -> Dict[str, Any]:
+    """Estado del pool de conexiones del motor y tiempos de espera del checkout (ms)"""
+    pool = engine.pool
+    metrics: Dict[str, Any] = {"pool": type(pool).__name__, "status": pool.status()}
+
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout()
+        })
+
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            checkouts = pool.checkouts
+            metrics.update({
+                "checkouts": checkouts,
+                "timeouts": pool.timeouts,
+                "avg_wait_ms": round(pool.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "max_wait_ms": round(pool.wait_max * 1000, 3)
+            })
+    return metrics
@@ -0,0 +1,72 @@
+import math
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, Response
+from config import settings
+from .catalog_cache import catalog_cache
+
+def catalog_validators(now: Optional[float] = None) -> Tuple[str, datetime]:
+    """
+    ETag y Last-Modified de las respuestas públicas del catálogo.
+
+    Dependen solo de datos compartidos por todos los workers: la versión del
+    catálogo en la base de datos (cambia con cada escritura del catálogo) y la
+    ventana de CATALOG_CACHE_TTL_SECONDS en curso (el stock descontado en los
+    checkouts se publica con ese retraso máximo, igual que en la caché en memoria).
+    """
+    version = catalog_cache.current_version()
+    now = time.time() if now is None else now
+    ttl = max(catalog_cache.ttl_seconds, 1)
+    ventana = int(now // ttl)
+    etag = f'"{version}-{ventana}"'
+    # Segundos enteros: es la precisión de la cabecera HTTP
+    modificado = math.floor(max(catalog_cache.changed_at, ventana * ttl))
+    return etag, datetime.fromtimestamp(modificado, tz=timezone.utc)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (lista de ETags o "*")"""
+    if if_none_match.strip() == "*":
+        return True
+    valor = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == valor for candidato in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        fecha = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return last_modified <= fecha
+
+
+def catalog_http_cache(request: Request, response: Response) -> None:
+    """
+    Dependencia de los endpoints públicos del catálogo (usar en dependencies=[...]
+    de la ruta, así se evalúa antes de abrir la sesión de base de datos).
+
+    Si el cliente ya tiene la versión vigente (If-None-Match, o If-Modified-Since
+    cuando no envía ETag) responde 304 sin cuerpo; si no, agrega ETag,
+    Last-Modified y Cache-Control a la respuesta.
+    """
+    etag, last_modified = catalog_validators()
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={settings.CATALOG_HTTP_MAX_AGE}, must-revalidate"
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        no_modificado = etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        no_modificado = if_modified_since is not None and not_modified_since(if_modified_since, last_modified)
+
+    if no_modificado:
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
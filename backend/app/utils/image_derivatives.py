@@ -0,0 +1,197 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from config import settings
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow es opcional: sin él se sirven las imágenes originales
+    Image = None
+
+# Anchos (px) de las versiones redimensionadas de cada imagen de producto
+IMAGE_SIZES = {"grid": 320, "detail": 800, "zoom": 1600}
+
+PRODUCT_IMAGES_DIR = Path("static/images/products")
+PRODUCT_IMAGES_URL = "/static/images/products/"
+DERIVATIVES_URL = "/api/images/products/"
+
+# El nombre depende del contenido de la imagen original: si la imagen cambia, cambia la URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# <hash del original>-<ancho>.<formato>, p. ej. 3f2a9c0d1b7e4a65-320.webp
+DERIVATIVE_NAME = re.compile(r"(?P<hash>[0-9a-f]{16})-(?P<width>\d+)\.(?P<format>[a-z]+)")
+
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+
+def available_formats() -> Tuple[str, ...]:
+    """Formatos de IMAGE_DERIVATIVE_FORMATS que Pillow puede codificar, en orden de preferencia"""
+    if Image is None:
+        return ()
+    return tuple(formato for formato in settings.IMAGE_DERIVATIVE_FORMATS if formato in MEDIA_TYPES and features.check(formato))
+
+
+class ImageDerivatives:
+    """
+    Versiones redimensionadas (grid, detail, zoom) en AVIF/WebP de las imágenes de productos.
+
+    Se generan en la primera petición (o con scripts/generate_image_derivatives.py)
+    y se guardan en disco con un nombre derivado del hash del original, así
+    pueden servirse con caché inmutable. El hash y el ancho de cada original
+    se recalculan solo si cambia su fecha de modificación o su tamaño.
+    """
+
+    def __init__(self, source_dir: Path = PRODUCT_IMAGES_DIR, output_dir: Optional[Path] = None):
+        self.source_dir = Path(source_dir)
+        self.output_dir = Path(output_dir or settings.IMAGE_DERIVATIVES_DIR)
+        # nombre del original -> (mtime, tamaño en bytes, hash, ancho en px)
+        self._originales: Dict[str, Tuple[float, int, str, int]] = {}
+        # hash -> nombre del original
+        self._por_hash: Dict[str, str] = {}
+        # El directorio de originales se recorre una sola vez por proceso (ver _find_source)
+        self._indexado = False
+        self._lock = threading.Lock()
+
+    def _forget(self, nombre: str) -> None:
+        """Quita un original del índice (con el lock tomado)"""
+        anterior = self._originales.pop(nombre, None)
+        if anterior and self._por_hash.get(anterior[2]) == nombre:
+            del self._por_hash[anterior[2]]
+
+    def _source_info(self, nombre: str) -> Optional[Tuple[str, int]]:
+        """Hash y ancho del original, o None si no existe o no es una imagen"""
+        ruta = self.source_dir / nombre
+        try:
+            stat = ruta.stat()
+        except OSError:
+            with self._lock:
+                self._forget(nombre)
+            return None
+        with self._lock:
+            cacheado = self._originales.get(nombre)
+        if cacheado and cacheado[0] == stat.st_mtime and cacheado[1] == stat.st_size:
+            return cacheado[2], cacheado[3]
+
+        try:
+            with open(ruta, "rb") as archivo:
+                contenido_hash = hashlib.sha256(archivo.read()).hexdigest()[:16]
+            # Solo lee la cabecera de la imagen
+            with Image.open(ruta) as imagen:
+                ancho = imagen.width
+        except OSError:
+            return None
+        with self._lock:
+            # Original reemplazado con el mismo nombre: el hash anterior deja de servirse
+            self._forget(nombre)
+            self._originales[nombre] = (stat.st_mtime, stat.st_size, contenido_hash, ancho)
+            self._por_hash[contenido_hash] = nombre
+        return contenido_hash, ancho
+
+    def srcset(self, nombre: str) -> Dict[str, str]:
+        """
+        srcset por formato de una imagen de static/images/products, p. ej.
+        {"avif": "/api/images/products/<hash>-320.avif 320w, ...", "webp": "..."}.
+        Vacío si Pillow no está instalado o el archivo no existe.
+        Un original más angosto que un tamaño no se amplía: se anuncia con su ancho real.
+        """
+        formatos = available_formats()
+        if not formatos or "/" in nombre:
+            return {}
+        info = self._source_info(nombre)
+        if info is None:
+            return {}
+        contenido_hash, ancho_original = info
+
+        candidatos = []
+        anunciados = set()
+        for ancho in sorted(IMAGE_SIZES.values()):
+            ancho_real = min(ancho, ancho_original)
+            if ancho_real in anunciados:
+                continue
+            anunciados.add(ancho_real)
+            candidatos.append((ancho, ancho_real))
+
+        return {
+            formato: ", ".join(
+                f"{DERIVATIVES_URL}{contenido_hash}-{ancho}.{formato} {ancho_real}w"
+                for ancho, ancho_real in candidatos
+            )
+            for formato in formatos
+        }
+
+    def _find_source(self, contenido_hash: str) -> Optional[str]:
+        """Nombre del original con ese hash, o None si no está en el índice"""
+        if not self._indexado:
+            # Índice vacío (p. ej. después de reiniciar): se recorren los originales una única vez.
+            # Después, srcset() indexa cada original nuevo antes de anunciar sus URLs.
+            for ruta in self.source_dir.iterdir():
+                if ruta.is_file():
+                    self._source_info(ruta.name)
+            self._indexado = True
+
+        with self._lock:
+            nombre = self._por_hash.get(contenido_hash)
+        if nombre is None:
+            return None
+        # El original pudo cambiar en disco desde que se indexó
+        info = self._source_info(nombre)
+        if info is None or info[0] != contenido_hash:
+            return None
+        return nombre
+
+    def get_or_create(self, contenido_hash: str, ancho: int, formato: str) -> Optional[Path]:
+        """Ruta de la versión pedida, generándola si no existe; None si el pedido no es válido"""
+        if ancho not in IMAGE_SIZES.values() or formato not in available_formats():
+            return None
+        destino = self.output_dir / f"{contenido_hash}-{ancho}.{formato}"
+        if destino.exists():
+            return destino
+
+        nombre = self._find_source(contenido_hash)
+        if nombre is None:
+            return None
+        self._render(self.source_dir / nombre, destino, ancho, formato)
+        return destino
+
+    def _render(self, origen: Path, destino: Path, ancho: int, formato: str) -> None:
+        with Image.open(origen) as imagen:
+            imagen.load()
+            if imagen.mode not in ("RGB", "RGBA"):
+                imagen = imagen.convert("RGBA" if "transparency" in imagen.info or imagen.mode in ("LA", "PA") else "RGB")
+            if imagen.width > ancho:
+                alto = max(1, round(imagen.height * ancho / imagen.width))
+                imagen = imagen.resize((ancho, alto), Image.Resampling.LANCZOS)
+
+            # Escribir en un temporal y renombrar: una petición concurrente nunca ve un archivo a medias
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=self.output_dir, suffix=f".{formato}.tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as archivo:
+                    imagen.save(archivo, format=formato.upper(), quality=settings.IMAGE_DERIVATIVE_QUALITY)
+                os.replace(temporal, destino)
+            except BaseException:
+                os.unlink(temporal)
+                raise
+
+    def generate_all(self) -> List[Path]:
+        """Genera todas las versiones de todos los originales (las existentes se omiten)"""
+        generadas = []
+        for ruta in sorted(self.source_dir.iterdir()):
+            info = self._source_info(ruta.name) if ruta.is_file() else None
+            if info is None:
+                continue
+            for ancho in IMAGE_SIZES.values():
+                for formato in available_formats():
+                    destino = self.output_dir / f"{info[0]}-{ancho}.{formato}"
+                    if not destino.exists():
+                        self._render(ruta, destino, ancho, formato)
+                        generadas.append(destino)
+        return generadas
+
+
+# Versiones de las imágenes de productos del proceso
+image_derivatives = ImageDerivatives()
@@ -1,7 +1,35 @@
 import json
 from typing import List, Dict, Optional
+from .image_derivatives import PRODUCT_IMAGES_URL, image_derivatives
+from .static_assets import static_manifest
+
+# Las URLs de imágenes del carrito son absolutas
+BACKEND_URL = "http://localhost:8000"
 
 def parse_product_images(imagen_field: Optional[str]) -> Dict[str, any]:
+    """
+    Parsea el campo imagen del producto (ver _parse_image_urls) y agrega el
+    srcset de cada imagen propia en AVIF/WebP por tamaño (grid, detail, zoom):
+    - srcset: {"avif": "url 320w, url 800w, ...", "webp": "..."} de la principal
+    - galeria_srcset: lista con el srcset de cada imagen de la galería
+    Las URLs externas (http/https) no tienen srcset ({}).
+    Las URLs de /static/ llevan la huella del archivo (ver static_assets), así
+    el navegador las guarda en caché sin revalidarlas.
+    """
+    imagenes = _parse_image_urls(imagen_field)
+    imagenes["srcset"] = image_srcset(imagenes["principal"])
+    imagenes["galeria_srcset"] = [image_srcset(url) for url in imagenes["galeria"]]
+    imagenes["principal"] = static_manifest.url_for(imagenes["principal"])
+    imagenes["galeria"] = [static_manifest.url_for(url) for url in imagenes["galeria"]]
+    return imagenes
+
+def image_srcset(url: str) -> Dict[str, str]:
+    """srcset por formato de una imagen de /static/images/products/"""
+    if not url or not url.startswith(PRODUCT_IMAGES_URL):
+        return {}
+    return image_derivatives.srcset(url[len(PRODUCT_IMAGES_URL):])
+
+def _parse_image_urls(imagen_field: Optional[str]) -> Dict[str, any]:
     """
     Parsea el campo imagen del producto para manejar múltiples imágenes.
     Soporta diferentes formatos:
@@ -22,12 +50,24 @@ def parse_product_images(imagen_field: Optional[str]) -> Dict[str, any]:
         if isinstance(data, dict):
             principal = data.get("principal", data.get("galeria", [""])[0] if data.get("galeria") else "")
             galeria = data.get("galeria", [principal]) if principal else []
+            if not principal:
+                return {
+                    "principal": "/static/images/products/default.webp",
+                    "galeria": ["/static/images/products/default.webp"]
+                }
+            # Los nombres de archivo del JSON pasan por la misma conversión que las URLs separadas
             return {
-                "principal": principal,
-                "galeria": galeria
+                "principal": _image_url(principal),
+                "galeria": [_image_url(url) for url in galeria if url]
             }
     except (json.JSONDecodeError, TypeError):
         pass
+    if imagen_field.lstrip().startswith("{"):
+        # JSON inválido: no es un nombre de archivo
+        return {
+            "principal": "/static/images/products/default.webp",
+            "galeria": ["/static/images/products/default.webp"]
+        }
     
     # Si no es JSON, tratar como URLs separadas
     urls = []
@@ -46,20 +86,23 @@ def parse_product_images(imagen_field: Optional[str]) -> Dict[str, any]:
         }
     
     # Convertir nombres de archivo a URLs completas del backend
-    processed_urls = []
-    for url in urls:
-        if url.startswith(('http://', 'https://')):
-            # Es una URL completa, mantenerla
-            processed_urls.append(url)
-        else:
-            # Es un nombre de archivo, convertir a URL del backend
-            processed_urls.append(f"/static/images/products/{url}")
+    processed_urls = [_image_url(url) for url in urls]
     
     return {
         "principal": processed_urls[0],
         "galeria": processed_urls
     }
 
+def _image_url(url: str) -> str:
+    """
+    URL de una imagen de producto: un nombre de archivo pasa a
+    /static/images/products/<nombre>; las URLs completas (http/https) y las
+    de /static/ se mantienen
+    """
+    if url.startswith(('http://', 'https://', '/static/')):
+        return url
+    return f"{PRODUCT_IMAGES_URL}{url}"
+
 def format_product_images(principal_url: str, galeria_urls: Optional[List[str]] = None) -> str:
     """
     Formatea las imágenes del producto para guardar en la base de datos.
@@ -77,14 +120,27 @@ def format_product_images(principal_url: str, galeria_urls: Optional[List[str]]
 
 def get_principal_image(imagen_field: Optional[str]) -> str:
     """
-    Obtiene la imagen principal del producto.
+    Obtiene la imagen principal del producto (con huella si es de /static/).
     """
-    parsed = parse_product_images(imagen_field)
-    return parsed["principal"]
+    parsed = _parse_image_urls(imagen_field)
+    return static_manifest.url_for(parsed["principal"])
 
 def get_image_gallery(imagen_field: Optional[str]) -> List[str]:
     """
-    Obtiene la galería de imágenes del producto.
+    Obtiene la galería de imágenes del producto (con huella si son de /static/).
+    """
+    parsed = _parse_image_urls(imagen_field)
+    return [static_manifest.url_for(url) for url in parsed["galeria"]]
+
+def get_cart_image_url(imagen_field: Optional[str]) -> str:
+    """
+    Obtiene la URL completa de la imagen principal para mostrar en el carrito.
+    Acepta los mismos formatos que parse_product_images, y también la URL
+    completa del backend que devolvió una respuesta anterior.
     """
-    parsed = parse_product_images(imagen_field)
-    return parsed["galeria"]
+    if imagen_field and imagen_field.startswith(BACKEND_URL + "/static/"):
+        imagen_field = imagen_field[len(BACKEND_URL):]
+    principal = get_principal_image(imagen_field)
+    if principal.startswith("/"):
+        return f"{BACKEND_URL}{principal}"
+    return principal
@@ -0,0 +1,67 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la biblioteca estándar
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Decimal como texto, igual que Pydantic (sin pérdida de precisión)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+
+def dump_json(content: Any) -> bytes:
+    """Codifica dicts, listas y valores de la base de datos (Decimal, fechas) a JSON"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON para listados: el endpoint la retorna directamente con
+    dicts ya armados y FastAPI no construye ni valida un modelo Pydantic por fila.
+    El response_model de la ruta se conserva solo para la documentación.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def row_dicts(
+    rows: Iterable[Any],
+    extra: Optional[Dict[str, Any]] = None,
+    exclude: Iterable[str] = ()
+) -> List[Dict[str, Any]]:
+    """
+    Filas de una consulta por columnas (Row) como dicts para JSON.
+    extra agrega campos constantes del esquema que la consulta no trae;
+    exclude quita columnas auxiliares (p. ej. el score de orden).
+    """
+    dicts = [row._asdict() for row in rows]
+    for campo in exclude:
+        for fila in dicts:
+            del fila[campo]
+    if extra:
+        dicts = [{**fila, **extra} for fila in dicts]
+    return dicts
+
+
+def list_response(
+    key: str,
+    items: List[Any],
+    total: Optional[int],
+    next_cursor: Optional[str],
+    headers: Optional[Mapping[str, str]] = None
+) -> FastJSONResponse:
+    """Respuesta de listado paginado ({key: [...], total, next_cursor})"""
+    return FastJSONResponse({key: items, "total": total, "next_cursor": next_cursor}, headers=headers)
@@ -0,0 +1,93 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Codifica la posición de la última fila de una página como un cursor opaco.
+    Las fechas se guardan en formato ISO y los Decimal como texto (sin pérdida).
+    """
+    serializable = [
+        value.isoformat() if isinstance(value, datetime)
+        else str(value) if isinstance(value, Decimal)
+        else value
+        for value in values
+    ]
+    raw = json.dumps(serializable, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decodifica un cursor generado por encode_cursor.
+    Lanza HTTP 400 si el cursor no es válido o no tiene el tamaño esperado.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return values
+
+
+def decode_datetime(value: Any) -> datetime:
+    """Convierte un valor de cursor en datetime; lanza HTTP 400 si no es válido"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Decodifica un cursor de listados ordenados por ID (el ID de la última fila).
+    Retorna None si no se envió cursor.
+    """
+    if not cursor:
+        return None
+
+    last_id = decode_cursor(cursor, 1)[0]
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return last_id
+
+
+def paginate_query(query: Query, id_column, skip: int, limit: int, after_id: Optional[int] = None) -> list:
+    """
+    Aplica la paginación a una consulta ordenada por ID.
+    Con after_id usa keyset (WHERE id > after_id), sin descartar filas;
+    sin cursor mantiene el offset clásico.
+    """
+    query = query.order_by(id_column)
+    if after_id is not None:
+        return query.filter(id_column > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+
+def keyset_page(items: list, limit: int, cursor_values: Callable[[Any], List[Any]]) -> Tuple[list, Optional[str]]:
+    """
+    Recorta una lista obtenida con limit + 1 filas.
+    cursor_values retorna los valores de orden de una fila (p. ej. [id]).
+    Retorna la página y el cursor de la siguiente (None si es la última).
+    """
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_cursor(cursor_values(items[-1]))
+    return items, None
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from config import settings
+from .auth import pwd_context
+
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt (verificar y generar hashes) en un pool de hilos propio y acotado.
+
+    - Los handlers async esperan el resultado sin ocupar el event loop ni el
+      threadpool compartido de los endpoints sync.
+    - bcrypt libera el GIL, así que los hilos del pool corren en paralelo.
+    - Si hay más de workers + queue_limit tareas pendientes se responde 503
+      en lugar de encolar sin límite durante una ráfaga de logins.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, queue_limit: int):
+        self.context = context
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0  # en cola + en ejecución
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Servicio de autenticación ocupado, intenta de nuevo",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+
+        encolado = time.perf_counter()
+
+        def run() -> Any:
+            inicio = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                fin = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                    self._wait_total += inicio - encolado
+                    self._wait_max = max(self._wait_max, inicio - encolado)
+                    self._run_total += fin - inicio
+
+        return asyncio.wrap_future(self._executor.submit(run))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifica la contraseña contra el hash en el pool de hashing"""
+        return await self._submit(self.context.verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """Genera el hash de la contraseña en el pool de hashing"""
+        return await self._submit(self.context.hash, password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True si el hash usa un costo (rounds) distinto al configurado"""
+        return self.context.needs_update(hashed_password)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Estado del pool y tiempos promedio de espera y ejecución (ms)"""
+        with self._lock:
+            completadas = self._completed
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "rounds": settings.BCRYPT_ROUNDS,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": completadas,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / completadas * 1000, 3) if completadas else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+                "avg_run_ms": round(self._run_total / completadas * 1000, 3) if completadas else 0.0
+            }
+
+
+# Instancia compartida por el proceso
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT
+)
@@ -0,0 +1,54 @@
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, status
+from .pagination import decode_cursor
+
+# Órdenes del listado de productos. Todos desempatan por id_producto ascendente.
+ORDENES = ("id", "nombre", "precio_asc", "precio_desc", "relevancia")
+ORDEN_PATTERN = f"^({'|'.join(ORDENES)})$"
+
+
+def producto_sort_values(producto: Any, orden: str, score: float = 0.0) -> List[Any]:
+    """
+    Valores de orden de un producto (modelo o esquema) para el cursor de paginación
+    """
+    if orden == "nombre":
+        return [producto.nombre or "", producto.id_producto]
+    if orden in ("precio_asc", "precio_desc"):
+        return [producto.valor if producto.valor is not None else Decimal(0), producto.id_producto]
+    if orden == "relevancia":
+        return [score, producto.id_producto]
+    return [producto.id_producto]
+
+
+def producto_sort_key(values: List[Any], orden: str) -> Tuple:
+    """Convierte los valores de orden en una clave ascendente para ordenar en memoria"""
+    if orden in ("precio_desc", "relevancia"):
+        return (-values[0], values[1])
+    return tuple(values)
+
+
+def decode_producto_cursor(cursor: Optional[str], orden: str) -> Optional[List[Any]]:
+    """
+    Decodifica el cursor de un listado de productos según el orden.
+    Retorna None si no se envió cursor; lanza HTTP 400 si no es válido.
+    """
+    if not cursor:
+        return None
+
+    values = decode_cursor(cursor, 1 if orden == "id" else 2)
+    try:
+        if not isinstance(values[-1], int) or isinstance(values[-1], bool):
+            raise ValueError
+        if orden == "nombre":
+            values[0] = str(values[0])
+        elif orden in ("precio_asc", "precio_desc"):
+            values[0] = Decimal(str(values[0]))
+        elif orden == "relevancia":
+            values[0] = float(values[0])
+    except (ValueError, TypeError, InvalidOperation):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return values
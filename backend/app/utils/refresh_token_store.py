@@ -0,0 +1,163 @@
+import hashlib
+import heapq
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from config import settings
+from ..database import SessionLocal
+from ..models.refresh_token import RefreshToken
+
+
+def utc_now() -> datetime:
+    """Hora UTC sin zona horaria (como se guarda en la base de datos)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RefreshTokenStore(ABC):
+    """Registro de refresh tokens vigentes (permite revocarlos en el logout)"""
+
+    @abstractmethod
+    def add(self, token: str, user_id: Optional[int], expires_at: datetime) -> None:
+        """Registra un refresh token emitido; expires_at en UTC sin zona horaria"""
+
+    @abstractmethod
+    def contains(self, token: str) -> bool:
+        """True si el token fue emitido, no fue revocado y no venció"""
+
+    @abstractmethod
+    def revoke(self, token: str) -> bool:
+        """Revoca un token; retorna False si no existía o ya estaba revocado"""
+
+    @abstractmethod
+    def cleanup(self) -> int:
+        """Elimina los tokens vencidos y retorna cuántos eliminó"""
+
+
+class InMemoryRefreshTokenStore(RefreshTokenStore):
+    """
+    Tokens en memoria del proceso (un solo worker).
+    Un heap ordenado por expiración permite descartar los vencidos en
+    O(log n) cada uno, sin recorrer todos los tokens.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, Tuple[Optional[int], datetime]] = {}
+        self._heap: List[Tuple[datetime, str]] = []
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: datetime) -> int:
+        eliminados = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, token = heapq.heappop(self._heap)
+            # El token pudo haberse revocado (o registrado de nuevo) antes de vencer
+            entry = self._tokens.get(token)
+            if entry is not None and entry[1] == expires_at:
+                del self._tokens[token]
+                eliminados += 1
+        return eliminados
+
+    def add(self, token: str, user_id: Optional[int], expires_at: datetime) -> None:
+        with self._lock:
+            self._evict_expired(utc_now())
+            self._tokens[token] = (user_id, expires_at)
+            heapq.heappush(self._heap, (expires_at, token))
+
+    def contains(self, token: str) -> bool:
+        with self._lock:
+            self._evict_expired(utc_now())
+            return token in self._tokens
+
+    def revoke(self, token: str) -> bool:
+        with self._lock:
+            # La entrada del heap queda huérfana y se descarta al vencer
+            return self._tokens.pop(token, None) is not None
+
+    def cleanup(self) -> int:
+        with self._lock:
+            return self._evict_expired(utc_now())
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+
+class SqlRefreshTokenStore(RefreshTokenStore):
+    """
+    Tokens en la tabla tbl_refresh_token, compartidos por todos los workers
+    y persistentes entre reinicios. Se guarda el SHA-256 del token, no el token.
+    Los vencidos se borran por el índice de fecha_expiracion cada cleanup_every registros.
+    """
+
+    def __init__(self, session_factory=SessionLocal, cleanup_every: int = 100):
+        self.session_factory = session_factory
+        self.cleanup_every = cleanup_every
+        self._adds = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def add(self, token: str, user_id: Optional[int], expires_at: datetime) -> None:
+        db = self.session_factory()
+        try:
+            # INSERT directo (token_hash es la clave primaria)
+            db.add(RefreshToken(token_hash=self._hash(token), id_usuario=user_id, fecha_expiracion=expires_at))
+            db.commit()
+        except IntegrityError:
+            # Mismo token emitido dos veces (mismo usuario y exp en el mismo segundo): ya está registrado
+            db.rollback()
+        finally:
+            db.close()
+
+        with self._lock:
+            self._adds += 1
+            limpiar = self._adds % self.cleanup_every == 0
+        if limpiar:
+            self.cleanup()
+
+    def contains(self, token: str) -> bool:
+        db = self.session_factory()
+        try:
+            return db.query(RefreshToken.token_hash).filter(
+                RefreshToken.token_hash == self._hash(token),
+                RefreshToken.fecha_expiracion > utc_now()
+            ).first() is not None
+        finally:
+            db.close()
+
+    def revoke(self, token: str) -> bool:
+        db = self.session_factory()
+        try:
+            eliminados = db.query(RefreshToken).filter(
+                RefreshToken.token_hash == self._hash(token)
+            ).delete(synchronize_session=False)
+            db.commit()
+            return eliminados > 0
+        finally:
+            db.close()
+
+    def cleanup(self) -> int:
+        db = self.session_factory()
+        try:
+            eliminados = db.query(RefreshToken).filter(
+                RefreshToken.fecha_expiracion <= utc_now()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return eliminados
+        finally:
+            db.close()
+
+
+def build_refresh_token_store(kind: str) -> RefreshTokenStore:
+    """Crea el almacén configurado en REFRESH_TOKEN_STORE ("memory" o "sql")"""
+    if kind == "sql":
+        return SqlRefreshTokenStore()
+    if kind == "memory":
+        return InMemoryRefreshTokenStore()
+    raise ValueError(f"REFRESH_TOKEN_STORE inválido: {kind} (usar 'memory' o 'sql')")
+
+
+# Instancia compartida por el proceso
+refresh_token_store = build_refresh_token_store(settings.REFRESH_TOKEN_STORE)
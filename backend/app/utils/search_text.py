@@ -0,0 +1,25 @@
+import re
+import unicodedata
+from typing import List
+
+# Longitud mínima de término que indexa MySQL FULLTEXT (innodb_ft_min_token_size)
+MIN_TOKEN_LENGTH = 3
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_search_text(value: str) -> str:
+    """
+    Normaliza texto para búsqueda: minúsculas y sin tildes
+    ("Jabón Líquido" -> "jabon liquido").
+    """
+    if not value:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", value)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_tildes.casefold()
+
+
+def tokenize_search(value: str) -> List[str]:
+    """Separa un término de búsqueda normalizado en palabras"""
+    return _TOKEN_RE.findall(normalize_search_text(value))
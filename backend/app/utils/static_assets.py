@@ -0,0 +1,139 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+from starlette.types import Scope
+from config import settings
+
+# Un año: la URL con huella cambia cuando cambia el contenido del archivo
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# nombre.<huella>.ext, p. ej. default.3f2a9c0d1b7e.webp
+FINGERPRINTED_NAME = re.compile(r"(?P<stem>.+)\.(?P<hash>[0-9a-f]{12})(?P<ext>\.[^.]+)?")
+
+
+class StaticManifest:
+    """
+    Huellas (hash del contenido) de los archivos de static/.
+
+    images/products/default.webp -> images/products/default.3f2a9c0d1b7e.webp
+    La huella de cada archivo se recalcula solo si cambia su fecha de
+    modificación o su tamaño.
+    """
+
+    def __init__(self, directory: str = "static", url_prefix: str = "/static/", exclude: Tuple[str, ...] = ()):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        # Subdirectorios que no se listan en el manifiesto (p. ej. archivos ya direccionados por contenido)
+        self.exclude = tuple(os.path.normpath(ruta) for ruta in exclude)
+        # ruta relativa -> (mtime, tamaño en bytes, huella)
+        self._hashes: Dict[str, Tuple[float, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        """Huella de un archivo (ruta relativa a static/), o None si no existe"""
+        path = os.path.normpath(path)
+        if path.startswith(("..", "/")):
+            return None
+        ruta = os.path.join(self.directory, path)
+        try:
+            stat = os.stat(ruta)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            cacheado = self._hashes.get(path)
+        if cacheado and cacheado[0] == stat.st_mtime and cacheado[1] == stat.st_size:
+            return cacheado[2]
+
+        try:
+            with open(ruta, "rb") as archivo:
+                huella = hashlib.sha256(archivo.read()).hexdigest()[:12]
+        except OSError:
+            return None
+        with self._lock:
+            self._hashes[path] = (stat.st_mtime, stat.st_size, huella)
+        return huella
+
+    def asset_path(self, path: str) -> str:
+        """Ruta con huella; la misma ruta si el archivo no existe"""
+        huella = self.fingerprint(path)
+        if huella is None:
+            return path
+        base, ext = os.path.splitext(path)
+        return f"{base}.{huella}{ext}"
+
+    def url(self, path: str) -> str:
+        """URL con huella de un archivo de static/ (p. ej. "images/products/default.webp")"""
+        return self.url_prefix + self.asset_path(path)
+
+    def url_for(self, url: str) -> str:
+        """Agrega la huella a una URL de /static/; las demás URLs no cambian"""
+        if not url.startswith(self.url_prefix):
+            return url
+        return self.url(url[len(self.url_prefix):])
+
+    def resolve(self, path: str) -> Optional[str]:
+        """
+        Ruta original de una ruta con huella, si la huella corresponde al
+        contenido actual del archivo; None en otro caso
+        """
+        carpeta, nombre = os.path.split(path)
+        partes = FINGERPRINTED_NAME.fullmatch(nombre)
+        if not partes:
+            return None
+        original = os.path.join(carpeta, partes["stem"] + (partes["ext"] or ""))
+        if self.fingerprint(original) != partes["hash"]:
+            return None
+        return original
+
+    def manifest(self) -> Dict[str, str]:
+        """Todas las rutas de static/ con su ruta con huella"""
+        rutas = {}
+        for carpeta, subcarpetas, archivos in os.walk(self.directory):
+            relativa = os.path.relpath(carpeta, self.directory)
+            subcarpetas[:] = sorted(
+                nombre for nombre in subcarpetas
+                if os.path.normpath(os.path.join(relativa, nombre)) not in self.exclude
+            )
+            for nombre in sorted(archivos):
+                path = os.path.normpath(os.path.join(relativa, nombre)).replace(os.sep, "/")
+                rutas[path] = self.asset_path(path)
+        return rutas
+
+
+def _static_exclude() -> Tuple[str, ...]:
+    # Las versiones de imágenes ya tienen el hash en el nombre (ver image_derivatives)
+    derivadas = os.path.relpath(settings.IMAGE_DERIVATIVES_DIR, "static")
+    return () if derivadas.startswith("..") else (derivadas,)
+
+
+# Manifiesto de static/ del proceso
+static_manifest = StaticManifest(exclude=_static_exclude())
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles que también sirve las rutas con huella del manifiesto.
+
+    - Con huella vigente: el archivo original con Cache-Control inmutable de un año.
+    - Sin huella: el archivo con revalidación (STATIC_MAX_AGE) por ETag / Last-Modified.
+    - Una huella que ya no corresponde al contenido responde 404.
+    Las peticiones condicionales (304) y por rangos (206) las resuelve StaticFiles.
+    """
+
+    def __init__(self, *args, manifest: StaticManifest = static_manifest, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        original = await anyio.to_thread.run_sync(self.manifest.resolve, path)
+        response = await super().get_response(original or path, scope)
+        if original is not None:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["Cache-Control"] = f"public, max-age={settings.STATIC_MAX_AGE}, must-revalidate"
+        return response
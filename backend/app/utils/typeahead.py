@@ -0,0 +1,152 @@
+import bisect
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..schemas.product import ProductoDetailResponse
+from .catalog_cache import CatalogCache, CatalogSnapshot, catalog_cache
+from .search_text import tokenize_search
+
+# Similitud mínima (Jaccard de trigramas) para aceptar una palabra con errores de tipeo
+FUZZY_MIN_SIMILARITY = 0.3
+# Palabras más cortas que esto solo se buscan por prefijo
+FUZZY_MIN_LENGTH = 3
+
+
+def word_trigrams(word: str) -> Set[str]:
+    """Trigramas de una palabra con relleno al inicio y al final ("  jab", ...)"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TypeaheadIndex:
+    """
+    Índice en memoria para autocompletar productos activos.
+
+    - Prefijo: lista ordenada de palabras (nombre, marca, código normalizados)
+      recorrida con búsqueda binaria.
+    - Difuso: índice invertido de trigramas por palabra, para tolerar
+      errores de tipeo cuando una palabra no coincide por prefijo.
+    """
+
+    def __init__(self, productos: List[ProductoDetailResponse]):
+        self.productos: Dict[int, ProductoDetailResponse] = {
+            p.id_producto: p for p in productos if p.estado == "ACTIVO"
+        }
+
+        word_ids: Dict[str, Set[int]] = defaultdict(set)
+        for producto in self.productos.values():
+            texto = " ".join(filter(None, [producto.nombre, producto.marca, producto.codigo]))
+            for word in tokenize_search(texto):
+                word_ids[word].add(producto.id_producto)
+
+        self.words: List[str] = sorted(word_ids)
+        self.word_ids = word_ids
+
+        self.trigrams: Dict[str, List[int]] = defaultdict(list)
+        self.word_trigram_count: List[int] = []
+        for indice, word in enumerate(self.words):
+            trigramas = word_trigrams(word)
+            self.word_trigram_count.append(len(trigramas))
+            for trigrama in trigramas:
+                self.trigrams[trigrama].append(indice)
+
+    def _prefix_ids(self, prefix: str) -> Set[int]:
+        """IDs de productos con alguna palabra que empieza por prefix"""
+        ids: Set[int] = set()
+        indice = bisect.bisect_left(self.words, prefix)
+        while indice < len(self.words) and self.words[indice].startswith(prefix):
+            ids |= self.word_ids[self.words[indice]]
+            indice += 1
+        return ids
+
+    def _fuzzy_scores(self, token: str) -> Dict[int, float]:
+        """IDs de productos con una palabra parecida a token y su similitud"""
+        trigramas = word_trigrams(token)
+        compartidos: Dict[int, int] = defaultdict(int)
+        for trigrama in trigramas:
+            for indice in self.trigrams.get(trigrama, ()):
+                compartidos[indice] += 1
+
+        scores: Dict[int, float] = {}
+        for indice, comunes in compartidos.items():
+            similitud = comunes / (len(trigramas) + self.word_trigram_count[indice] - comunes)
+            if similitud < FUZZY_MIN_SIMILARITY:
+                continue
+            for id_producto in self.word_ids[self.words[indice]]:
+                if similitud > scores.get(id_producto, 0.0):
+                    scores[id_producto] = similitud
+        return scores
+
+    def suggest(self, query: str, limit: int = 10) -> List[ProductoDetailResponse]:
+        """
+        Productos que coinciden con todas las palabras de la consulta.
+        Cada palabra coincide por prefijo (puntaje 1) o, si no hay ninguna
+        coincidencia por prefijo, por similitud de trigramas (puntaje < 1).
+        """
+        tokens = tokenize_search(query)
+        if not tokens:
+            return []
+
+        scores: Optional[Dict[int, float]] = None
+        for token in tokens:
+            token_scores = {id_producto: 1.0 for id_producto in self._prefix_ids(token)}
+            if not token_scores and len(token) >= FUZZY_MIN_LENGTH:
+                token_scores = self._fuzzy_scores(token)
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    id_producto: score + token_scores[id_producto]
+                    for id_producto, score in scores.items()
+                    if id_producto in token_scores
+                }
+            if not scores:
+                return []
+
+        ordenados: List[Tuple[float, int, int]] = sorted(
+            (-score, len(self.productos[id_producto].nombre or ""), id_producto)
+            for id_producto, score in scores.items()
+        )
+        return [self.productos[id_producto] for _, _, id_producto in ordenados[:limit]]
+
+
+class TypeaheadCache:
+    """
+    Mantiene el índice de autocompletado alineado con la foto del catálogo.
+    Las escrituras del catálogo invalidan la foto (catalog_cache.invalidate()),
+    y el índice se reconstruye la primera vez que se consulta la foto nueva.
+    """
+
+    def __init__(self, cache: CatalogCache):
+        self.cache = cache
+        # (foto, índice) se reemplazan juntos para que un lector nunca los mezcle
+        self._state: Optional[Tuple[CatalogSnapshot, TypeaheadIndex]] = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> TypeaheadIndex:
+        """Obtiene el índice de la foto vigente, reconstruyéndolo si cambió"""
+        return self._index_for(self.cache.get(db))
+
+    async def get_async(self, db: AsyncSession) -> TypeaheadIndex:
+        """Como get(), para endpoints async"""
+        return self._index_for(await self.cache.get_async(db))
+
+    def _index_for(self, snapshot: CatalogSnapshot) -> TypeaheadIndex:
+        state = self._state
+        if state is not None and state[0] is snapshot:
+            return state[1]
+
+        with self._lock:
+            state = self._state
+            if state is not None and state[0] is snapshot:
+                return state[1]
+            index = TypeaheadIndex(snapshot.productos)
+            self._state = (snapshot, index)
+            return index
+
+
+# Instancia compartida por el proceso
+typeahead = TypeaheadCache(catalog_cache)
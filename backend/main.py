@@ -1,13 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.routers import auth, category, subcategory, product, cart, iva, reports
-from app.database import engine, Base
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.routers import auth, category, subcategory, product, cart, iva, reports, admin, images
+from app.database import engine, Base, SessionLocal
+from app.crud.product_search import ensure_search_index
+from app.utils.compression import CompressionMiddleware, compression_cache
+from app.utils.static_assets import ImmutableStaticFiles, static_manifest
+from app.utils.typeahead import typeahead
 from config import settings
 
 # Crear tablas en la base de datos
 Base.metadata.create_all(bind=engine)
 
+# Índice de búsqueda de productos en SQLite (FTS5); en MySQL lo crea la migración 006
+ensure_search_index(engine)
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title="Sistema Administrativo de Ventas - Web Beatty",
@@ -24,8 +32,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configurar archivos estáticos
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Comprimir respuestas JSON/texto (brotli o gzip según Accept-Encoding)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE, cache=compression_cache)
+
+# Pool de conexiones agotado (esperó DB_POOL_TIMEOUT): 503 en lugar de 500
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Base de datos ocupada, intenta de nuevo"},
+        headers={"Retry-After": "1"}
+    )
+
+# Configurar archivos estáticos (rutas con huella: caché inmutable; ver /api/static/manifest)
+app.mount("/static", ImmutableStaticFiles(directory="static", manifest=static_manifest), name="static")
 
 # Incluir routers
 app.include_router(auth.router, prefix="/api")
@@ -35,7 +55,20 @@ app.include_router(product.router, prefix="/api")
 app.include_router(cart.router)
 app.include_router(iva.router, prefix="/api")
 app.include_router(reports.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(images.router, prefix="/api")
+
 
+@app.on_event("startup")
+def warm_typeahead():
+    """Carga el catálogo y el índice de autocompletado antes de la primera petición"""
+    db = SessionLocal()
+    try:
+        typeahead.get(db)
+    except Exception as e:
+        print(f"No se pudo precargar el índice de autocompletado: {str(e)}")
+    finally:
+        db.close()
 
 @app.get("/")
 def read_root():
@@ -70,6 +103,14 @@ def get_productos_publicos_test():
         "message": "Productos de prueba obtenidos exitosamente"
     }
 
+@app.get("/api/static/manifest")
+def get_static_manifest():
+    """
+    Manifiesto de archivos estáticos: ruta original -> ruta con huella del contenido.
+    Las URLs con huella (/static/<ruta con huella>) se sirven con caché inmutable de un año.
+    """
+    return static_manifest.manifest()
+
 @app.get("/api/test-connection")
 def test_connection():
     """
@@ -111,7 +152,8 @@ def favicon():
     </svg>
     """
     from fastapi.responses import Response
-    return Response(content=svg_icon, media_type="image/svg+xml")
+    # La URL del favicon es fija: caché de un día en lugar de inmutable
+    return Response(content=svg_icon, media_type="image/svg+xml", headers={"Cache-Control": "public, max-age=86400"})
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark del acceso a la base de datos desde los endpoints.
+
+Ejecuta la misma consulta (carrito pendiente con productos e IVA) N veces,
+con --concurrency peticiones a la vez, por tres caminos, mientras mide la
+latencia de /health:
+- "async + Session": handler async def con la sesión sync (como estaba el
+  carrito); cada consulta bloquea el event loop.
+- "sync + threadpool": handler def con la sesión sync, en el threadpool.
+- "async + AsyncSession": handler async def con get_async_db.
+
+La concurrencia por defecto es menor que el pool (DB_POOL_SIZE + DB_MAX_OVERFLOW):
+con más peticiones que conexiones, "async + Session" espera una conexión libre
+bloqueando el event loop, que es quien debe devolverlas, y queda detenido hasta
+DB_POOL_TIMEOUT (pruébelo con --concurrency 50).
+
+Ejecutar: python scripts/benchmark_async_db.py [--requests N] [--concurrency 20] [--database-url URL]
+Por defecto usa una base SQLite aparte (benchmark_async_db.db) que se recrea en
+cada ejecución. Con MySQL (--database-url) la latencia de red hace más visible
+el bloqueo del event loop; la base debe estar vacía (se crean datos de prueba).
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser(description="Benchmark de sesión sync vs async")
+parser.add_argument("--requests", type=int, default=2000)
+parser.add_argument("--concurrency", type=int, default=20)
+parser.add_argument("--items", type=int, default=20, help="items del carrito de prueba")
+parser.add_argument("--database-url", default=None)
+args = parser.parse_args()
+
+DB_FILE = "benchmark_async_db.db"
+os.environ.setdefault("DB_POOL_TIMEOUT", "5")
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import main
+from app.database import SessionLocal, get_async_db, get_db
+from app.crud import cart as crud_cart
+from app.models import Cart, Categoria, Iva, Perfil, Persona, Producto, Sale, Subcategoria, Usuario
+
+USER_ID = 1
+
+@main.app.get("/benchmark/async-session")
+async def cart_async_session(db: Session = Depends(get_db)):
+    """Handler async con la sesión sync: bloquea el event loop durante la consulta"""
+    return {"items": len(crud_cart.get_pending_cart_rows(db, USER_ID))}
+
+@main.app.get("/benchmark/sync-threadpool")
+def cart_sync_threadpool(db: Session = Depends(get_db)):
+    """Handler sync: la consulta corre en el threadpool"""
+    return {"items": len(crud_cart.get_pending_cart_rows(db, USER_ID))}
+
+@main.app.get("/benchmark/async-asyncsession")
+async def cart_async_asyncsession(db: AsyncSession = Depends(get_async_db)):
+    """Handler async con AsyncSession: el event loop atiende otras peticiones durante la consulta"""
+    return {"items": len(await db.run_sync(crud_cart.get_pending_cart_rows, USER_ID))}
+
+def seed():
+    """Un cliente con una venta pendiente de --items productos"""
+    db = SessionLocal()
+    try:
+        db.add(Perfil(id_perfil=3, nombre="Cliente"))
+        db.add(Iva(id_iva=1, porcentaje=19, descripcion="General"))
+        db.add(Categoria(id_categoria=1, nombre="Cuidado"))
+        db.add(Subcategoria(id_subcategoria=1, id_categoria=1, nombre="Jabones"))
+        db.add(Persona(id_persona=1, tipo_identificacion="CEDULA", identificacion="1000000001",
+                       nombre="Cliente", apellido="Benchmark", email="cliente@benchmark.com"))
+        db.add(Usuario(id_usuario=USER_ID, id_persona=1, id_perfil=3, username="cliente@benchmark.com", password="x"))
+        db.add(Sale(id_venta=1, id_usuario=USER_ID, total_venta=0, estado="PENDIENTE"))
+        for i in range(1, args.items + 1):
+            db.add(Producto(id_producto=i, id_categoria=1, id_subcategoria=1, id_iva=1, codigo=f"B{i:04d}",
+                            marca="Marca", nombre=f"Producto {i}", valor=1000, stock=100, estado="ACTIVO"))
+            db.add(Cart(id_venta=1, id_producto=i, id_usuario=USER_ID, cantidad=1,
+                        valor_unitario=1000, iva_calculado=190, subtotal=1190, estado="ACTIVO"))
+        db.commit()
+    finally:
+        db.close()
+
+async def carga(client: httpx.AsyncClient, url: str, peticiones: int, concurrencia: int):
+    """Peticiones a url (concurrencia a la vez) mientras se mide /health"""
+    fin = asyncio.Event()
+    latencias_health = []
+
+    async def sondear_health():
+        while not fin.is_set():
+            inicio = time.perf_counter()
+            await client.get("/health")
+            latencias_health.append((time.perf_counter() - inicio) * 1000)
+            await asyncio.sleep(0.005)
+
+    pendientes = iter(range(peticiones))
+    codigos = []
+
+    async def cliente():
+        for _ in pendientes:
+            respuesta = await client.get(url)
+            codigos.append(respuesta.status_code)
+
+    sonda = asyncio.create_task(sondear_health())
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+    fin.set()
+    await sonda
+
+    cortes = statistics.quantiles(latencias_health, n=100) if len(latencias_health) >= 2 else [0.0] * 99
+    return {
+        "req_s": peticiones / duracion,
+        "ok": codigos.count(200),
+        "health_p50": cortes[49],
+        "health_p99": cortes[98]
+    }
+
+async def run():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        # Calentar los pools de conexiones
+        for url in ("/benchmark/sync-threadpool", "/benchmark/async-asyncsession"):
+            await client.get(url)
+
+        resultados = []
+        for nombre, url in (
+            ("async + Session", "/benchmark/async-session"),
+            ("sync + threadpool", "/benchmark/sync-threadpool"),
+            ("async + AsyncSession", "/benchmark/async-asyncsession")
+        ):
+            print(f"⏱️  {args.requests} peticiones ({args.concurrency} a la vez): {nombre}...")
+            resultados.append((nombre, await carga(client, url, args.requests, args.concurrency)))
+
+    print("\n📊 Resultados")
+    print("=" * 60)
+    for nombre, resultado in resultados:
+        print(
+            f"  {nombre:<22} {resultado['req_s']:8.1f} req/s, ok={resultado['ok']}, "
+            f"/health p50={resultado['health_p50']:.1f}ms p99={resultado['health_p99']:.1f}ms"
+        )
+
+if __name__ == "__main__":
+    seed()
+    asyncio.run(run())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la autenticación por petición en /api/reports/* y /api/cart/confirm.
+
+Compara la dependencia anterior (decodificar el JWT y cargar el Usuario con
+persona y perfil en cada petición) con get_current_principal (claims del
+token, con la caché de tokens verificados). Reporta latencia p50/p99 por
+petición y cuántas consultas SQL hace cada una.
+
+Ejecutar: python scripts/benchmark_auth.py [--peticiones N]
+Usa una base SQLite aparte (benchmark_auth.db) que se recrea en cada ejecución.
+"""
+
+import sys
+import os
+import argparse
+import statistics
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = "benchmark_auth.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+import main
+from app.database import SessionLocal, engine, get_db
+from app.models import Perfil, Persona, Usuario
+from app.schemas.auth import Principal
+from app.utils.auth import _decode_token, get_current_principal, get_password_hash, security, token_cache
+
+ENDPOINTS = [
+    ("GET", "/api/reports/sales/summary", "admin@benchmark.com"),
+    ("GET", "/api/reports/sales?limit=20", "admin@benchmark.com"),
+    # Sin carrito pendiente: mide autenticación + búsqueda de la venta (responde 404)
+    ("PUT", "/api/cart/confirm", "cliente@benchmark.com"),
+]
+
+def seed():
+    """Perfiles y un usuario administrador y uno cliente"""
+    db = SessionLocal()
+    try:
+        db.add_all([Perfil(id_perfil=1, nombre="Administrador"), Perfil(id_perfil=3, nombre="Cliente")])
+        for id_usuario, email, perfil in [(1, "admin@benchmark.com", 1), (2, "cliente@benchmark.com", 3)]:
+            db.add(Persona(
+                id_persona=id_usuario, tipo_identificacion="CEDULA", identificacion=str(id_usuario),
+                nombre="Benchmark", apellido=str(id_usuario), email=email
+            ))
+            db.add(Usuario(
+                id_usuario=id_usuario, id_persona=id_usuario, id_perfil=perfil,
+                username=email, password=get_password_hash("benchmark123")
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+def principal_desde_bd(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> Principal:
+    """Comportamiento anterior: decodificar siempre y cargar el usuario con sus relaciones"""
+    payload = _decode_token(credentials.credentials)
+    user = db.query(Usuario).options(
+        joinedload(Usuario.persona),
+        joinedload(Usuario.perfil)
+    ).filter(Usuario.id_usuario == payload.get("user_id")).first()
+    if user is None:
+        raise HTTPException(status_code=401, detail="Usuario no encontrado")
+    return Principal(id_usuario=user.id_usuario, email=user.username, profile=user.perfil.nombre)
+
+def measure(client, headers, peticiones: int):
+    """Latencias p50/p99 (ms) y consultas SQL por petición de cada endpoint"""
+    consultas = [0]
+
+    def contar(*args):
+        consultas[0] += 1
+
+    event.listen(engine, "before_cursor_execute", contar)
+    resultados = {}
+    try:
+        for metodo, url, email in ENDPOINTS:
+            tiempos = []
+            consultas[0] = 0
+            for _ in range(peticiones):
+                inicio = time.perf_counter()
+                client.request(metodo, url, headers=headers[email])
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            cortes = statistics.quantiles(tiempos, n=100)
+            resultados[url] = {"p50": cortes[49], "p99": cortes[98], "consultas": consultas[0] / peticiones}
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+    return resultados
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark de autenticación por petición")
+    parser.add_argument("--peticiones", type=int, default=500)
+    args = parser.parse_args()
+
+    seed()
+    client = TestClient(main.app)
+    headers = {}
+    for _, _, email in ENDPOINTS:
+        respuesta = client.post("/api/auth/login", json={"email": email, "password": "benchmark123"})
+        headers[email] = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+    print("⏱️  Midiendo con decodificación y carga del usuario en cada petición...")
+    main.app.dependency_overrides[get_current_principal] = principal_desde_bd
+    antes = measure(client, headers, args.peticiones)
+
+    print("⏱️  Midiendo con principal desde el token (caché de tokens)...")
+    main.app.dependency_overrides.clear()
+    token_cache.clear()
+    despues = measure(client, headers, args.peticiones)
+
+    print("\n📊 Resultados (ms por petición)")
+    print("=" * 60)
+    for metodo, url, _ in ENDPOINTS:
+        print(f"\n{metodo} {url}")
+        print(f"  antes:   p50={antes[url]['p50']:.3f} p99={antes[url]['p99']:.3f} consultas={antes[url]['consultas']:.1f}")
+        print(f"  después: p50={despues[url]['p50']:.3f} p99={despues[url]['p99']:.3f} consultas={despues[url]['consultas']:.1f}")
+        print(f"  ahorro p50: {antes[url]['p50'] - despues[url]['p50']:.3f} ms")
+
+if __name__ == "__main__":
+    main_benchmark()
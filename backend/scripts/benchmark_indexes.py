@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los índices compuestos (migración 005).
+Crea una base de datos con muchos datos de prueba, y para cada consulta
+de los endpoints principales registra el plan (EXPLAIN) y la latencia
+p50/p99 sin y con los índices compuestos.
+
+Ejecutar: python scripts/benchmark_indexes.py [--database-url URL] [--ventas N]
+Por defecto usa una base SQLite aparte (benchmark_indexes.db); no usar
+sobre la base de producción, el script borra y recrea todas las tablas.
+"""
+
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select, text
+from app.database import Base
+from app.models import Categoria, Subcategoria, Iva, Perfil, Persona, Usuario, Producto, Sale, Cart
+
+# Índices que agrega la migración 005
+COMPOSITE_INDEXES = [
+    index
+    for table in (Sale.__table__, Cart.__table__, Producto.__table__)
+    for index in table.indexes
+    if index.name in (
+        "tbl_venta_index_usuario_estado_fecha",
+        "tbl_carrito_index_venta_estado",
+        "tbl_producto_index_estado_categoria",
+        "tbl_producto_index_estado_subcategoria",
+    )
+]
+
+BATCH_SIZE = 5000
+ESTADOS_VENTA = ["CONFIRMADO"] * 8 + ["PENDIENTE", "CANCELADO"]
+
+def insert_batches(connection, table, rows):
+    """Inserta filas en lotes para no construir todo el dataset en memoria"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            connection.execute(insert(table), batch)
+            batch = []
+    if batch:
+        connection.execute(insert(table), batch)
+
+def seed(engine, num_usuarios: int, num_productos: int, num_ventas: int):
+    """Recrea el esquema y carga el dataset de prueba"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    random.seed(42)
+    inicio = datetime(2024, 1, 1)
+
+    with engine.begin() as connection:
+        connection.execute(insert(Perfil.__table__), [{"id_perfil": 3, "nombre": "Cliente"}])
+        connection.execute(insert(Iva.__table__), [
+            {"id_iva": 1, "porcentaje": 0, "descripcion": "Exento"},
+            {"id_iva": 2, "porcentaje": 19, "descripcion": "General"}
+        ])
+        connection.execute(insert(Categoria.__table__), [
+            {"id_categoria": i, "nombre": f"Categoría {i}"} for i in range(1, 21)
+        ])
+        connection.execute(insert(Subcategoria.__table__), [
+            {"id_subcategoria": i, "id_categoria": 1 + i % 20, "nombre": f"Subcategoría {i}"} for i in range(1, 101)
+        ])
+        insert_batches(connection, Producto.__table__, (
+            {
+                "id_producto": i,
+                "id_categoria": 1 + (i % 100) % 20,
+                "id_subcategoria": 1 + i % 100,
+                "id_iva": 1 + i % 2,
+                "codigo": f"B{i:07d}",
+                "marca": f"Marca {i % 50}",
+                "nombre": f"Producto {i}",
+                "valor": 1000 + i % 100 * 100,
+                "stock": 100,
+                "estado": "ACTIVO" if i % 10 else "INACTIVO"
+            }
+            for i in range(1, num_productos + 1)
+        ))
+        insert_batches(connection, Persona.__table__, (
+            {
+                "id_persona": i,
+                "tipo_identificacion": "CEDULA",
+                "identificacion": f"{i:010d}",
+                "nombre": "Cliente",
+                "apellido": str(i),
+                "email": f"cliente{i}@benchmark.local"
+            }
+            for i in range(1, num_usuarios + 1)
+        ))
+        insert_batches(connection, Usuario.__table__, (
+            {
+                "id_usuario": i,
+                "id_persona": i,
+                "id_perfil": 3,
+                "username": f"cliente{i}@benchmark.local",
+                "password": "x"
+            }
+            for i in range(1, num_usuarios + 1)
+        ))
+        insert_batches(connection, Sale.__table__, (
+            {
+                "id_venta": i,
+                "id_usuario": random.randint(1, num_usuarios),
+                "fecha_venta": inicio + timedelta(minutes=i),
+                "total_venta": 10000,
+                "estado": random.choice(ESTADOS_VENTA)
+            }
+            for i in range(1, num_ventas + 1)
+        ))
+        insert_batches(connection, Cart.__table__, (
+            {
+                "id_venta": id_venta,
+                "id_usuario": None,
+                "id_producto": random.randint(1, num_productos),
+                "cantidad": 1,
+                "valor_unitario": 10000,
+                "iva_calculado": 0,
+                "subtotal": 10000,
+                "estado": random.choice(["VENTA", "ACTIVO"])
+            }
+            for id_venta in range(1, num_ventas + 1)
+            for _ in range(3)
+        ))
+
+def build_queries(num_usuarios: int, num_ventas: int):
+    """Consultas de los endpoints afectados, con parámetros aleatorios"""
+    return {
+        "GET /api/cart/user (venta pendiente)": lambda: select(Sale.id_venta).where(
+            Sale.id_usuario == random.randint(1, num_usuarios),
+            Sale.estado == "PENDIENTE"
+        ).order_by(Sale.fecha_venta.desc()).limit(1),
+        "PUT /api/cart/confirm (items activos)": lambda: select(Cart.id_producto, Cart.cantidad).where(
+            Cart.id_venta == random.randint(1, num_ventas),
+            Cart.estado == "ACTIVO"
+        ),
+        "GET /api/products (por categoría)": lambda: select(Producto.id_producto).where(
+            Producto.estado == "ACTIVO",
+            Producto.id_categoria == random.randint(1, 20)
+        ),
+        "GET /api/products (por subcategoría)": lambda: select(Producto.id_producto).where(
+            Producto.estado == "ACTIVO",
+            Producto.id_subcategoria == random.randint(1, 100)
+        ),
+    }
+
+def explain(connection, statement) -> str:
+    """Plan de ejecución de la consulta según el motor"""
+    sql = str(statement.compile(connection.engine, compile_kwargs={"literal_binds": True}))
+    if connection.engine.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return "; ".join(str(row[-1]) for row in rows)
+    rows = connection.execute(text(f"EXPLAIN {sql}")).mappings().fetchall()
+    return "; ".join(
+        f"{row.get('table')} type={row.get('type')} key={row.get('key')} rows={row.get('rows')}" for row in rows
+    )
+
+def measure(engine, queries, repeticiones: int) -> dict:
+    """Plan y latencias p50/p99 (ms) de cada consulta"""
+    resultados = {}
+    with engine.connect() as connection:
+        for nombre, build in queries.items():
+            plan = explain(connection, build())
+            tiempos = []
+            for _ in range(repeticiones):
+                statement = build()
+                inicio = time.perf_counter()
+                connection.execute(statement).fetchall()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            percentiles = statistics.quantiles(tiempos, n=100)
+            resultados[nombre] = {"plan": plan, "p50": percentiles[49], "p99": percentiles[98]}
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de índices compuestos")
+    parser.add_argument("--database-url", default="sqlite:///benchmark_indexes.db", help="Base de datos de prueba (se recrea)")
+    parser.add_argument("--usuarios", type=int, default=5000)
+    parser.add_argument("--productos", type=int, default=20000)
+    parser.add_argument("--ventas", type=int, default=200000)
+    parser.add_argument("--repeticiones", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+
+    print(f"🌱 Cargando datos: {args.usuarios} usuarios, {args.productos} productos, {args.ventas} ventas...")
+    seed(engine, args.usuarios, args.productos, args.ventas)
+    queries = build_queries(args.usuarios, args.ventas)
+
+    for index in COMPOSITE_INDEXES:
+        index.drop(engine, checkfirst=True)
+    print("⏱️  Midiendo sin índices compuestos...")
+    antes = measure(engine, queries, args.repeticiones)
+
+    for index in COMPOSITE_INDEXES:
+        index.create(engine, checkfirst=True)
+    print("⏱️  Midiendo con índices compuestos...")
+    despues = measure(engine, queries, args.repeticiones)
+
+    print("\n📊 Resultados (ms)")
+    print("=" * 60)
+    for nombre in queries:
+        print(f"\n{nombre}")
+        print(f"  antes:   p50={antes[nombre]['p50']:.3f} p99={antes[nombre]['p99']:.3f}")
+        print(f"           plan: {antes[nombre]['plan']}")
+        print(f"  después: p50={despues[nombre]['p50']:.3f} p99={despues[nombre]['p99']:.3f}")
+        print(f"           plan: {despues[nombre]['plan']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark de una ráfaga de logins.
+
+Lanza N logins concurrentes y, mientras tanto, mide la latencia de un
+endpoint sync liviano (/health). Compara el login anterior (handler sync que
+ejecuta bcrypt en el threadpool compartido) con /api/auth/login (bcrypt en el
+pool de hashing acotado).
+
+Ejecutar: python scripts/benchmark_login_storm.py [--logins N]
+Usa una base SQLite aparte (benchmark_login_storm.db) que se recrea en cada ejecución.
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = "benchmark_login_storm.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+import main
+from app.database import SessionLocal, get_db
+from app.crud.auth import authenticate_user
+from app.models import Perfil, Persona, Usuario
+from app.schemas.auth import LoginRequest
+from app.utils.auth import get_password_hash
+from app.utils.password_hashing import password_hasher
+
+USUARIOS = 20
+PASSWORD = "benchmark123"
+
+@main.app.post("/benchmark/login-sync")
+def login_sync(login_data: LoginRequest, db: Session = Depends(get_db)):
+    """Login anterior: handler sync con bcrypt en el threadpool compartido"""
+    user_data = authenticate_user(db, login_data.email, login_data.password)
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    return {"user_id": user_data["user_id"]}
+
+def seed():
+    """Perfil Cliente y usuarios con la misma contraseña"""
+    db = SessionLocal()
+    try:
+        db.add(Perfil(id_perfil=3, nombre="Cliente"))
+        hashed_password = get_password_hash(PASSWORD)
+        for i in range(1, USUARIOS + 1):
+            email = f"cliente{i}@benchmark.com"
+            db.add(Persona(
+                id_persona=i, tipo_identificacion="CEDULA", identificacion=f"{i:010d}",
+                nombre="Cliente", apellido=str(i), email=email
+            ))
+            db.add(Usuario(id_usuario=i, id_persona=i, id_perfil=3, username=email, password=hashed_password))
+        db.commit()
+    finally:
+        db.close()
+
+async def storm(client: httpx.AsyncClient, url: str, logins: int):
+    """Ráfaga de logins concurrentes mientras se mide /health"""
+    fin = asyncio.Event()
+    latencias_health = []
+
+    async def sondear_health():
+        while not fin.is_set():
+            inicio = time.perf_counter()
+            await client.get("/health")
+            latencias_health.append((time.perf_counter() - inicio) * 1000)
+            await asyncio.sleep(0.005)
+
+    async def un_login(i: int):
+        email = f"cliente{i % USUARIOS + 1}@benchmark.com"
+        respuesta = await client.post(url, json={"email": email, "password": PASSWORD})
+        return respuesta.status_code
+
+    sonda = asyncio.create_task(sondear_health())
+    inicio = time.perf_counter()
+    codigos = await asyncio.gather(*(un_login(i) for i in range(logins)))
+    duracion = time.perf_counter() - inicio
+    fin.set()
+    await sonda
+
+    cortes = statistics.quantiles(latencias_health, n=100)
+    return {
+        "duracion": duracion,
+        "ok": codigos.count(200),
+        "rechazados": codigos.count(503),
+        "health_p50": cortes[49],
+        "health_p99": cortes[98]
+    }
+
+async def run(logins: int):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        print(f"⏱️  {logins} logins con el handler sync anterior...")
+        antes = await storm(client, "/benchmark/login-sync", logins)
+        print(f"⏱️  {logins} logins con el pool de hashing...")
+        despues = await storm(client, "/api/auth/login", logins)
+
+    print("\n📊 Resultados")
+    print("=" * 60)
+    for nombre, resultado in (("antes", antes), ("después", despues)):
+        print(
+            f"  {nombre}: {resultado['duracion']:.2f}s, ok={resultado['ok']}, 503={resultado['rechazados']}, "
+            f"/health p50={resultado['health_p50']:.1f}ms p99={resultado['health_p99']:.1f}ms"
+        )
+    print(f"\n  pool de hashing: {password_hasher.metrics()}")
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark de ráfaga de logins")
+    parser.add_argument("--logins", type=int, default=60)
+    args = parser.parse_args()
+
+    seed()
+    asyncio.run(run(args.logins))
+
+if __name__ == "__main__":
+    main_benchmark()
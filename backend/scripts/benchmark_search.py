@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la búsqueda de productos: LIKE '%término%' frente al índice
+de texto completo (FULLTEXT en MySQL, FTS5 en SQLite) sobre un catálogo
+sintético de 100.000 productos con nombres en español.
+
+Ejecutar: python scripts/benchmark_search.py [--database-url URL] [--productos N]
+Por defecto usa una base SQLite aparte (benchmark_search.db); no usar sobre
+la base de producción, el script borra y recrea todas las tablas.
+"""
+
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Categoria, Subcategoria, Iva, Producto
+from app.crud.product import get_productos_filtrados, get_productos_filtrados_count
+from app.crud.product_search import ensure_search_index, like_filter
+from app.schemas.product import ProductoFiltros
+
+BATCH_SIZE = 5000
+
+TIPOS = ["Jabón", "Champú", "Acondicionador", "Crema", "Desodorante", "Loción", "Cepillo", "Pañitos", "Gel", "Protector"]
+VARIANTES = ["líquido", "en barra", "humectante", "antibacterial", "para niños", "sin aroma", "de coco", "de almendras", "extra suave", "para bebé"]
+MARCAS = ["Nivea", "Dove", "Protex", "Johnson's", "Colgate", "Oral-B", "Pantene", "Sedal", "Rexona", "Eucerin"]
+
+# Términos de búsqueda típicos del buscador (con y sin tildes)
+TERMINOS = ["jabon", "Jabón líquido", "champu coco", "crema humectante", "desodorante rexona", "pañitos bebe", "cepillo"]
+
+def seed(engine, num_productos: int):
+    """Recrea el esquema, carga el catálogo sintético y crea el índice de búsqueda"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    random.seed(42)
+
+    with engine.begin() as connection:
+        connection.execute(insert(Iva.__table__), [{"id_iva": 1, "porcentaje": 0, "descripcion": "Exento"}])
+        connection.execute(insert(Categoria.__table__), [{"id_categoria": 1, "nombre": "Aseo personal"}])
+        connection.execute(insert(Subcategoria.__table__), [{"id_subcategoria": 1, "id_categoria": 1, "nombre": "General"}])
+
+        batch = []
+        for i in range(1, num_productos + 1):
+            batch.append({
+                "id_producto": i,
+                "id_categoria": 1,
+                "id_subcategoria": 1,
+                "id_iva": 1,
+                "codigo": f"PROD-{i:06d}",
+                "marca": random.choice(MARCAS),
+                "nombre": f"{random.choice(TIPOS)} {random.choice(VARIANTES)} {random.randint(50, 1000)}ml",
+                "valor": 1000 + i % 100 * 100,
+                "stock": 100,
+                "estado": "ACTIVO"
+            })
+            if len(batch) >= BATCH_SIZE:
+                connection.execute(insert(Producto.__table__), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(Producto.__table__), batch)
+
+    ensure_search_index(engine)
+
+def percentiles(tiempos):
+    cortes = statistics.quantiles(tiempos, n=100)
+    return cortes[49], cortes[98]
+
+def measure(repeticiones: int, consulta):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        consulta()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return percentiles(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda de productos")
+    parser.add_argument("--database-url", default="sqlite:///benchmark_search.db", help="Base de datos de prueba (se recrea)")
+    parser.add_argument("--productos", type=int, default=100000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    print(f"🌱 Cargando {args.productos} productos sintéticos...")
+    seed(engine, args.productos)
+
+    db = sessionmaker(bind=engine)()
+    try:
+        print("\n📊 Resultados (ms, página de 20 + total)")
+        print("=" * 60)
+        for termino in TERMINOS:
+            def con_like():
+                db.query(Producto).filter(like_filter(termino)).order_by(Producto.id_producto).limit(20).all()
+                return db.query(func.count(Producto.id_producto)).filter(like_filter(termino)).scalar()
+
+            # Mismo camino que /api/products/?search=... (índice de texto completo, orden por relevancia)
+            filtros = ProductoFiltros(search=termino)
+
+            def con_indice():
+                get_productos_filtrados(db, filtros, limit=20)
+                return get_productos_filtrados_count(db, filtros)
+
+            total_like = con_like()
+            total_indice = con_indice()
+            like_p50, like_p99 = measure(args.repeticiones, con_like)
+            indice_p50, indice_p99 = measure(args.repeticiones, con_indice)
+
+            print(f"\n'{termino}'")
+            print(f"  LIKE:   p50={like_p50:.2f} p99={like_p99:.2f} total={total_like}")
+            print(f"  índice: p50={indice_p50:.2f} p99={indice_p99:.2f} total={total_indice}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
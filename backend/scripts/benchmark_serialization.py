@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de serialización de listados (páginas de 1000 productos).
+
+Mide el costo por fila de armar la respuesta JSON:
+- Listado privado (/api/products/): antes, entidades ORM con joinedload →
+  ProductoDetailResponse(**__dict__) por fila → ProductoDetailListResponse →
+  validación y dump_json del response_model (como hace FastAPI); después,
+  consulta por columnas → dicts → FastJSONResponse.
+- Listado público (/api/products/public): antes, modelos de la foto del
+  catálogo → response_model; después, dicts ya serializados de la foto.
+
+Ejecutar: python scripts/benchmark_serialization.py [--rows 1000] [--rounds 20]
+Usa una base SQLite aparte (benchmark_serialization.db) que se recrea en cada ejecución.
+"""
+
+import sys
+import os
+import argparse
+import statistics
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = "benchmark_serialization.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import joinedload
+import main
+from app.database import SessionLocal
+from app.crud import product as crud_product
+from app.models import Categoria, Iva, Producto, Subcategoria
+from app.schemas.product import ProductoDetailListResponse, ProductoDetailResponse, ProductoFiltros
+from app.utils.catalog_cache import catalog_cache
+from app.utils.json_response import FastJSONResponse, row_dicts
+
+# Igual que FastAPI con response_model: valida el objeto retornado y lo codifica
+response_adapter = TypeAdapter(ProductoDetailListResponse)
+
+def seed(rows: int):
+    db = SessionLocal()
+    try:
+        db.add(Iva(id_iva=1, porcentaje=19, descripcion="General"))
+        db.add(Categoria(id_categoria=1, nombre="Cuidado"))
+        db.add(Subcategoria(id_subcategoria=1, id_categoria=1, nombre="Jabones"))
+        for i in range(1, rows + 1):
+            db.add(Producto(
+                id_producto=i, id_categoria=1, id_subcategoria=1, id_iva=1, codigo=f"S{i:05d}",
+                marca="Marca", nombre=f"Producto {i}", imagen="default.webp",
+                valor=1000 + i, stock=100, estado="ACTIVO"
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+def privado_antes(db, rows: int) -> bytes:
+    productos = db.query(Producto).options(
+        joinedload(Producto.categoria),
+        joinedload(Producto.subcategoria),
+        joinedload(Producto.iva)
+    ).order_by(Producto.id_producto).limit(rows).all()
+    detalles = []
+    for producto in productos:
+        detalles.append(ProductoDetailResponse(**{
+            **producto.__dict__,
+            "categoria_nombre": producto.categoria.nombre if producto.categoria else None,
+            "subcategoria_nombre": producto.subcategoria.nombre if producto.subcategoria else None,
+            "iva_porcentaje": producto.iva.porcentaje if producto.iva else None,
+            "iva_descripcion": producto.iva.descripcion if producto.iva else None
+        }))
+    respuesta = ProductoDetailListResponse(productos=detalles, total=rows, next_cursor=None)
+    return response_adapter.dump_json(response_adapter.validate_python(respuesta))
+
+def privado_despues(db, rows: int) -> bytes:
+    filas = crud_product.get_productos_filtrados(db, ProductoFiltros(), limit=rows, with_details=True)
+    productos = row_dicts(filas, extra={"imagen_principal": None, "imagen_galeria": None, "imagen_srcset": None, "imagen_galeria_srcset": None}, exclude=("score",))
+    return FastJSONResponse({"productos": productos, "total": rows, "next_cursor": None}).body
+
+def publico_antes(db, rows: int) -> bytes:
+    productos = catalog_cache.get(db).productos[:rows]
+    respuesta = ProductoDetailListResponse(productos=productos, total=rows, next_cursor=None)
+    return response_adapter.dump_json(response_adapter.validate_python(respuesta))
+
+def publico_despues(db, rows: int) -> bytes:
+    catalogo = catalog_cache.get(db)
+    productos = [catalogo.productos_json[producto.id_producto] for producto in catalogo.productos[:rows]]
+    return FastJSONResponse({"productos": productos, "total": rows, "next_cursor": None}).body
+
+def medir(fn, db, rows: int, rounds: int) -> float:
+    """Mediana de microsegundos por fila"""
+    fn(db, rows)  # calentar
+    tiempos = []
+    for _ in range(rounds):
+        inicio = time.perf_counter()
+        fn(db, rows)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) / rows * 1_000_000
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de serialización")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    db = SessionLocal()
+    try:
+        print(f"⏱️  Páginas de {args.rows} filas, mediana de {args.rounds} rondas\n")
+        print(f"{'listado':<10} {'antes µs/fila':>14} {'después µs/fila':>16} {'mejora':>8}")
+        print("=" * 52)
+        for nombre, antes, despues in (
+            ("privado", privado_antes, privado_despues),
+            ("público", publico_antes, publico_despues)
+        ):
+            t_antes = medir(antes, db, args.rows, args.rounds)
+            t_despues = medir(despues, db, args.rows, args.rounds)
+            print(f"{nombre:<10} {t_antes:14.2f} {t_despues:16.2f} {t_antes / t_despues:7.1f}x")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Genera las versiones redimensionadas (grid, detail, zoom) en AVIF/WebP de
+todas las imágenes de static/images/products.
+
+Sin este script cada versión se genera en su primera petición; ejecutarlo
+después de agregar imágenes evita esa espera (AVIF es lento de codificar).
+
+Ejecutar desde backend/: python scripts/generate_image_derivatives.py
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.image_derivatives import IMAGE_SIZES, available_formats, image_derivatives
+
+def main():
+    formatos = available_formats()
+    if not formatos:
+        print("❌ Pillow no está instalado o no soporta los formatos de IMAGE_DERIVATIVE_FORMATS")
+        sys.exit(1)
+
+    print(f"🖼️  Tamaños: {IMAGE_SIZES}, formatos: {', '.join(formatos)}")
+    inicio = time.perf_counter()
+    generadas = image_derivatives.generate_all()
+    duracion = time.perf_counter() - inicio
+
+    for ruta in generadas:
+        print(f"  {ruta.name}: {ruta.stat().st_size / 1024:.1f} KB")
+    print(f"✅ {len(generadas)} versiones nuevas en {image_derivatives.output_dir} ({duracion:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del pool de conexiones.
+
+Lanza N peticiones concurrentes contra un endpoint que mantiene la conexión
+ocupada durante una consulta lenta (simulada), con un pool pequeño, para
+saturarlo. Reporta latencias, peticiones rechazadas con 503 (esperaron más de
+DB_POOL_TIMEOUT) y las métricas del pool (/api/admin/metrics/db-pool).
+
+Ejecutar: python scripts/load_test_db_pool.py [--requests N] [--pool-size 5] [--max-overflow 5] [--timeout 2]
+Usa una base SQLite aparte (load_test_db_pool.db) que se recrea en cada ejecución.
+El endpoint de prueba es sync: casi todo el presupuesto del pool va al motor sync
+(DB_ASYNC_POOL_SHARE=0, el async conserva 1 conexión).
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser(description="Prueba de carga del pool de conexiones")
+parser.add_argument("--requests", type=int, default=200)
+parser.add_argument("--pool-size", type=int, default=5)
+parser.add_argument("--max-overflow", type=int, default=5)
+parser.add_argument("--timeout", type=int, default=2)
+parser.add_argument("--query-ms", type=int, default=50, help="duración de la consulta simulada")
+args = parser.parse_args()
+
+# La configuración del pool se lee al importar la aplicación
+DB_FILE = "load_test_db_pool.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+os.environ["DB_MAX_OVERFLOW"] = str(args.max_overflow)
+os.environ["DB_POOL_TIMEOUT"] = str(args.timeout)
+os.environ["DB_ASYNC_POOL_SHARE"] = "0"
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+import main
+from app.database import engine, get_db
+from app.utils.db_pool import pool_metrics
+
+@main.app.get("/load-test/slow-query")
+def slow_query(db: Session = Depends(get_db)):
+    """Consulta que retiene la conexión durante --query-ms"""
+    db.execute(text("SELECT 1")).scalar()
+    time.sleep(args.query_ms / 1000)
+    return {"ok": True}
+
+async def run():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+        async def una_peticion():
+            inicio = time.perf_counter()
+            respuesta = await client.get("/load-test/slow-query")
+            return respuesta.status_code, (time.perf_counter() - inicio) * 1000
+
+        print(
+            f"⏱️  {args.requests} peticiones concurrentes, pool_size={args.pool_size}, "
+            f"max_overflow={args.max_overflow}, timeout={args.timeout}s, consulta={args.query_ms}ms..."
+        )
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(una_peticion() for _ in range(args.requests)))
+        duracion = time.perf_counter() - inicio
+
+    codigos = [codigo for codigo, _ in resultados]
+    latencias = [latencia for codigo, latencia in resultados if codigo == 200]
+
+    print("\n📊 Resultados")
+    print("=" * 60)
+    print(f"  duración: {duracion:.2f}s ({len(resultados) / duracion:.1f} req/s)")
+    print(f"  ok={codigos.count(200)}, 503={codigos.count(503)}, otros={len(codigos) - codigos.count(200) - codigos.count(503)}")
+    if len(latencias) >= 2:
+        cortes = statistics.quantiles(latencias, n=100)
+        print(f"  latencia ok p50={cortes[49]:.1f}ms p99={cortes[98]:.1f}ms max={max(latencias):.1f}ms")
+    print(f"\n  pool: {pool_metrics(engine)}")
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Reconstruye el resumen diario de ventas (tbl_venta_resumen_diario y
+tbl_venta_resumen_diario_total) a partir de tbl_venta y tbl_carrito.
+Ejecutar: python scripts/rebuild_sales_rollup.py [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+Sin fechas reconstruye todo el historial.
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.crud.sales_rollup import rebuild_rollup
+
+def parse_date(value: str):
+    """Convierte YYYY-MM-DD en date"""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir el resumen diario de ventas")
+    parser.add_argument("--start", type=parse_date, help="Primer día a reconstruir (YYYY-MM-DD)")
+    parser.add_argument("--end", type=parse_date, help="Último día a reconstruir (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    rango = f"{args.start or 'inicio'} - {args.end or 'hoy'}"
+    print(f"🔄 Reconstruyendo resumen diario de ventas ({rango})...")
+
+    db = SessionLocal()
+    try:
+        rebuild_rollup(db, args.start, args.end)
+        print("✅ Resumen diario reconstruido")
+    except Exception as e:
+        print(f"❌ Error reconstruyendo el resumen: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
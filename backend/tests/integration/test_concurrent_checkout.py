@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Prueba de estrés: confirmaciones de compra concurrentes sobre el mismo producto.
+Registra varios clientes, todos con el mismo producto en el carrito, deja un
+stock menor al número de clientes y confirma todas las compras en paralelo.
+Verifica que nunca se venda más de lo disponible (sin sobreventa).
+"""
+
+import os
+import sys
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config import settings
+
+# Configuración
+BASE_URL = "http://localhost:8000"
+REGISTER_URL = f"{BASE_URL}/api/auth/register"
+LOGIN_URL = f"{BASE_URL}/api/auth/login"
+CART_CREATE_URL = f"{BASE_URL}/api/cart/create"
+CART_CONFIRM_URL = f"{BASE_URL}/api/cart/confirm"
+
+PRODUCT_ID = 40
+NUM_CLIENTES = 20
+STOCK_INICIAL = 7
+CANTIDAD_POR_CLIENTE = 1
+
+def set_stock(stock: int):
+    """Fija el stock del producto directamente en la base de datos"""
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE tbl_producto SET stock = :stock WHERE id_producto = :id"),
+            {"stock": stock, "id": PRODUCT_ID}
+        )
+
+def get_stock() -> int:
+    """Lee el stock actual del producto directamente de la base de datos"""
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT stock FROM tbl_producto WHERE id_producto = :id"),
+            {"id": PRODUCT_ID}
+        ).scalar()
+
+def preparar_cliente(indice: int, sufijo: str) -> dict:
+    """Registra un cliente, inicia sesión y crea su carrito"""
+    identificacion = f"9{sufijo}{indice:03d}"
+    email = f"stress.{sufijo}.{indice}@example.com"
+    register_data = {
+        "tipo_identificacion": "CEDULA",
+        "identificacion": identificacion,
+        "genero": "FEMENINO",
+        "nombre": "Stress",
+        "apellido": f"Cliente {indice}",
+        "direccion": "Calle 1",
+        "telefono": "3000000000",
+        "email": email
+    }
+    response = requests.post(REGISTER_URL, json=register_data)
+    assert response.status_code == 200, f"Registro falló: {response.text}"
+
+    response = requests.post(LOGIN_URL, json={"email": email, "password": identificacion})
+    assert response.status_code == 200, f"Login falló: {response.text}"
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    cart_data = {
+        "items": [{
+            "id": str(PRODUCT_ID),
+            "name": "Producto estrés",
+            "price": 1000,
+            "image": "default.webp",
+            "quantity": CANTIDAD_POR_CLIENTE,
+            "brand": "Test",
+            "stock": STOCK_INICIAL,
+            "id_iva": 1,
+            "iva_rate": 0,
+            "subtotal": 1000,
+            "iva_amount": 0,
+            "total": 1000
+        }]
+    }
+    response = requests.post(CART_CREATE_URL, json=cart_data, headers=headers)
+    assert response.status_code == 200, f"Crear carrito falló: {response.text}"
+    return headers
+
+def confirmar(headers: dict) -> int:
+    """Confirma la compra y retorna el código HTTP"""
+    return requests.put(CART_CONFIRM_URL, headers=headers).status_code
+
+def test_concurrent_checkout():
+    print("🧪 Prueba de confirmaciones concurrentes")
+    print(f"📋 Clientes: {NUM_CLIENTES}, Stock inicial: {STOCK_INICIAL}")
+
+    sufijo = str(int(time.time()))[-6:]
+    clientes = [preparar_cliente(i, sufijo) for i in range(NUM_CLIENTES)]
+    print(f"✅ {len(clientes)} clientes con carrito listo")
+
+    set_stock(STOCK_INICIAL)
+
+    with ThreadPoolExecutor(max_workers=NUM_CLIENTES) as executor:
+        codigos = list(executor.map(confirmar, clientes))
+
+    exitosas = codigos.count(200)
+    rechazadas = len([c for c in codigos if c in (400, 409)])
+    stock_final = get_stock()
+
+    print(f"📊 Confirmadas: {exitosas}, Rechazadas por stock: {rechazadas}, Otros: {len(codigos) - exitosas - rechazadas}")
+    print(f"📦 Stock final: {stock_final}")
+
+    assert stock_final >= 0, "El stock quedó negativo"
+    assert exitosas * CANTIDAD_POR_CLIENTE == STOCK_INICIAL - stock_final, "El stock descontado no coincide con las ventas"
+    assert exitosas <= STOCK_INICIAL // CANTIDAD_POR_CLIENTE, "Se vendió más de lo disponible"
+    print("✅ Sin sobreventa")
+
+if __name__ == "__main__":
+    test_concurrent_checkout()
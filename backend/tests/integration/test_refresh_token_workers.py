@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Prueba de refresh tokens con varios workers de uvicorn.
+Levanta el backend con N workers y el almacén indicado, inicia sesión y
+renueva el access token muchas veces (cada petición en una conexión nueva,
+así el sistema operativo las reparte entre workers). Luego cierra sesión y
+verifica que el refresh token quede revocado en todos los workers.
+
+Con REFRESH_TOKEN_STORE=sql todas las renovaciones deben funcionar; con
+memory fallan las que caen en un worker distinto al que emitió el token.
+
+Ejecutar desde backend/: python tests/integration/test_refresh_token_workers.py [--store sql] [--workers 3]
+Usa la base de datos de DATABASE_URL (con las migraciones aplicadas).
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+import time
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PORT = 8010
+BASE_URL = f"http://127.0.0.1:{PORT}"
+REGISTER_URL = f"{BASE_URL}/api/auth/register"
+LOGIN_URL = f"{BASE_URL}/api/auth/login"
+REFRESH_URL = f"{BASE_URL}/api/auth/refresh"
+LOGOUT_URL = f"{BASE_URL}/api/auth/logout"
+
+NUM_RENOVACIONES = 30
+
+def start_server(store: str, workers: int) -> subprocess.Popen:
+    """Levanta uvicorn con varios workers y espera a que responda"""
+    env = dict(os.environ, REFRESH_TOKEN_STORE=store)
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--workers", str(workers)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    for _ in range(60):
+        try:
+            if requests.get(f"{BASE_URL}/health", timeout=1).status_code == 200:
+                # Dar tiempo a que arranquen todos los workers
+                time.sleep(2)
+                return proceso
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    proceso.terminate()
+    raise RuntimeError("El servidor no arrancó")
+
+def registrar_y_login() -> str:
+    """Registra un cliente nuevo e inicia sesión; retorna el refresh token"""
+    sufijo = str(int(time.time()))[-6:]
+    identificacion = f"77{sufijo}"
+    email = f"workers.{sufijo}@example.com"
+    response = requests.post(REGISTER_URL, json={
+        "tipo_identificacion": "CEDULA",
+        "identificacion": identificacion,
+        "genero": "FEMENINO",
+        "nombre": "Workers",
+        "apellido": "Prueba",
+        "direccion": "Calle 1",
+        "telefono": "3000000000",
+        "email": email
+    })
+    assert response.status_code == 200, f"Registro falló: {response.text}"
+
+    response = requests.post(LOGIN_URL, json={"email": email, "password": identificacion})
+    assert response.status_code == 200, f"Login falló: {response.text}"
+    return response.json()["refresh_token"]
+
+def renovar(refresh_token: str) -> list:
+    """Renueva el token varias veces, cada vez en una conexión nueva"""
+    codigos = []
+    for _ in range(NUM_RENOVACIONES):
+        response = requests.post(REFRESH_URL, json={"refresh_token": refresh_token}, headers={"Connection": "close"})
+        codigos.append(response.status_code)
+    return codigos
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh tokens con varios workers")
+    parser.add_argument("--store", default="sql", choices=["sql", "memory"])
+    parser.add_argument("--workers", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"🚀 Levantando backend con {args.workers} workers (REFRESH_TOKEN_STORE={args.store})...")
+    proceso = start_server(args.store, args.workers)
+    try:
+        refresh_token = registrar_y_login()
+
+        codigos = renovar(refresh_token)
+        exitosas = codigos.count(200)
+        print(f"🔄 Renovaciones exitosas: {exitosas}/{len(codigos)}")
+
+        response = requests.post(LOGOUT_URL, json={"refresh_token": refresh_token}, headers={"Connection": "close"})
+        print(f"🚪 Logout: {response.json()}")
+
+        revocadas = renovar(refresh_token).count(401)
+        print(f"🔒 Renovaciones rechazadas después del logout: {revocadas}/{NUM_RENOVACIONES}")
+
+        if args.store == "sql":
+            assert exitosas == len(codigos), "Con el almacén SQL todas las renovaciones deben funcionar"
+            assert revocadas == NUM_RENOVACIONES, "El token revocado debe rechazarse en todos los workers"
+            print("✅ El refresh token se comparte y se revoca en todos los workers")
+        else:
+            print("ℹ️  Con el almacén en memoria cada worker solo conoce sus propios tokens")
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
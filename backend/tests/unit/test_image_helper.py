@@ -0,0 +1,69 @@
+"""
+Tests unitarios de image_helper (no requieren el servidor)
+
+Ejecutar desde backend/:
+    python -m pytest tests/unit/test_image_helper.py
+"""
+
+import json
+
+from app.utils.image_derivatives import available_formats
+from app.utils.image_helper import get_cart_image_url, parse_product_images
+
+# Formato de tbl_producto.imagen en database/migrations/001_initial_schema.sql
+IMAGEN_JSON = json.dumps({"principal": "default-1.webp", "galeria": ["default.webp", "default-1.webp"]})
+
+
+def test_json_usa_urls_de_static_con_huella():
+    imagenes = parse_product_images(IMAGEN_JSON)
+
+    assert imagenes["principal"].startswith("/static/images/products/default-1.")
+    assert imagenes["principal"] != "/static/images/products/default-1.webp"
+    assert [url.split(".")[0] for url in imagenes["galeria"]] == [
+        "/static/images/products/default",
+        "/static/images/products/default-1"
+    ]
+
+
+def test_json_tiene_srcset():
+    imagenes = parse_product_images(IMAGEN_JSON)
+
+    assert set(imagenes["srcset"]) == set(available_formats())
+    assert len(imagenes["galeria_srcset"]) == 2
+    for formato, srcset in imagenes["srcset"].items():
+        assert srcset.startswith("/api/images/products/")
+        assert f".{formato} " in srcset
+
+
+def test_json_igual_que_nombres_separados_por_comas():
+    json_ = parse_product_images(IMAGEN_JSON)
+    comas = parse_product_images("default-1.webp,default.webp")
+
+    assert json_["principal"] == comas["principal"]
+    assert json_["srcset"] == comas["srcset"]
+
+
+def test_json_sin_principal_usa_imagen_por_defecto():
+    imagenes = parse_product_images("{}")
+
+    assert imagenes["principal"].startswith("/static/images/products/default.")
+
+
+def test_url_externa_no_cambia():
+    imagenes = parse_product_images(json.dumps({"principal": "https://cdn.example.com/a.webp"}))
+
+    assert imagenes["principal"] == "https://cdn.example.com/a.webp"
+    assert imagenes["srcset"] == {}
+
+
+
+def test_carrito_con_imagen_json():
+    principal = parse_product_images(IMAGEN_JSON)["principal"]
+
+    assert get_cart_image_url(IMAGEN_JSON) == f"http://localhost:8000{principal}"
+    assert get_cart_image_url("default-1.webp") == f"http://localhost:8000{principal}"
+    assert get_cart_image_url("http://localhost:8000/static/images/products/default-1.webp") == f"http://localhost:8000{principal}"
+
+
+def test_carrito_con_json_invalido_usa_imagen_por_defecto():
+    assert get_cart_image_url("{invalido").startswith("http://localhost:8000/static/images/products/default.")